@@ -0,0 +1,153 @@
+import os
+import re
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# /app page and asset settings
+APP_ASSETS_DIR = os.environ.get("APP_ASSETS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets"))
+# Fingerprinted assets never change under the same URL, so browsers may keep them this long
+APP_ASSET_MAX_AGE = int(os.environ.get("APP_ASSET_MAX_AGE", str(365 * 24 * 3600)))
+
+# URL prefix of the files in APP_ASSETS_DIR; the page refers to them by this prefix
+ASSET_URL_PREFIX = "/app/assets/"
+PAGE_FILE = "app.html"
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+}
+
+# Preferred first when a client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def accepted_encodings(header):
+    """Content codings a client accepts, from its Accept-Encoding header"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        try:
+            quality = float(match.group(1)) if match else 1.0
+        except ValueError:
+            quality = 1.0
+        if name and quality > 0:
+            accepted.add(name)
+    return accepted
+
+
+def etag_matches(header, etags):
+    """Whether an If-None-Match header names one of the tags (weak comparison, as for GET)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return not tags.isdisjoint(etags)
+
+
+class StaticAsset:
+    """A file served from memory, compressed once with every available coding
+
+    Each coding has its own strong ETag, so caches never mix up the bytes of
+    one representation with another.
+    """
+
+    def __init__(self, body, content_type, cache_control):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.bodies = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            # Tiny files can grow when compressed
+            if len(data) < len(body):
+                self.bodies[encoding] = data
+
+    def etag(self, encoding="identity"):
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def select_encoding(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and (encoding in accepted or '*' in accepted):
+                return encoding
+        return "identity"
+
+    def respond(self, headers):
+        """Status, headers and body answering a GET with these request headers"""
+        encoding = self.select_encoding(headers.get('Accept-Encoding'))
+        response_headers = {
+            'Content-Type': self.content_type,
+            'ETag': self.etag(encoding),
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding != "identity":
+            response_headers['Content-Encoding'] = encoding
+
+        if etag_matches(headers.get('If-None-Match'), {self.etag(e) for e in self.bodies}):
+            del response_headers['Content-Type']
+            response_headers.pop('Content-Encoding', None)
+            return 304, response_headers, b''
+        return 200, response_headers, self.bodies[encoding]
+
+    def stats(self):
+        return {encoding: len(body) for encoding, body in self.bodies.items()}
+
+
+class AppAssets:
+    """The /app page and its CSS and JS, loaded and compressed once at startup
+
+    The assets are served under names that include a hash of their content
+    and may be cached for a year; the page, which refers to them by those
+    names, is revalidated on each load with its ETag.
+    """
+
+    def __init__(self, directory=APP_ASSETS_DIR, max_age=APP_ASSET_MAX_AGE):
+        self.files = {}
+        urls = {}
+        page = b''
+        asset_cache_control = f"public, max-age={max_age}, immutable"
+        for name in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(name)
+            if ext not in CONTENT_TYPES:
+                continue
+            with open(os.path.join(directory, name), 'rb') as f:
+                body = f.read()
+            if name == PAGE_FILE:
+                page = body
+                continue
+            asset = StaticAsset(body, CONTENT_TYPES[ext], asset_cache_control)
+            fingerprinted = f"{stem}.{asset.digest[:12]}{ext}"
+            self.files[fingerprinted] = asset
+            urls[ASSET_URL_PREFIX + name] = ASSET_URL_PREFIX + fingerprinted
+
+        for url, fingerprinted_url in urls.items():
+            page = page.replace(f'"{url}"'.encode(), f'"{fingerprinted_url}"'.encode())
+        self.page = StaticAsset(page, CONTENT_TYPES[".html"], "no-cache")
+
+    def lookup(self, name):
+        """The asset served under a fingerprinted name, or None"""
+        return self.files.get(name)
+
+    def stats(self):
+        return {
+            "brotli": brotli is not None,
+            "page": self.page.stats(),
+            "assets": {name: asset.stats() for name, asset in self.files.items()},
+        }
+
+
+app_assets = AppAssets()
@@ -0,0 +1,349 @@
+"""
+Asyncio serving mode for the Python wrapper.
+
+Serves the same routes as the Flask app in main.py, but proxies /ask with a
+non-blocking upstream client so one process can hold hundreds of slow /ask
+requests open at once. Run it with:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import os
+import asyncio
+import contextlib
+
+import httpx
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import upstream
+import response_cache
+from response_cache import ask_cache
+import single_flight
+from single_flight import coalescer
+import supervisor
+from supervisor import nestjs
+from log_pump import nestjs_logs
+from app_assets import app_assets
+
+# Upper bound on concurrent upstream connections held by the async client
+ASGI_UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("ASGI_UPSTREAM_MAX_CONNECTIONS", "512"))
+
+client = None
+in_flight = 0
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Start NestJS and open the shared upstream client; stop both on shutdown
+    Uvicorn keeps its own signal handling, so shutdown drains in-flight requests before this
+    stops NestJS.
+    """
+    global client
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=ASGI_UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=upstream.UPSTREAM_POOL_SIZE
+        ),
+        timeout=httpx.Timeout(
+            connect=upstream.UPSTREAM_CONNECT_TIMEOUT,
+            read=upstream.UPSTREAM_READ_TIMEOUT,
+            write=upstream.UPSTREAM_READ_TIMEOUT,
+            pool=None
+        ),
+        follow_redirects=False
+    )
+    await run_in_threadpool(nestjs.start)
+    try:
+        yield
+    finally:
+        await client.aclose()
+        await run_in_threadpool(nestjs.stop)
+
+
+async def health(request):
+    """Health check endpoint for the asyncio server"""
+    return JSONResponse({
+        "status": "ok",
+        "message": "ASGI server is running",
+        "live": True,
+        "ready": nestjs.ready,
+        "nestjs": nestjs.status(),
+        "upstream_pool": {
+            "maxsize": ASGI_UPSTREAM_MAX_CONNECTIONS,
+            "keepalive": upstream.UPSTREAM_POOL_SIZE,
+            "in_flight": in_flight
+        },
+        "ask_cache": ask_cache.stats(),
+        "single_flight": coalescer.stats(),
+        "nestjs_logs": nestjs_logs.stats(),
+        "db_pools": {
+            str(worker.port or worker.url): await db_pool_stats(worker.url) if worker.ready else {"error": "NestJS worker is not ready"}
+            for worker in nestjs.workers
+        }
+    })
+
+
+async def health_ready(request):
+    """Readiness probe: 200 once NestJS answers requests, 503 before"""
+    if nestjs.ready:
+        return JSONResponse({"status": "ready"})
+    return JSONResponse({"status": "not ready", "state": nestjs.status()["state"]}, status_code=503)
+
+
+async def nestjs_log_records(request):
+    """Recent NestJS log records, newest first; filter with limit, level, context, worker, since and q"""
+    return JSONResponse(nestjs_logs.query(request.query_params))
+
+
+async def acquire_worker(timeout):
+    """The least busy ready NestJS worker, waiting for one without holding a thread"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        worker = nestjs.acquire()
+        if worker is not None or loop.time() >= deadline:
+            return worker
+        await asyncio.sleep(supervisor.READY_POLL_INTERVAL)
+
+
+async def db_pool_stats(base_url):
+    """Database connection pool utilization and wait times reported by a NestJS worker"""
+    try:
+        resp = await client.get(
+            f"{base_url}{upstream.DB_POOL_STATS_PATH}",
+            timeout=upstream.DB_POOL_STATS_TIMEOUT
+        )
+        resp.raise_for_status()
+        return resp.json()
+    except (httpx.HTTPError, ValueError) as e:
+        return {"error": str(e)}
+
+
+async def app_route(request):
+    """Serve the actual application interface"""
+    return asset_response(app_assets.page, request)
+
+
+async def app_asset(request):
+    """Serve a fingerprinted CSS or JS file of the application interface"""
+    asset = app_assets.lookup(request.path_params['name'])
+    if asset is None:
+        return PlainTextResponse("Not found", status_code=404)
+    return asset_response(asset, request)
+
+
+def asset_response(asset, request):
+    """Precompressed asset in the best coding the client accepts, or 304 if its copy is current"""
+    status, headers, body = asset.respond(request.headers)
+    return Response(body, status_code=status, headers=headers)
+
+
+async def root_index(request):
+    """Redirect to /app which serves the main HTML application"""
+    return RedirectResponse('/app', status_code=302)
+
+
+async def proxy_to_nestjs(request):
+    """Proxy API requests to the NestJS server without blocking the event loop"""
+    global in_flight
+    path = request.path_params.get('path', '')
+
+    if request.method == 'OPTIONS':
+        # Handle preflight request
+        return Response("", headers={
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE',
+            'Access-Control-Allow-Headers': 'Content-Type'
+        })
+
+    target = f'/ask/{path}' if path else '/ask'
+    if request.url.query:
+        target = f'{target}?{request.url.query}'
+
+    # Answer repeated questions from the response cache
+    content = request.stream() if request.method in ('POST', 'PUT', 'DELETE') else None
+    cache_key = cache_verifier = None
+    flight = None
+    result_format = upstream.result_format(request.headers, request.query_params)
+    if request.method == 'POST' and path in response_cache.CACHED_PATHS and (response_cache.ASK_CACHE_ENABLED or single_flight.SINGLE_FLIGHT_ENABLED):
+        content = await request.body()
+        key_format = response_cache.key_format(path, result_format)
+        bypass = response_cache.should_bypass(request.headers)
+        if response_cache.ASK_CACHE_ENABLED:
+            cache_key, cache_verifier = response_cache.request_key(content, key_format)
+            if cache_key and bypass:
+                ask_cache.record_bypass()
+            elif cache_key:
+                entry = ask_cache.get(cache_key, cache_verifier)
+                if entry:
+                    print(f"Serving cached response for {target}")
+                    return replayed_response(entry, 'HIT')
+
+        # Let identical concurrent questions share one upstream round trip; waiting blocks, so do it off the loop
+        flight_key = coalescer.key(content, key_format) if single_flight.SINGLE_FLIGHT_ENABLED and not bypass else None
+        if flight_key:
+            flight, shared = await run_in_threadpool(coalescer.begin, flight_key)
+            if shared:
+                print(f"Serving coalesced response for {target}")
+                return replayed_response(shared, 'COALESCED')
+
+    # Least outstanding requests across the ready workers; during startup wait for one
+    worker = await acquire_worker(supervisor.NESTJS_REQUEST_READY_WAIT)
+    if worker is None:
+        if flight:
+            await run_in_threadpool(coalescer.finish, flight)
+        return JSONResponse(
+            {"error": "API server is starting, try again shortly", "nestjs": nestjs.status()["state"]},
+            status_code=503,
+            headers={'Retry-After': '1'}
+        )
+    nestjs_url = f'{worker.url}{target}'
+    print(f"Proxying request to {nestjs_url}")
+
+    in_flight += 1
+    try:
+        upstream_request = client.build_request(
+            request.method,
+            nestjs_url,
+            headers=upstream.forwardable_headers(request.headers),
+            content=content
+        )
+        resp = await client.send(upstream_request, stream=True)
+        if request.method == 'POST' and path in ('', *upstream.EVENT_STREAM_PATHS) and resp.status_code == 200:
+            nestjs.record_answer()
+    except httpx.HTTPError as e:
+        in_flight -= 1
+        # A worker that refuses connections counts as failing its health check
+        nestjs.release(worker, failed=isinstance(e, httpx.ConnectError))
+        if flight:
+            await run_in_threadpool(coalescer.finish, flight)
+        print(f"Request error proxying to NestJS: {e}")
+        return JSONResponse({"error": f"API connection error: {str(e)}"}, status_code=502)
+    except Exception as e:
+        in_flight -= 1
+        nestjs.release(worker)
+        if flight:
+            await run_in_threadpool(coalescer.finish, flight)
+        print(f"Error proxying to NestJS: {e}")
+        return JSONResponse({"error": f"API server error: {str(e)}"}, status_code=500)
+
+    released = False
+
+    async def close_upstream():
+        # Runs once, whether the body was sent, failed midway or never started
+        global in_flight
+        nonlocal released
+        if released:
+            return
+        released = True
+        in_flight -= 1
+        try:
+            await resp.aclose()
+        finally:
+            nestjs.release(worker)
+            if flight:
+                await run_in_threadpool(coalescer.finish, flight)
+
+    headers = {
+        key: value for key, value in resp.headers.items()
+        if key.lower() not in upstream.HOP_BY_HOP_HEADERS
+    }
+    if cache_key:
+        headers['X-Cache'] = 'MISS'
+    # Keep a copy of the answer for the cache and any coalesced requests while it streams past
+    on_complete = None
+    if (cache_key and resp.status_code == 200) or flight:
+        def on_complete(data):
+            if cache_key:
+                response_cache.cache_response(cache_key, cache_verifier, resp.status_code, resp.headers, data)
+            if flight:
+                flight.result = single_flight.FlightResult(resp.status_code, resp.headers, data)
+    # aiter_raw() passes the body through undecoded, so length and encoding still hold
+    return UpstreamResponse(
+        collect_while_streaming(resp.aiter_raw(), on_complete, close_upstream),
+        close_upstream,
+        status_code=resp.status_code,
+        headers=headers
+    )
+
+
+def replayed_response(entry, cache_status):
+    """Build a response from a cached or shared /ask answer"""
+    return Response(entry.body, status_code=entry.status, headers={**entry.headers, 'X-Cache': cache_status})
+
+
+async def collect_while_streaming(chunks, on_complete, on_close):
+    """Pass the body through, then call on_close however the stream ends
+    on_complete gets the whole body, before on_close, only if every chunk arrived and was sent;
+    a body cut off upstream or by the client never reaches the cache or coalesced requests.
+    """
+    kept = [] if on_complete else None
+    size = 0
+    try:
+        async for chunk in chunks:
+            if kept is not None:
+                size += len(chunk)
+                if size > response_cache.ASK_CACHE_MAX_ENTRY_BYTES:
+                    kept = None
+                else:
+                    kept.append(chunk)
+            yield chunk
+        if kept is not None:
+            on_complete(b''.join(kept))
+    finally:
+        await on_close()
+
+
+class UpstreamResponse(StreamingResponse):
+    """Streaming response that also runs on_close when its body was never iterated
+    An async generator that has not started can't run its finally block, which happens when
+    the client goes away before the headers are sent.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+async def restart_nestjs(request):
+    """Endpoint to restart the NestJS server"""
+    success = await run_in_threadpool(nestjs.restart)
+
+    if success:
+        return JSONResponse({"status": "ok", "message": "NestJS server restarted"})
+    else:
+        return JSONResponse({"status": "error", "message": "Failed to restart NestJS server"}, status_code=500)
+
+
+async def catch_all(request):
+    """Handle any other URLs by redirecting to index"""
+    if not request.path_params['path'].startswith('ask'):
+        return RedirectResponse('/', status_code=302)
+    return PlainTextResponse("Not found", status_code=404)
+
+
+PROXY_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+
+app = Starlette(
+    routes=[
+        Route('/health', health),
+        Route('/health/ready', health_ready),
+        Route('/logs/nestjs', nestjs_log_records),
+        Route('/app', app_route),
+        Route('/app/assets/{name}', app_asset),
+        Route('/', root_index),
+        Route('/ask', proxy_to_nestjs, methods=PROXY_METHODS),
+        Route('/ask/{path:path}', proxy_to_nestjs, methods=PROXY_METHODS),
+        Route('/restart', restart_nestjs),
+        Route('/{path:path}', catch_all),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,782 @@
+// Initialize animations when the page loads
+document.addEventListener('DOMContentLoaded', function() {
+  // Header animations
+  anime({
+    targets: '.header h1',
+    opacity: [0, 1],
+    translateY: [20, 0],
+    easing: 'easeOutCubic',
+    duration: 800,
+    delay: 300
+  });
+
+  anime({
+    targets: '.header-subtitle',
+    opacity: [0, 1],
+    translateY: [20, 0],
+    easing: 'easeOutCubic',
+    duration: 800,
+    delay: 500
+  });
+
+  // Content animations
+  anime({
+    targets: '.row',
+    opacity: [0, 1],
+    translateY: [30, 0],
+    easing: 'easeOutCubic',
+    duration: 1000,
+    delay: 700
+  });
+
+  // Card animations - staggered
+  anime({
+    targets: '.card',
+    opacity: [0, 1],
+    translateY: [40, 0],
+    easing: 'easeOutCubic',
+    duration: 800,
+    delay: anime.stagger(200, {start: 900})
+  });
+
+  // Suggestion animations
+  anime({
+    targets: '.suggested-query',
+    opacity: [0, 1],
+    translateY: [10, 0],
+    scale: [0.9, 1],
+    easing: 'easeOutElastic(1, .6)',
+    duration: 1200,
+    delay: anime.stagger(100, {start: 1200})
+  });
+});
+
+// Function to show loading overlay with animation
+function showLoadingOverlay() {
+  const overlay = document.getElementById('loading-overlay');
+  overlay.classList.add('visible');
+
+  // Reset and animate progress bar
+  const progressBar = document.getElementById('loading-progress-bar');
+  progressBar.style.width = '0%';
+
+  // Progress animation (takes 20 seconds to reach 90%, then pauses)
+  anime({
+    targets: '#loading-progress-bar',
+    width: ['0%', '90%'],
+    easing: 'easeInOutQuad',
+    duration: 20000,
+    complete: function() {
+      // After reaching 90%, pulse to show it's still working
+      anime({
+        targets: '#loading-progress-bar',
+        opacity: [0.7, 1],
+        easing: 'easeInOutSine',
+        direction: 'alternate',
+        loop: true,
+        duration: 800
+      });
+    }
+  });
+}
+
+// Function to hide loading overlay
+function hideLoadingOverlay() {
+  const overlay = document.getElementById('loading-overlay');
+
+  // Complete the progress bar first
+  anime({
+    targets: '#loading-progress-bar',
+    width: '100%',
+    easing: 'easeOutCirc',
+    duration: 500,
+    complete: function() {
+      // Then fade out the overlay
+      anime({
+        targets: '#loading-overlay',
+        opacity: 0,
+        duration: 500,
+        easing: 'easeOutQuad',
+        complete: function() {
+          overlay.classList.remove('visible');
+        }
+      });
+    }
+  });
+}
+
+// Animate elements when they appear
+function animateDataRows() {
+  anime({
+    targets: '.data-row-card',
+    opacity: [0, 1],
+    translateY: [20, 0],
+    easing: 'easeOutCubic',
+    duration: 800,
+    delay: anime.stagger(100)
+  });
+}
+
+// Database type toggle logic
+document.getElementById('db-type').addEventListener('change', function() {
+  const type = this.value;
+  if (type === 'oracle') {
+    document.getElementById('oracle-fields').style.display = 'block';
+    document.getElementById('standard-fields').style.display = 'none';
+  } else {
+    document.getElementById('oracle-fields').style.display = 'none';
+    document.getElementById('standard-fields').style.display = 'block';
+
+    // Set default ports
+    let defaultPort = 5432; // PostgreSQL
+    if (type === 'mysql') defaultPort = 3306;
+    if (type === 'mssql') defaultPort = 1433;
+    document.getElementById('db-port').value = defaultPort;
+  }
+});
+
+// Tab switching
+document.querySelectorAll('.tab-item').forEach(tab => {
+  tab.addEventListener('click', function() {
+    // Make all tabs inactive
+    document.querySelectorAll('.tab-item').forEach(t => t.classList.remove('active'));
+    // Hide all tab contents
+    document.querySelectorAll('.tab-content').forEach(c => c.style.display = 'none');
+
+    // Make the clicked tab active
+    this.classList.add('active');
+    // Show the corresponding content
+    document.getElementById('tab-' + this.dataset.tab).style.display = 'block';
+  });
+});
+
+// Handle database connection form submission
+document.getElementById('db-connection-form').addEventListener('submit', function(e) {
+  e.preventDefault();
+
+  const dbType = document.getElementById('db-type').value;
+  const username = document.getElementById('db-username').value;
+  const password = document.getElementById('db-password').value;
+  const connectBtn = document.getElementById('connect-button');
+
+  let connectionDetails = {
+    type: dbType,
+    username,
+    password
+  };
+
+  if (dbType === 'oracle') {
+    connectionDetails.connectionString = document.getElementById('db-connection-string').value;
+  } else {
+    const host = document.getElementById('db-host').value;
+    const port = document.getElementById('db-port').value;
+    connectionDetails.host = host;
+    connectionDetails.port = parseInt(port);
+    connectionDetails.database = document.getElementById('db-name').value;
+  }
+
+  const statusEl = document.getElementById('connection-status');
+  statusEl.textContent = 'Connecting...';
+  statusEl.className = 'tag loading-tag';
+
+  // Disable the connect button and animate it
+  connectBtn.disabled = true;
+  connectBtn.innerHTML = '<span class="loader"></span>Connecting...';
+
+  // Log the connection details for debugging
+  console.log('Sending connection details to API:', connectionDetails);
+
+  // Call the API to test connection
+  fetch('/ask/test-connection', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify(connectionDetails)
+  })
+  .then(response => {
+    console.log('Connection test response status:', response.status);
+    return response.json();
+  })
+  .then(data => {
+    console.log('Connection test response data:', data);
+    if (data.success) {
+      statusEl.textContent = 'Connected';
+      statusEl.className = 'tag tag-success';
+
+      // Add success animation to the connection card
+      anime({
+        targets: '#connection-card',
+        scale: [1, 1.02, 1],
+        boxShadow: [
+          '0 10px 30px -5px rgba(0, 0, 0, 0.3)',
+          '0 15px 40px -5px rgba(12, 206, 107, 0.4)',
+          '0 10px 30px -5px rgba(0, 0, 0, 0.3)'
+        ],
+        duration: 1000,
+        easing: 'easeOutElastic(1, .6)'
+      });
+
+      // Enable prompt textarea and submit button with animation
+      document.getElementById('prompt').disabled = false;
+      document.getElementById('submit-query').disabled = false;
+
+      anime({
+        targets: '#prompt',
+        backgroundColor: [
+          'rgba(23, 32, 51, 1)',
+          'rgba(12, 206, 107, 0.1)',
+          'rgba(23, 32, 51, 1)'
+        ],
+        borderColor: [
+          'rgba(51, 65, 85, 1)',
+          'rgba(12, 206, 107, 0.5)',
+          'rgba(51, 65, 85, 1)'
+        ],
+        duration: 1500,
+        easing: 'easeOutCubic'
+      });
+
+      // Store connection details
+      window.connectionDetails = connectionDetails;
+    } else {
+      statusEl.textContent = 'Connection Failed';
+      statusEl.className = 'tag tag-error';
+      alert('Failed to connect: ' + data.message);
+
+      // Shake animation for error
+      anime({
+        targets: '#connection-card',
+        translateX: [0, -10, 10, -10, 10, 0],
+        duration: 600,
+        easing: 'easeInOutCubic'
+      });
+    }
+
+    // Reset the button
+    connectBtn.disabled = false;
+    connectBtn.textContent = 'Connect to Database';
+  })
+  .catch(error => {
+    statusEl.textContent = 'Connection Error';
+    statusEl.className = 'tag tag-error';
+    alert('Error connecting to database: ' + error.message);
+
+    // Reset the button
+    connectBtn.disabled = false;
+    connectBtn.textContent = 'Connect to Database';
+
+    // Shake animation for error
+    anime({
+      targets: '#connection-card',
+      translateX: [0, -10, 10, -10, 10, 0],
+      duration: 600,
+      easing: 'easeInOutCubic'
+    });
+  });
+});
+
+// Fetch suggested queries from API
+console.log('Fetching suggestions from API');
+fetch('/ask/suggestions')
+  .then(response => {
+    console.log('Suggestions API response status:', response.status);
+    return response.json();
+  })
+  .then(data => {
+    console.log('Received suggestions data:', data);
+    if (data.suggestedPrompts && data.suggestedPrompts.length > 0) {
+      const suggestionsHtml = data.suggestedPrompts.map(prompt => 
+        `<span class="suggested-query">${prompt}</span>`
+      ).join('');
+
+      document.getElementById('suggested-queries').innerHTML = `
+        <div><strong>Suggested queries to try:</strong></div>
+        <div style="margin-top: 8px;">${suggestionsHtml}</div>
+      `;
+
+      // Add event listeners
+      document.querySelectorAll('.suggested-query').forEach(query => {
+        query.addEventListener('click', function() {
+          document.getElementById('prompt').value = this.textContent;
+        });
+      });
+    }
+  })
+  .catch(error => {
+    console.error('Error fetching suggestions:', error);
+    // Still add event listeners to default suggestions
+    document.querySelectorAll('.suggested-query').forEach(query => {
+      query.addEventListener('click', function() {
+        document.getElementById('prompt').value = this.textContent;
+      });
+    });
+  });
+
+// Add animation to suggested query clicks
+document.addEventListener('click', function(e) {
+  if (e.target.classList.contains('suggested-query')) {
+    // Set value in the prompt field
+    document.getElementById('prompt').value = e.target.textContent;
+
+    // Animate the clicked suggestion
+    anime({
+      targets: e.target,
+      scale: [1, 1.1, 1],
+      backgroundColor: [
+        'rgba(67, 97, 238, 0.08)',
+        'rgba(67, 97, 238, 0.2)',
+        'rgba(67, 97, 238, 0.08)'
+      ],
+      duration: 600,
+      easing: 'easeOutCubic'
+    });
+
+    // Also animate the textarea
+    anime({
+      targets: '#prompt',
+      borderColor: [
+        'rgba(51, 65, 85, 1)',
+        'rgba(67, 97, 238, 0.5)',
+        'rgba(51, 65, 85, 1)'
+      ],
+      duration: 800,
+      easing: 'easeOutCubic'
+    });
+  }
+});
+
+// Stage reached after each progress event of /ask/stream, shown in the loading overlay
+const STAGE_LABELS = {
+  connected: 'Reading the database schema',
+  schema: 'Generating SQL',
+  sql: 'Running queries',
+  executed: 'Summarizing the results',
+  summary: 'Suggesting follow-up queries'
+};
+
+// POST a question to /ask/stream and call onEvent with each Server-Sent Event as it arrives
+function streamAsk(requestData, onEvent) {
+  return fetch('/ask/stream', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify(requestData)
+  })
+  .then(response => {
+    if (!response.ok || !response.body) {
+      throw new Error(`Streaming request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const read = () => reader.read().then(({ done, value }) => {
+      if (done) {
+        return;
+      }
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events end with a blank line; keep any partial event for the next chunk
+      let end;
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const block = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+
+        let event = 'message';
+        const data = [];
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trimStart());
+          }
+        });
+        if (data.length > 0) {
+          onEvent(event, JSON.parse(data.join('\n')));
+        }
+      }
+      return read();
+    });
+    return read();
+  });
+}
+
+// Show the results card with an animation the first time
+function showResultsCard() {
+  const resultsCard = document.getElementById('query-results');
+  if (resultsCard.style.display === 'none') {
+    resultsCard.style.display = 'block';
+    resultsCard.style.opacity = 0;
+    anime({
+      targets: '#query-results',
+      opacity: [0, 1],
+      translateY: [20, 0],
+      easing: 'easeOutCubic',
+      duration: 600
+    });
+  }
+}
+
+// Populate summary tab; animate unless the text was already shown while it streamed in
+function renderSummary(result, animate = true) {
+  document.getElementById('result-summary').innerHTML = `<p>${result}</p>`;
+  if (!animate) {
+    return;
+  }
+
+  // Animate summary content
+  anime({
+    targets: '#result-summary p',
+    opacity: [0, 1],
+    translateY: [10, 0],
+    easing: 'easeOutCubic',
+    duration: 600
+  });
+}
+
+// Populate data tab with a more readable format
+function renderData(data) {
+  if (data.rawResults && data.rawResults.length > 0) {
+    const dataContainer = document.createElement('div');
+    dataContainer.className = 'data-rows-container';
+
+    // For each row of data, create a card-like structure
+    data.rawResults.forEach((row, rowIndex) => {
+      const rowCard = document.createElement('div');
+      rowCard.className = 'data-row-card';
+
+      // Create a header for the row
+      const rowHeader = document.createElement('div');
+      rowHeader.className = 'data-row-header';
+      rowHeader.innerHTML = `<strong>Row ${rowIndex + 1}</strong>`;
+      rowCard.appendChild(rowHeader);
+
+      // Create a table for this row's data
+      const rowTable = document.createElement('table');
+      rowTable.className = 'data-row-table';
+
+      // Add each field as a row in this table (column orientation)
+      Object.entries(row).forEach(([key, value]) => {
+        const tr = document.createElement('tr');
+
+        // Key cell
+        const keyCell = document.createElement('th');
+        keyCell.textContent = key;
+        keyCell.style.width = '200px';
+        tr.appendChild(keyCell);
+
+        // Value cell with intelligent formatting
+        const valueCell = document.createElement('td');
+
+        if (value === null) {
+          valueCell.innerHTML = '<span class="null-value">NULL</span>';
+        } else if (typeof value === 'object') {
+          // Handle JSON objects recursively
+          if (Object.keys(value).length === 0) {
+            valueCell.innerHTML = '<span class="empty-object">{}</span>';
+          } else {
+            const jsonTable = document.createElement('table');
+            jsonTable.className = 'nested-json-table';
+
+            Object.entries(value).forEach(([nestedKey, nestedValue]) => {
+              const jsonRow = document.createElement('tr');
+
+              const nestedKeyCell = document.createElement('th');
+              nestedKeyCell.textContent = nestedKey;
+              jsonRow.appendChild(nestedKeyCell);
+
+              const nestedValueCell = document.createElement('td');
+              nestedValueCell.textContent = nestedValue === null ? 'NULL' : 
+                            typeof nestedValue === 'object' ? JSON.stringify(nestedValue) : nestedValue;
+              jsonRow.appendChild(nestedValueCell);
+
+              jsonTable.appendChild(jsonRow);
+            });
+
+            valueCell.appendChild(jsonTable);
+          }
+        } else {
+          // Simple values
+          valueCell.textContent = value;
+        }
+
+        tr.appendChild(valueCell);
+        rowTable.appendChild(tr);
+      });
+
+      rowCard.appendChild(rowTable);
+      dataContainer.appendChild(rowCard);
+    });
+
+    // Add a style block for our new components
+    const styleBlock = document.createElement('style');
+    styleBlock.textContent = `
+      .data-rows-container {
+        display: flex;
+        flex-direction: column;
+        gap: 20px;
+        margin-bottom: 20px;
+      }
+      .data-row-card {
+        background-color: var(--surface-color);
+        border: 1px solid var(--border-color);
+        border-radius: 4px;
+        overflow: hidden;
+      }
+      .data-row-header {
+        background-color: rgba(24, 144, 255, 0.1);
+        padding: 8px 16px;
+        border-bottom: 1px solid var(--border-color);
+      }
+      .data-row-table {
+        width: 100%;
+        border-collapse: collapse;
+      }
+      .data-row-table th {
+        text-align: left;
+        padding: 8px 16px;
+        border-right: 1px solid var(--border-color);
+        border-bottom: 1px solid var(--border-color);
+        background-color: var(--background-color);
+        font-weight: normal;
+        color: var(--text-secondary-color);
+      }
+      .data-row-table td {
+        padding: 8px 16px;
+        border-bottom: 1px solid var(--border-color);
+        word-break: break-word;
+      }
+      .data-row-table tr:last-child th,
+      .data-row-table tr:last-child td {
+        border-bottom: none;
+      }
+      .nested-json-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: -4px;
+      }
+      .nested-json-table th {
+        width: 120px;
+        font-size: 12px;
+        background-color: rgba(0, 0, 0, 0.1);
+      }
+      .nested-json-table td {
+        font-size: 12px;
+      }
+      .null-value {
+        color: #b37feb;
+        font-style: italic;
+      }
+      .empty-object {
+        color: #d9d9d9;
+        font-style: italic;
+      }
+    `;
+
+    document.getElementById('result-data').innerHTML = '';
+    document.getElementById('result-data').appendChild(styleBlock);
+    document.getElementById('result-data').appendChild(dataContainer);
+    renderResultPager(data);
+  } else {
+    document.getElementById('result-data').innerHTML = '<p>No tabular data returned</p>';
+  }
+}
+
+// Buttons fetching the next page of each result that has more rows than shown
+function renderResultPager(data) {
+  if (!data.resultHandle || !data.resultPages) {
+    return;
+  }
+
+  data.resultPages.forEach(page => {
+    if (page.truncated) {
+      const note = document.createElement('p');
+      note.textContent = `Query ${page.query + 1} was stopped at ${page.totalRows} rows by the row or byte limit.`;
+      document.getElementById('result-data').appendChild(note);
+    }
+    if (page.nextOffset === null) {
+      return;
+    }
+    const button = document.createElement('button');
+    button.className = 'btn btn-primary';
+    button.style.marginRight = '8px';
+    button.textContent = `Load more rows of query ${page.query + 1} (${page.nextOffset} of ${page.totalRows} shown)`;
+    button.addEventListener('click', () => {
+      button.disabled = true;
+      fetch(`/ask/results/${data.resultHandle}?query=${page.query}&offset=${page.nextOffset}`)
+        .then(response => {
+          if (!response.ok) {
+            throw new Error(response.status === 404 ? 'These results have expired; ask the question again' : `HTTP ${response.status}`);
+          }
+          return response.json();
+        })
+        .then(next => {
+          data.rawResults[page.query].push(...next.rows);
+          page.nextOffset = next.nextOffset;
+          renderData(data);
+        })
+        .catch(error => {
+          button.disabled = false;
+          button.textContent = error.message;
+        });
+    });
+    document.getElementById('result-data').appendChild(button);
+  });
+}
+
+// Populate SQL queries tab
+function renderQueries(executedQueries) {
+  if (executedQueries && executedQueries.length > 0) {
+    const queriesHtml = executedQueries.map((query, index) => `
+      <div style="margin-bottom: 16px;">
+        <strong>Query ${index + 1}:</strong>
+        <pre class="pre-code">${query}</pre>
+      </div>
+    `).join('');
+    document.getElementById('executed-queries').innerHTML = queriesHtml;
+  } else {
+    document.getElementById('executed-queries').innerHTML = '<p>No SQL queries were executed</p>';
+  }
+}
+
+// Update suggested queries if available
+function renderSuggestions(suggestedPrompts) {
+  if (suggestedPrompts && suggestedPrompts.length > 0) {
+    const suggestionsHtml = suggestedPrompts.map(prompt => 
+      `<span class="suggested-query">${prompt}</span>`
+    ).join('');
+    document.getElementById('suggested-queries').innerHTML = `
+      <div><strong>Suggested follow-up queries:</strong></div>
+      <div style="margin-top: 8px;">${suggestionsHtml}</div>
+    `;
+
+    // Reattach event listeners to new suggested queries
+    document.querySelectorAll('.suggested-query').forEach(query => {
+      query.addEventListener('click', function() {
+        document.getElementById('prompt').value = this.textContent;
+      });
+    });
+  }
+}
+
+// Handle query submission
+document.getElementById('query-form').addEventListener('submit', function(e) {
+  e.preventDefault();
+
+  if (!window.connectionDetails) {
+    alert('Please connect to a database first');
+    return;
+  }
+
+  const prompt = document.getElementById('prompt').value;
+  const submitBtn = document.getElementById('submit-query');
+
+  // Show loading state
+  submitBtn.disabled = true;
+  submitBtn.innerHTML = '<span class="loader"></span>Processing...';
+
+  // Show the loading overlay until the summary arrives
+  showLoadingOverlay();
+  const loadingText = document.querySelector('#loading-overlay .loading-text');
+  loadingText.textContent = 'Connecting to the database';
+
+  // Prepare request data
+  const requestData = {
+    ...window.connectionDetails,
+    prompt
+  };
+
+  // The answer is assembled from the progress events, each stage shown as soon as it arrives
+  const data = { result: '', executedQueries: [], rawResults: [], suggestedPrompts: [] };
+  const draftQueries = [];
+  let draftSummary = '';
+  let finished = false;
+  let overlayVisible = true;
+  const hideOverlayOnce = () => {
+    if (overlayVisible) {
+      overlayVisible = false;
+      hideLoadingOverlay();
+    }
+  };
+
+  // Call the API
+  streamAsk(requestData, (event, payload) => {
+    if (STAGE_LABELS[event]) {
+      loadingText.textContent = `${STAGE_LABELS[event]} (${(payload.elapsedMs / 1000).toFixed(1)}s)`;
+    }
+
+    if (event === 'sql_delta') {
+      // SQL as the model writes it, replaced by the checked queries of the sql event
+      draftQueries[payload.index] = (draftQueries[payload.index] || '') + payload.text;
+      showResultsCard();
+      renderQueries(draftQueries);
+    } else if (event === 'sql') {
+      // The generated SQL is known long before the results
+      data.executedQueries = payload.queries;
+      data.rawResults = payload.queries.map(() => []);
+      showResultsCard();
+      renderQueries(data.executedQueries);
+    } else if (event === 'rows') {
+      data.rawResults[payload.index].push(...payload.rows);
+    } else if (event === 'executed') {
+      data.resultHandle = payload.resultHandle;
+      data.resultPages = payload.resultPages;
+      renderData(data);
+    } else if (event === 'summary_delta') {
+      // The answer text appears from its first token on
+      hideOverlayOnce();
+      draftSummary += payload.text;
+      showResultsCard();
+      renderSummary(draftSummary, draftSummary === payload.text);
+    } else if (event === 'summary') {
+      hideOverlayOnce();
+      data.result = payload.result;
+      showResultsCard();
+      renderSummary(data.result, !draftSummary);
+    } else if (event === 'suggestions') {
+      renderSuggestions(payload.suggestedPrompts);
+    } else if (event === 'done') {
+      finished = true;
+    } else if (event === 'error') {
+      // The question failed; show the explanation and suggestions that came with the error
+      finished = true;
+      hideOverlayOnce();
+      showResultsCard();
+      renderSummary(payload.result);
+      renderQueries(payload.executedQueries);
+      renderData(payload);
+      renderSuggestions(payload.suggestedPrompts);
+    }
+  })
+  .then(() => {
+    if (!finished) {
+      throw new Error('The connection closed before the answer was complete');
+    }
+    hideOverlayOnce();
+
+    // Reset button state
+    submitBtn.disabled = false;
+    submitBtn.textContent = 'Submit Query';
+  })
+  .catch(error => {
+    // Hide loading overlay
+    hideOverlayOnce();
+
+    alert('Error processing query: ' + error.message);
+
+    // Reset button state
+    submitBtn.disabled = false;
+    submitBtn.innerHTML = 'Submit Query';
+
+    // Error animation
+    anime({
+      targets: '#query-form',
+      translateX: [0, -10, 10, -10, 10, 0],
+      duration: 600,
+      easing: 'easeInOutCubic'
+    });
+  });
+});
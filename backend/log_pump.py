@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import time
+import threading
+import logging
+import logging.handlers
+from collections import deque
+
+# NestJS log pump settings
+NESTJS_LOG_FILE = os.environ.get("NESTJS_LOG_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "nestjs.log"))
+NESTJS_LOG_MAX_BYTES = int(os.environ.get("NESTJS_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+NESTJS_LOG_BACKUPS = int(os.environ.get("NESTJS_LOG_BACKUPS", "5"))
+NESTJS_LOG_BUFFER = int(os.environ.get("NESTJS_LOG_BUFFER", "2000"))
+# Also print the child's lines on this process's stdout, as before it was piped
+NESTJS_LOG_ECHO = os.environ.get("NESTJS_LOG_ECHO", "false").lower() in ("1", "true", "yes")
+
+# Most records the logs endpoint returns at once
+MAX_QUERY_LIMIT = 1000
+
+# Levels in order of severity, as printed by the Nest ConsoleLogger
+LEVELS = ("VERBOSE", "DEBUG", "LOG", "WARN", "ERROR", "FATAL")
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+# [Nest] 1234  - 10/18/2026, 8:05:12 AM     LOG [RoutesResolver] AskController {/ask}: +3ms
+NEST_LINE = re.compile(
+    r'^\[Nest\]\s+(?P<pid>\d+)\s+-\s+(?P<timestamp>.+?)\s+(?P<level>' + '|'.join(LEVELS) + r')\s+'
+    r'(?:\[(?P<context>[^\]]+)\]\s+)?(?P<message>.*?)(?:\s+\+(?P<delta>\d+)ms)?$'
+)
+
+
+def parse_line(line, stream="stdout"):
+    """Turn one line of NestJS output into a structured record
+
+    Lines from the Nest Logger keep their level, context and the "+Nms" delta
+    since the previous log line; anything else (console.log, stack traces)
+    becomes a LOG or ERROR record depending on the stream it came from.
+    """
+    line = ANSI_ESCAPE.sub('', line).rstrip('\r\n')
+    match = NEST_LINE.match(line)
+    if match is None:
+        return {
+            "level": "ERROR" if stream == "stderr" else "LOG",
+            "context": None,
+            "message": line,
+            "delta_ms": None,
+            "nest_timestamp": None,
+        }
+    delta = match.group("delta")
+    return {
+        "level": match.group("level"),
+        "context": match.group("context"),
+        "message": match.group("message"),
+        "delta_ms": int(delta) if delta is not None else None,
+        "nest_timestamp": match.group("timestamp"),
+    }
+
+
+class LogPump:
+    """Drains the stdout and stderr pipes of NestJS workers into a rotated file and a ring buffer
+
+    Each pipe gets its own reader thread, so a worker never blocks on a full
+    pipe however much it logs, whatever the proxy is doing.
+    """
+
+    def __init__(self, path=NESTJS_LOG_FILE, max_bytes=NESTJS_LOG_MAX_BYTES, backups=NESTJS_LOG_BACKUPS,
+                 buffer_size=NESTJS_LOG_BUFFER, echo=NESTJS_LOG_ECHO):
+        self.path = path
+        self.echo = echo
+        self._records = deque(maxlen=max(1, buffer_size))
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._stats = {"lines": 0, "bytes": 0, **{level.lower(): 0 for level in LEVELS}}
+        self._file = self._open_file(path, max_bytes, backups)
+
+    def attach(self, process, worker=None, started_at=None):
+        """Start draining a child's pipes; the threads end when the child closes them"""
+        started_at = started_at if started_at is not None else time.monotonic()
+        for stream in ("stdout", "stderr"):
+            pipe = getattr(process, stream, None)
+            if pipe is None:
+                continue
+            threading.Thread(
+                target=self._drain,
+                args=(pipe, stream, worker, process.pid, started_at),
+                name=f"nestjs-log-{worker}-{stream}",
+                daemon=True
+            ).start()
+
+    def recent(self, limit=100, level=None, context=None, worker=None, since=None, search=None):
+        """Newest records first, filtered by minimum level, context, worker port and sequence number"""
+        min_level = LEVELS.index(level.upper()) if level and level.upper() in LEVELS else 0
+        with self._lock:
+            records = list(self._records)
+        result = []
+        for record in reversed(records):
+            if since is not None and record["seq"] <= since:
+                break
+            if LEVELS.index(record["level"]) < min_level:
+                continue
+            if context and record["context"] != context:
+                continue
+            if worker is not None and record["worker"] != worker:
+                continue
+            if search and search.lower() not in record["message"].lower():
+                continue
+            result.append(record)
+            if len(result) >= limit:
+                break
+        return result
+
+    def query(self, args):
+        """Answer the logs endpoint from its query string (Flask or Starlette args)"""
+        def number(name, default=None):
+            try:
+                return int(args.get(name))
+            except (TypeError, ValueError):
+                return default
+
+        records = self.recent(
+            limit=min(max(number("limit", 100), 1), MAX_QUERY_LIMIT),
+            level=args.get("level"),
+            context=args.get("context"),
+            worker=number("worker"),
+            since=number("since"),
+            search=args.get("q")
+        )
+        return {"records": records, "last_seq": self._seq}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "file": self.path if self._file is not None else None,
+                "buffered": len(self._records),
+                "buffer_size": self._records.maxlen,
+                "last_seq": self._seq,
+                **self._stats,
+            }
+
+    def _open_file(self, path, max_bytes, backups):
+        if not path:
+            return None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                           encoding="utf-8", delay=True)
+        except OSError as e:
+            print(f"Error opening NestJS log file {path}: {e}")
+            return None
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        return handler
+
+    def _drain(self, pipe, stream, worker, pid, started_at):
+        try:
+            for line in pipe:
+                if line:
+                    self._record(line, stream, worker, pid, started_at)
+        except (OSError, ValueError):
+            # Pipe closed under us while the child was being replaced
+            pass
+        finally:
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def _record(self, line, stream, worker, pid, started_at):
+        if self.echo:
+            print(line, end='' if line.endswith('\n') else '\n', flush=True)
+        record = {
+            "ts": round(time.time(), 3),
+            "uptime_ms": int((time.monotonic() - started_at) * 1000),
+            "worker": worker,
+            "pid": pid,
+            "stream": stream,
+            **parse_line(line, stream),
+        }
+        with self._lock:
+            self._seq += 1
+            record = {"seq": self._seq, **record}
+            self._records.append(record)
+            self._stats["lines"] += 1
+            self._stats["bytes"] += len(line)
+            self._stats[record["level"].lower()] += 1
+        if self._file is not None:
+            # handle() takes the handler's lock, so the readers of every worker can share it
+            self._file.handle(logging.makeLogRecord({"msg": json.dumps(record)}))
+
+
+nestjs_logs = LogPump()
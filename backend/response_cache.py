@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import time
+import hmac
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+# /ask response cache settings
+ASK_CACHE_ENABLED = os.environ.get("ASK_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ASK_CACHE_TTL = float(os.environ.get("ASK_CACHE_TTL", "600"))
+ASK_CACHE_MAX_BYTES = int(os.environ.get("ASK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ASK_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("ASK_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+
+# Clients send this header to skip the cache lookup and refresh the entry
+BYPASS_HEADER = 'X-Cache-Bypass'
+
+# Response headers replayed on a cache hit
+CACHED_HEADERS = ('content-type', 'content-encoding')
+
+# POST paths under /ask whose answers are cached and coalesced: the JSON answer and its event stream
+CACHED_PATHS = ('', 'stream')
+
+# Per-process secret so password digests can't be compared across restarts
+_password_secret = secrets.token_bytes(32)
+
+
+def normalize_prompt(prompt):
+    """Trim and collapse whitespace; case and punctuation are kept, since literals in the question are case-sensitive"""
+    return re.sub(r'\s+', ' ', prompt.strip())
+
+
+def connection_fingerprint(payload):
+    """Hash of the connection details that decide which data a prompt sees, without the password"""
+    parts = [
+        str(payload.get('type') or 'oracle').lower(),
+        str(payload.get('connectionString') or ''),
+        str(payload.get('port') or ''),
+        str(payload.get('database') or ''),
+        str(payload.get('schema') or ''),
+        str(payload.get('username') or ''),
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def key_format(path, result_format):
+    """Format part of the cache and single-flight keys; event streams are kept apart from JSON answers"""
+    return 'event-stream' if path else result_format
+
+
+def request_key(body, result_format='json'):
+    """Build the cache key and password digest for a POST /ask body, or (None, None)
+
+    Answers in other result encodings than JSON rows are cached apart.
+    """
+    try:
+        payload = json.loads(body)
+    except (TypeError, ValueError):
+        return None, None
+    if not isinstance(payload, dict) or not isinstance(payload.get('prompt'), str):
+        return None, None
+
+    key = f"{connection_fingerprint(payload)}:{normalize_prompt(payload['prompt'])}"
+    if result_format != 'json':
+        key = f"{key}:{result_format}"
+    # The password never goes into the key, but a hit must come from the same password
+    verifier = hmac.new(_password_secret, str(payload.get('password') or '').encode('utf-8'), hashlib.sha256).digest()
+    return key, verifier
+
+
+def should_bypass(headers):
+    """True if the client asked to skip the cache for this request"""
+    if headers.get(BYPASS_HEADER, '').lower() in ('1', 'true', 'yes'):
+        return True
+    cache_control = headers.get('Cache-Control', '').lower()
+    return 'no-cache' in cache_control or 'no-store' in cache_control
+
+
+def last_event(body):
+    """Name and data of the last event in a Server-Sent Events body, or (None, None)"""
+    for block in reversed(body.split(b'\n\n')):
+        name = data = None
+        for line in block.split(b'\n'):
+            if line.startswith(b'event:'):
+                name = line[len(b'event:'):].strip().decode('utf-8', 'replace')
+            elif line.startswith(b'data:'):
+                data = line[len(b'data:'):].strip()
+        if name:
+            return name, data
+    return None, None
+
+
+def is_cacheable(status, headers, body):
+    """Only cache complete, successful answers without an error
+
+    An event stream counts as complete when its last event is done.
+    """
+    if status != 200 or len(body) > ASK_CACHE_MAX_ENTRY_BYTES:
+        return False
+    if headers.get('content-encoding'):
+        # Can't look inside an encoded body for errorInfo
+        return False
+    content_type = headers.get('content-type', '')
+    if 'text/event-stream' in content_type:
+        event, body = last_event(body)
+        if event != 'done':
+            return False
+    elif 'json' not in content_type:
+        return False
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and not payload.get('errorInfo')
+
+
+class CacheEntry:
+    """A cached /ask response"""
+
+    def __init__(self, verifier, status, headers, body, expires_at):
+        self.verifier = verifier
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers.items())
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a TTL and a memory budget"""
+
+    def __init__(self, ttl=ASK_CACHE_TTL, max_bytes=ASK_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypasses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key, verifier):
+        """Return a fresh entry for this key and password, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None or not hmac.compare_digest(entry.verifier, verifier):
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key, verifier, status, headers, body):
+        """Store a response, evicting least recently used entries to stay within budget"""
+        kept_headers = {k.lower(): v for k, v in headers.items() if k.lower() in CACHED_HEADERS}
+        entry = CacheEntry(verifier, status, kept_headers, body, time.monotonic() + self.ttl)
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._stats["stores"] += 1
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypasses"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current memory use"""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+ask_cache = ResponseCache()
+
+
+def cache_response(cache_key, cache_verifier, status, headers, body):
+    """Store a NestJS /ask response if it is a complete, successful answer"""
+    if is_cacheable(status, headers, body):
+        ask_cache.put(cache_key, cache_verifier, status, headers, body)
@@ -0,0 +1,327 @@
+import os
+import json
+import stat
+import time
+import hashlib
+import secrets
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import upstream
+from response_cache import CACHED_HEADERS, connection_fingerprint, normalize_prompt
+
+# Coalescing of identical concurrent POST /ask requests
+SINGLE_FLIGHT_ENABLED = os.environ.get("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", str(upstream.UPSTREAM_READ_TIMEOUT)))
+# Directory shared by all workers on this host; empty disables cross-worker coalescing
+SINGLE_FLIGHT_DIR = os.environ.get("SINGLE_FLIGHT_DIR", os.path.join(tempfile.gettempdir(), "sql-nl-single-flight"))
+SINGLE_FLIGHT_MAX_BYTES = int(os.environ.get("SINGLE_FLIGHT_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# How often followers in other workers check whether the leader is done
+POLL_INTERVAL = 0.05
+# Lock files unused for this long, and results left behind by a crashed worker, are swept
+SWEEP_AGE = 3600
+
+
+class FlightResult:
+    """A complete upstream response shared with the requests that waited for it"""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = {k.lower(): v for k, v in headers.items() if k.lower() in CACHED_HEADERS}
+        self.body = body
+
+
+class Flight:
+    """An upstream /ask request that identical requests can wait on"""
+
+    def __init__(self, key):
+        self.key = key
+        self.started_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.lock_file = None
+
+
+def _lock(path, operation):
+    """Open path and flock it, or None if that would block
+
+    Retries if the file was swept between the open and the flock, so the
+    lock held is always on the file currently at path.
+    """
+    while True:
+        f = open(path, "a+b")
+        try:
+            fcntl.flock(f, operation)
+        except BlockingIOError:
+            f.close()
+            return None
+        try:
+            if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+def _shared_secret(directory):
+    """Secret shared by the workers on this host, so passwords hash the same in each"""
+    path = os.path.join(directory, "secret")
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker may still be writing it
+        for _ in range(20):
+            with open(path, "rb") as f:
+                secret = f.read()
+            if secret:
+                return secret
+            time.sleep(POLL_INTERVAL)
+        raise RuntimeError(f"Empty single-flight secret at {path}")
+    secret = secrets.token_bytes(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secret)
+    return secret
+
+
+class SingleFlight:
+    """Lets the first of several identical concurrent requests go upstream and the rest share its response
+
+    Threads in one process wait on an in-memory flight. Workers on the same
+    host coordinate through a lock file per key in a shared directory: the
+    worker holding the lock goes upstream and writes the response next to it,
+    the others wait for the lock to be released and read that response.
+    Waiting workers hold a shared lock on a second file per key; the last of
+    them to leave, or the leader if nobody waited, removes the response.
+    """
+
+    def __init__(self, directory=SINGLE_FLIGHT_DIR, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self.directory = directory if fcntl else ""
+        self._directory_checked = False
+        self._secret = None
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+        self._stats = {"leaders": 0, "coalesced": 0, "coalesced_cross_worker": 0, "timeouts": 0}
+
+    def key(self, body, result_format='json'):
+        """Key for a POST /ask body, or None if the body isn't a question
+
+        Uses the cache's normalization, which only collapses whitespace, so
+        questions whose literals differ in case are never coalesced.
+        """
+        try:
+            payload = json.loads(body)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(payload, dict) or not isinstance(payload.get('prompt'), str):
+            return None
+
+        # Requests only share a response if they carry the same password
+        password = str(payload.get('password') or '').encode('utf-8')
+        parts = [connection_fingerprint(payload), normalize_prompt(payload['prompt']), result_format]
+        digest = hashlib.sha256(self._password_secret() + password).hexdigest()
+        return hashlib.sha256('\x1f'.join(parts + [digest]).encode('utf-8')).hexdigest()
+
+    def begin(self, key):
+        """Join the flight for key
+
+        Returns (flight, None) if this request should go upstream and call
+        finish() afterwards, or (None, result) with the shared response.
+        """
+        self._check_directory()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and time.monotonic() - flight.started_at > self.timeout:
+                # The leader never finished; don't let it hold the key
+                flight = None
+            leader = flight is None
+            if leader:
+                flight = Flight(key)
+                self._flights[key] = flight
+                self._stats["leaders"] += 1
+
+        if not leader:
+            if flight.done.wait(self.timeout) and flight.result is not None:
+                self._count("coalesced")
+                return None, flight.result
+            if not flight.done.is_set():
+                self._count("timeouts")
+            # The leader failed or timed out; go upstream ourselves
+            return Flight(key), None
+
+        if self.directory:
+            result = self._lead_across_workers(flight)
+            if result is not None:
+                self._count("coalesced_cross_worker")
+                self.finish(flight, result)
+                return None, result
+        return flight, None
+
+    def finish(self, flight, result=None):
+        """Publish the leader's response to everyone waiting and release the key"""
+        if result is not None:
+            flight.result = result
+        if flight.done.is_set():
+            return
+        if flight.result is not None and len(flight.result.body) > SINGLE_FLIGHT_MAX_BYTES:
+            flight.result = None
+        if flight.lock_file is not None:
+            try:
+                if flight.result is not None:
+                    self._write_result(flight.key, flight.result)
+            finally:
+                fcntl.flock(flight.lock_file, fcntl.LOCK_UN)
+                flight.lock_file.close()
+                flight.lock_file = None
+                self._leave(flight.key, _lock(self._path(flight.key, "wait"), fcntl.LOCK_SH))
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.done.set()
+
+    def stats(self):
+        """Leader/follower counters"""
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": len(self._flights),
+                "cross_worker": bool(self.directory),
+            }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _check_directory(self):
+        """Create the shared directory, and stop using it unless only this user can get into it
+
+        Other users could otherwise read the responses or plant files in it.
+        """
+        if self._directory_checked or not self.directory:
+            return
+        self._directory_checked = True
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        info = os.lstat(self.directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+            print(f"Single-flight directory {self.directory} is not a directory with mode 0700 owned by this user, "
+                  "coalescing within this process only")
+            self.directory = ""
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _password_secret(self):
+        if self._secret is None:
+            self._check_directory()
+            if self.directory:
+                self._secret = _shared_secret(self.directory)
+            else:
+                self._secret = secrets.token_bytes(32)
+        return self._secret
+
+    def _lead_across_workers(self, flight):
+        """Take the key's lock file, or wait for the worker holding it and return its response"""
+        self._sweep()
+        # Counted as waiting before trying the lock, so a leader finishing now keeps its response
+        wait_file = _lock(self._path(flight.key, "wait"), fcntl.LOCK_SH)
+        lock_file = _lock(self._path(flight.key, "lock"), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if lock_file is not None:
+            wait_file.close()
+            # Keeps the lock file from being swept while the key is in use
+            os.utime(self._path(flight.key, "lock"))
+            flight.lock_file = lock_file
+            return None
+
+        # Another worker is already asking this question
+        lock_file = open(self._path(flight.key, "lock"), "a+b")
+        waiting_since = time.time()
+        deadline = time.monotonic() + self.timeout
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    time.sleep(POLL_INTERVAL)
+            else:
+                self._count("timeouts")
+                return None
+            return self._read_result(flight.key, waiting_since)
+        finally:
+            lock_file.close()
+            self._leave(flight.key, wait_file)
+
+    def _leave(self, key, wait_file):
+        """Stop waiting for key; if nobody else waits, the response has been read by all and is removed"""
+        if wait_file is None:
+            return
+        try:
+            fcntl.flock(wait_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.remove(self._path(key, "resp"))
+        except (BlockingIOError, FileNotFoundError):
+            pass
+        finally:
+            wait_file.close()
+
+    def _write_result(self, key, result):
+        meta = json.dumps({
+            "written_at": time.time(),
+            "status": result.status,
+            "headers": result.headers,
+        }).encode('utf-8')
+        path = self._path(key, "resp")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(meta + b"\n" + result.body)
+        os.replace(tmp_path, path)
+
+    def _read_result(self, key, written_after):
+        """The response the leader wrote, if it finished after we started waiting"""
+        try:
+            with open(self._path(key, "resp"), "rb") as f:
+                meta, _, body = f.read().partition(b"\n")
+            meta = json.loads(meta)
+        except (OSError, ValueError):
+            return None
+        if meta["written_at"] < written_after:
+            return None
+        return FlightResult(meta["status"], meta["headers"], body)
+
+    def _sweep(self):
+        """Remove lock files nobody has used for a while and results left behind by crashed workers
+
+        A lock file is only removed while holding its lock, so never from
+        under a leader or a waiting worker.
+        """
+        now = time.time()
+        if now - self._last_sweep < SWEEP_AGE:
+            return
+        self._last_sweep = now
+        for name in os.listdir(self.directory):
+            if name == "secret":
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) <= SWEEP_AGE:
+                    continue
+                if not name.endswith((".lock", ".wait")):
+                    os.remove(path)
+                    continue
+                lock_file = _lock(path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if lock_file is not None:
+                    try:
+                        os.remove(path)
+                    finally:
+                        lock_file.close()
+            except OSError:
+                pass
+
+
+coalescer = SingleFlight()
@@ -1,11 +1,21 @@
-import { BadRequestException, Body, Controller, Get, HttpException, HttpStatus, Logger, Post } from '@nestjs/common';
-import { ApiOperation, ApiResponse, ApiTags, ApiBody } from '@nestjs/swagger';
+import { BadRequestException, Body, Controller, Delete, Get, Headers, HttpException, HttpStatus, Logger, NotAcceptableException, NotFoundException, Param, Post, Query, Res } from '@nestjs/common';
+import { ApiOperation, ApiResponse, ApiTags, ApiBody, ApiProduces } from '@nestjs/swagger';
+import { Response } from 'express';
 import { AskService } from './ask.service';
+import { ResultStoreService } from './result-store.service';
 import { AskRequestDto } from './dto/ask-request.dto';
 import { AskResponseDto } from './dto/ask-response.dto';
 import { DatabaseService } from '../database/database.service';
+import { SchemaCacheService } from '../schema-cache/schema-cache.service';
+import { SchemaIndexService } from '../schema-cache/schema-index.service';
+import { CompletionCacheService } from '../openai/completion-cache.service';
+import { safeStringify } from '../utils/serialize.util';
+import { RESULT_MEDIA_TYPES, ResultFormat, encodeArrow, ndjsonLines, negotiateResultFormat, toColumnar } from '../utils/result-format.util';
 import { BadRequestError } from 'openai';
 
+// Comment lines sent while a stage runs, so proxies don't time out an idle stream
+const STREAM_HEARTBEAT_MS = 15000;
+
 @ApiTags('Ask API')
 @Controller('ask')
 export class AskController {
@@ -13,7 +23,11 @@ export class AskController {
 
   constructor(
     private readonly askService: AskService,
-    private readonly databaseService: DatabaseService
+    private readonly databaseService: DatabaseService,
+    private readonly schemaCacheService: SchemaCacheService,
+    private readonly schemaIndexService: SchemaIndexService,
+    private readonly completionCacheService: CompletionCacheService,
+    private readonly resultStore: ResultStoreService
   ) {}
 
   @ApiOperation({ summary: 'API health check' })
@@ -49,39 +63,194 @@ export class AskController {
     description: 'Partial success with limited results due to rate limiting or token size constraints',
     type: AskResponseDto
   })
+  @ApiResponse({ 
+    status: 406, 
+    description: 'None of the accepted media types is a result encoding this API produces'
+  })
+  @ApiProduces(...Object.values(RESULT_MEDIA_TYPES))
   @Post()
-  async ask(@Body() askRequestDto: AskRequestDto): Promise<AskResponseDto> {
+  async ask(
+    @Body() askRequestDto: AskRequestDto,
+    @Headers('accept') accept: string,
+    @Query('format') format: string,
+    @Res() res: Response,
+  ): Promise<void> {
+    const resultFormat = this.resultFormat(accept, format);
     this.logger.log(`Processing natural language query: ${askRequestDto.prompt}`);
     
+    let answer: AskResponseDto;
     try {
-      return await this.askService.processQuery(askRequestDto);
+      answer = await this.askService.processQuery(askRequestDto);
     } catch (error) {
       this.logger.error(`Error processing ask request: ${error.message}`);
       
       // Return a proper response with error info instead of throwing an exception
-      const isRateLimit = error.message.includes('429') || 
-                         error.message.includes('rate limit') || 
-                         error.message.includes('tokens');
-      
-      return {
-        result: isRateLimit ? 
-          "The database information was successfully retrieved, but the query was too large for AI processing. " +
-          "Try a more specific query focusing on fewer tables or a single schema." : 
-          "The query could not be completed due to an error.",
-        executedQueries: [],
-        rawResults: [],
-        suggestedPrompts: [
-          "Try a more specific query with fewer tables",
-          "Focus on a single schema",
-          "Query specific tables instead of the entire database"
-        ],
-        errorInfo: {
-          error: true,
-          message: error.message,
-          type: isRateLimit ? 'RATE_LIMIT_EXCEEDED' : 'GENERAL_ERROR'
-        }
+      answer = this.errorResponse(error);
+    }
+    
+    const { rawResults, ...metadata } = answer;
+    await this.sendResults(res, resultFormat, metadata, 'rawResults', rawResults);
+  }
+
+  @ApiOperation({ 
+    summary: 'Process natural language query, streaming progress as Server-Sent Events', 
+    description: 'Same as POST /ask, but answers with a text/event-stream that has an event per stage as soon as it finishes: ' +
+      'connected, schema, sql (the generated queries), rows and query for each executed query, executed, summary, suggestions ' +
+      'and finally done, or error. Every event carries durationMs for its stage and elapsedMs since the request started.'
+  })
+  @ApiBody({ type: AskRequestDto })
+  @ApiProduces('text/event-stream')
+  @ApiResponse({ 
+    status: 200, 
+    description: 'Event stream with the progress and the answer'
+  })
+  @Post('stream')
+  async askStream(@Body() askRequestDto: AskRequestDto, @Res() res: Response): Promise<void> {
+    this.logger.log(`Streaming natural language query: ${askRequestDto.prompt}`);
+    
+    res.status(HttpStatus.OK);
+    res.setHeader('Content-Type', 'text/event-stream; charset=utf-8');
+    res.setHeader('Cache-Control', 'no-cache');
+    res.setHeader('X-Accel-Buffering', 'no');
+    res.flushHeaders();
+    
+    // Keep working if the client goes away, so the connection still goes back to its pool
+    let closed = false;
+    res.on('close', () => {
+      closed = true;
+    });
+    const send = (event: string, data: Record<string, any>) => {
+      if (!closed) {
+        res.write(`event: ${event}\ndata: ${safeStringify(data)}\n\n`);
+      }
+    };
+    const heartbeat = setInterval(() => {
+      if (!closed) {
+        res.write(': keep-alive\n\n');
+      }
+    }, STREAM_HEARTBEAT_MS);
+    
+    const startedAt = Date.now();
+    try {
+      const response = await this.askService.processQuery(askRequestDto, send);
+      send('done', {
+        executedQueries: response.executedQueries,
+        resultHandle: response.resultHandle,
+        resultPages: response.resultPages,
+        suggestedPrompts: response.suggestedPrompts,
+        errorInfo: response.errorInfo,
+        elapsedMs: Date.now() - startedAt
+      });
+    } catch (error) {
+      this.logger.error(`Error processing streamed ask request: ${error.message}`);
+      send('error', { ...this.errorResponse(error), elapsedMs: Date.now() - startedAt });
+    } finally {
+      clearInterval(heartbeat);
+      res.end();
+    }
+  }
+
+  /**
+   * Result encoding for a request, or a 406 if the client accepts none of them
+   */
+  private resultFormat(accept: string, format: string): ResultFormat {
+    const resultFormat = negotiateResultFormat(accept, format);
+    if (!resultFormat) {
+      throw new NotAcceptableException(
+        `Results are available as ${Object.values(RESULT_MEDIA_TYPES).join(', ')} ` +
+        `(or ?format=${Object.keys(RESULT_MEDIA_TYPES).join('|')})`
+      );
+    }
+    return resultFormat;
+  }
+
+  /**
+   * Send an answer or page in the negotiated encoding
+   * @param metadata Every field but the rows
+   * @param field Field the rows go in, for the JSON encodings
+   * @param results Rows of each query
+   * @param single Whether the field holds the rows of one query rather than a list of results
+   */
+  private async sendResults(
+    res: Response,
+    format: ResultFormat,
+    metadata: any,
+    field: string,
+    results: any[][],
+    single = false,
+  ): Promise<void> {
+    res.setHeader('Vary', 'Accept');
+    res.type(RESULT_MEDIA_TYPES[format]);
+    
+    if (format === 'columnar') {
+      const columnar = results.map(rows => toColumnar(rows));
+      res.send(safeStringify({ ...metadata, [field]: single ? columnar[0] : columnar }));
+    } else if (format === 'arrow') {
+      res.send(encodeArrow(results, index => index === 0 ? { 'ask.metadata': metadata } : {}));
+    } else if (format === 'ndjson') {
+      await this.writeLines(res, ndjsonLines(metadata, results));
+    } else {
+      res.send(safeStringify({ ...metadata, [field]: single ? results[0] : results }));
+    }
+  }
+
+  /**
+   * Write lines in chunks of about 64 KiB, waiting whenever the client falls behind
+   */
+  private async writeLines(res: Response, lines: Iterable<string>): Promise<void> {
+    const waitForDrain = () => new Promise<void>(resolve => {
+      const done = () => {
+        res.off('drain', done);
+        res.off('close', done);
+        resolve();
       };
+      res.on('drain', done);
+      res.on('close', done);
+    });
+    
+    let chunk = '';
+    for (const line of lines) {
+      chunk += line;
+      if (chunk.length >= 65536) {
+        const flushed = res.write(chunk);
+        chunk = '';
+        if (!flushed) {
+          await waitForDrain();
+        }
+        if (res.destroyed) {
+          return;
+        }
+      }
     }
+    res.end(chunk);
+  }
+
+  /**
+   * Answer for a question that failed, with error info and suggestions instead of an exception
+   */
+  private errorResponse(error: Error): AskResponseDto {
+    const isRateLimit = error.message.includes('429') || 
+                       error.message.includes('rate limit') || 
+                       error.message.includes('tokens');
+    
+    return {
+      result: isRateLimit ? 
+        "The database information was successfully retrieved, but the query was too large for AI processing. " +
+        "Try a more specific query focusing on fewer tables or a single schema." : 
+        "The query could not be completed due to an error.",
+      executedQueries: [],
+      rawResults: [],
+      suggestedPrompts: [
+        "Try a more specific query with fewer tables",
+        "Focus on a single schema",
+        "Query specific tables instead of the entire database"
+      ],
+      errorInfo: {
+        error: true,
+        message: error.message,
+        type: isRateLimit ? 'RATE_LIMIT_EXCEEDED' : 'GENERAL_ERROR'
+      }
+    };
   }
 
   @ApiOperation({ 
@@ -126,7 +295,7 @@ export class AskController {
       );
       
       // If we got this far, connection was successful
-      // Close the connection since we're just testing
+      // Hand it back to the pool, so the next question on this connection reuses it
       await this.databaseService.closeConnection(connection);
       
       return {
@@ -143,6 +312,184 @@ export class AskController {
     }
   }
   
+  @ApiOperation({ 
+    summary: 'Inspect the database connection pools', 
+    description: 'Lists the connection pools per connection fingerprint with their size, utilization and acquire wait times'
+  })
+  @ApiResponse({ 
+    status: 200, 
+    description: 'Pool settings, totals and per-pool counters'
+  })
+  @Get('pool-stats')
+  getPoolStats() {
+    return this.databaseService.getPoolStats();
+  }
+  
+  @ApiOperation({ 
+    summary: 'Inspect the schema metadata cache', 
+    description: 'Lists the cached schemas per connection fingerprint with their age, size and hit counts, and the schema index settings and counters'
+  })
+  @ApiResponse({ 
+    status: 200, 
+    description: 'Schema cache entries and counters'
+  })
+  @Get('schema-cache')
+  getSchemaCache() {
+    return { ...this.schemaCacheService.list(), index: this.schemaIndexService.describe() };
+  }
+  
+  @ApiOperation({ 
+    summary: 'Warm the schema metadata cache', 
+    description: 'Scans the database with the given connection details and stores its schema metadata, so the first question skips schema discovery'
+  })
+  @ApiResponse({ 
+    status: 200, 
+    description: 'Schema scanned and cached'
+  })
+  @ApiResponse({ 
+    status: 500, 
+    description: 'Database connection or schema discovery failed'
+  })
+  @Post('schema-cache/warm')
+  async warmSchemaCache(@Body() connectionDetails: Omit<AskRequestDto, 'prompt'>) {
+    if (!connectionDetails.username || !connectionDetails.connectionString) {
+      throw new BadRequestException('Missing username or connectionString in request body');
+    }
+    
+    this.logger.log(`Warming schema cache for ${connectionDetails.username}@${connectionDetails.connectionString}`);
+    
+    try {
+      const entry = await this.askService.warmSchemaCache(connectionDetails);
+      return {
+        success: !!entry,
+        message: entry ? 'Schema metadata cached' : 'No tables found, nothing was cached',
+        entry
+      };
+    } catch (error) {
+      this.logger.error(`Schema cache warm-up failed: ${error.message}`);
+      throw new HttpException(
+        `Schema cache warm-up failed: ${error.message}`,
+        HttpStatus.INTERNAL_SERVER_ERROR
+      );
+    }
+  }
+  
+  @ApiOperation({ 
+    summary: 'Invalidate the schema metadata cache', 
+    description: 'Drops every cached schema, so the next question for each connection rescans its database'
+  })
+  @Delete('schema-cache')
+  invalidateSchemaCache() {
+    return { invalidated: this.schemaCacheService.invalidate() };
+  }
+  
+  @ApiOperation({ 
+    summary: 'Invalidate one cached schema', 
+    description: 'Drops the cached schema for one connection fingerprint'
+  })
+  @Delete('schema-cache/:fingerprint')
+  invalidateSchemaCacheEntry(@Param('fingerprint') fingerprint: string) {
+    return { invalidated: this.schemaCacheService.invalidate(fingerprint) };
+  }
+  
+  @ApiOperation({ 
+    summary: 'Inspect the result store', 
+    description: 'Returns the result store settings, the number and size of stored results, and its counters'
+  })
+  @Get('results')
+  getResultStore() {
+    return this.resultStore.describe();
+  }
+  
+  @ApiOperation({ 
+    summary: 'Fetch a page of stored results', 
+    description: 'Returns rows [offset, offset + limit) of one query of an answer, by the resultHandle of that answer'
+  })
+  @ApiResponse({ 
+    status: 200, 
+    description: 'The page of rows, with the total row count and the offset of the next page'
+  })
+  @ApiResponse({ 
+    status: 404, 
+    description: 'Unknown or expired result handle'
+  })
+  @ApiResponse({ 
+    status: 406, 
+    description: 'None of the accepted media types is a result encoding this API produces'
+  })
+  @ApiProduces(...Object.values(RESULT_MEDIA_TYPES))
+  @Get('results/:handle')
+  async getResultPage(
+    @Param('handle') handle: string,
+    @Headers('accept') accept: string,
+    @Res() res: Response,
+    @Query('query') query?: string,
+    @Query('offset') offset?: string,
+    @Query('limit') limit?: string,
+    @Query('format') format?: string,
+  ): Promise<void> {
+    const resultFormat = this.resultFormat(accept, format);
+    const args: [string, number, number, number] = [
+      handle,
+      Number(query) || 0,
+      Number(offset) || 0,
+      Number(limit) || this.resultStore.pageRows,
+    ];
+    const notFound = () => new NotFoundException(`No stored results for handle ${handle} and query ${args[1]}; they may have expired`);
+    
+    if (resultFormat === 'ndjson') {
+      // The rows are stored as NDJSON, so they are sent as read from disk
+      const page = await this.resultStore.rawPage(...args);
+      if (!page) {
+        throw notFound();
+      }
+      const { data, ...metadata } = page;
+      res.setHeader('Vary', 'Accept');
+      res.type(RESULT_MEDIA_TYPES.ndjson);
+      res.write(safeStringify(metadata) + '\n');
+      res.end(data);
+      return;
+    }
+    
+    const page = await this.resultStore.page(...args);
+    if (!page) {
+      throw notFound();
+    }
+    const { rows, ...metadata } = page;
+    await this.sendResults(res, resultFormat, metadata, 'rows', [rows], true);
+  }
+  
+  @ApiOperation({ 
+    summary: 'Inspect the OpenAI completion cache', 
+    description: 'Returns the cache mode and, per OpenAI call, the hits, misses, stand-in answers, time saved and stored entries'
+  })
+  @ApiResponse({ 
+    status: 200, 
+    description: 'Completion cache settings and counters'
+  })
+  @Get('llm-cache')
+  getCompletionCache() {
+    return this.completionCacheService.describe();
+  }
+  
+  @ApiOperation({ 
+    summary: 'Invalidate the OpenAI completion cache', 
+    description: 'Drops every cached completion, so the next questions are sent to OpenAI again'
+  })
+  @Delete('llm-cache')
+  invalidateCompletionCache() {
+    return { invalidated: this.completionCacheService.invalidate() };
+  }
+  
+  @ApiOperation({ 
+    summary: 'Invalidate the cached completions of one call', 
+    description: 'Drops the cached completions of one OpenAI call: translateToSql, generateSummary or generatePromptSuggestions'
+  })
+  @Delete('llm-cache/:call')
+  invalidateCompletionCacheCall(@Param('call') call: string) {
+    return { invalidated: this.completionCacheService.invalidate(call) };
+  }
+  
   @ApiOperation({ 
     summary: 'Test Oracle client initialization', 
     description: 'Verifies that the Oracle client is properly initialized and can establish connections'
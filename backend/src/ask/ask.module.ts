@@ -1,13 +1,15 @@
 import { Module } from '@nestjs/common';
 import { AskController } from './ask.controller';
 import { AskService } from './ask.service';
+import { ResultStoreService } from './result-store.service';
 import { DatabaseModule } from '../database/database.module';
 import { OpenaiModule } from '../openai/openai.module';
+import { SchemaCacheModule } from '../schema-cache/schema-cache.module';
 
 @Module({
-  imports: [DatabaseModule, OpenaiModule],
+  imports: [DatabaseModule, OpenaiModule, SchemaCacheModule],
   controllers: [AskController],
-  providers: [AskService],
+  providers: [AskService, ResultStoreService],
   exports: [AskService],
 })
 export class AskModule {}
\ No newline at end of file
@@ -1,29 +1,91 @@
 import { Injectable, Logger } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
 import { AskRequestDto } from './dto/ask-request.dto';
 import { AskResponseDto } from './dto/ask-response.dto';
 import { DatabaseService } from '../database/database.service';
 import { OpenaiService } from '../openai/openai.service';
 import * as oracledb from 'oracledb';
 import { safelySerializable } from '../utils/serialize.util';
+import { RowSampler } from '../utils/row-sampler.util';
+import { ForeignKeyGraph, tableKey } from '../utils/foreign-key-graph.util';
+import { SchemaCacheService } from '../schema-cache/schema-cache.service';
+import { SchemaIndexService } from '../schema-cache/schema-index.service';
+import { ResultStoreService, ResultWriter } from './result-store.service';
+
+/**
+ * Receives each stage of processQuery as it finishes, with its timing
+ */
+export type AskProgressListener = (event: string, data: Record<string, any>) => void;
+
+/**
+ * What is kept in memory of an executed query
+ */
+interface QueryOutcome {
+  /** Rows for the answer: the first page when the result store has the rest, else every row */
+  rows: any[];
+  /** Bounded sample of every row, for the summary and suggestions */
+  sample: any[];
+  totalRows: number;
+  /** Whether a row or byte limit stopped the query before its last row */
+  truncated: boolean;
+}
 
 @Injectable()
 export class AskService {
   private readonly logger = new Logger(AskService.name);
+  private readonly queryConcurrency: number;
+  private readonly queryTimeoutMs: number;
+  private readonly queryDeadlineMs: number;
+  private readonly schemaScanWorkers: number;
+  private readonly streamBatchRows: number;
+  private readonly fetchRows: number;
+  private readonly maxRows: number;
+  private readonly maxBytes: number;
+  private readonly sampleRows: number;
 
   constructor(
     private readonly databaseService: DatabaseService,
     private readonly openaiService: OpenaiService,
-  ) {}
+    private readonly schemaCacheService: SchemaCacheService,
+    private readonly schemaIndexService: SchemaIndexService,
+    private readonly resultStore: ResultStoreService,
+    private configService: ConfigService,
+  ) {
+    this.queryConcurrency = Math.max(1, Number(this.configService.get<string>('ASK_QUERY_CONCURRENCY') || 4));
+    this.queryTimeoutMs = Number(this.configService.get<string>('ASK_QUERY_TIMEOUT_MS') || 30000);
+    this.queryDeadlineMs = Number(this.configService.get<string>('ASK_QUERY_DEADLINE_MS') || 90000);
+    this.schemaScanWorkers = Math.max(1, Number(this.configService.get<string>('SCHEMA_SCAN_WORKERS') || 4));
+    this.streamBatchRows = Math.max(1, Number(this.configService.get<string>('ASK_STREAM_BATCH_ROWS') || 500));
+    this.fetchRows = Math.max(1, Number(this.configService.get<string>('ASK_QUERY_FETCH_ROWS') || 500));
+    this.maxRows = Math.max(1, Number(this.configService.get<string>('ASK_QUERY_MAX_ROWS') || 100000));
+    this.maxBytes = Math.max(1, Number(this.configService.get<string>('ASK_QUERY_MAX_BYTES') || 64 * 1024 * 1024));
+    this.sampleRows = Math.max(1, Number(this.configService.get<string>('ASK_SAMPLE_ROWS') || 2000));
+  }
 
   /**
    * Process a natural language query against any supported database
    * Optimized implementation that works with any schema and database type
+   * onProgress, if given, is called as each stage finishes: connected, schema, sql,
+   * rows and query for each query, executed, summary and suggestions; sql_delta and
+   * summary_delta carry the text of the queries and the summary while the model writes it
    */
-  async processQuery(askRequestDto: AskRequestDto): Promise<AskResponseDto> {
+  async processQuery(askRequestDto: AskRequestDto, onProgress?: AskProgressListener): Promise<AskResponseDto> {
     const { username, password, connectionString, port, prompt, database, type, schema } = askRequestDto;
     
     let connection = null;
     
+    // Every event carries the time since the previous stage and since the start
+    const startedAt = Date.now();
+    let stageStartedAt = startedAt;
+    const emit = (event: string, data: Record<string, any>, since?: number) => {
+      const now = Date.now();
+      const durationMs = now - (since ?? stageStartedAt);
+      if (since === undefined) {
+        stageStartedAt = now;
+      }
+      onProgress?.(event, { ...data, durationMs, elapsedMs: now - startedAt });
+    };
+    
     try {
       // Standardize database type from request 
       let dbType = (type || 'oracle').toLowerCase(); // Default to Oracle for backward compatibility
@@ -46,6 +108,7 @@ export class AskService {
         },
       );
       this.logger.log('Connected to database successfully');
+      emit('connected', { dbType });
       
       // Use smart schema detection and scanning
       this.logger.log('Starting efficient schema discovery and scanning...');
@@ -55,110 +118,32 @@ export class AskService {
         this.logger.log(`User specified schema to focus on: ${schema}`);
       }
       
-      // Get current user based on database type
-      let currentUser = '';
-      
-      try {
-        if (dbType === 'oracle') {
-          const currentUserQuery = "SELECT SYS_CONTEXT('USERENV', 'SESSION_USER') AS CURRENT_USER FROM dual";
-          const currentUserResult = await this.databaseService.executeQuery(connection, currentUserQuery, 3000);
-          currentUser = currentUserResult[0]?.CURRENT_USER || '';
-        } else if (dbType === 'postgresql' || dbType === 'postgres') {
-          const currentUserQuery = "SELECT current_user AS current_user";
-          const currentUserResult = await this.databaseService.executeQuery(connection, currentUserQuery, 3000);
-          currentUser = currentUserResult[0]?.current_user || '';
-        } else if (dbType.toLowerCase() === 'mysql') {
-          // Try different MySQL syntax variants for getting current user
-          let currentUserResult = null;
-          
-          // Array of possible MySQL user queries with different syntax
-          const userQueries = [
-            "SELECT USER() AS user",
-            "SELECT CURRENT_USER AS user",
-            "SELECT SESSION_USER() AS user",
-            "SELECT SYSTEM_USER() AS user"
-          ];
-          
-          // Try each query until one works
-          for (const query of userQueries) {
-            try {
-              currentUserResult = await this.databaseService.executeQuery(connection, query, 3000);
-              if (currentUserResult && currentUserResult.length > 0) {
-                const row = currentUserResult[0];
-                // Extract the raw user value
-                let userValue = row.user || row.USER || '';
-                
-                // Clean up MySQL user name by removing the host part (e.g., 'user@host' becomes 'user')
-                if (userValue && userValue.includes('@')) {
-                  currentUser = userValue.split('@')[0];
-                  this.logger.log(`Retrieved MySQL user with host info: ${userValue}, using cleaned username: ${currentUser}`);
-                } else {
-                  currentUser = userValue;
-                  this.logger.log(`Successfully retrieved MySQL user with query: ${query}`);
-                }
-                
-                if (currentUser) {
-                  break;
-                }
-              }
-            } catch (queryError) {
-              // If this query fails, try the next one
-              this.logger.debug(`MySQL user query failed: ${query}, trying next option`);
-            }
-          }
-          
-          // If all queries fail, set to empty string
-          if (!currentUser) {
-            currentUser = '';
-          }
-        } else if (dbType.toLowerCase() === 'mssql' || dbType.toLowerCase() === 'sqlserver') {
-          // SQL Server has special syntax for getting the current user
-          try {
-            // Try using USER_NAME() function without the AS keyword which may cause syntax issues
-            const userNameQuery = "SELECT USER_NAME() user_name";
-            const userNameResult = await this.databaseService.executeQuery(connection, userNameQuery, 3000);
-            currentUser = userNameResult[0]?.user_name || '';
-            
-            if (!currentUser) {
-              // Try a different approach using SUSER_NAME()
-              const suserQuery = "SELECT SUSER_NAME() login_name";
-              const suserResult = await this.databaseService.executeQuery(connection, suserQuery, 3000);
-              currentUser = suserResult[0]?.login_name || '';
-            }
-          } catch (error) {
-            // Last resort fallback - try with different syntax (without AS keyword)
-            try {
-              const loginQuery = "SELECT ORIGINAL_LOGIN() login_name";
-              const loginResult = await this.databaseService.executeQuery(connection, loginQuery, 3000);
-              currentUser = loginResult[0]?.login_name || '';
-            } catch (innerError) {
-              this.logger.warn(`Could not get SQL Server user: ${innerError.message}`);
-              
-              // If connection info is available, extract username from there
-              if (connection.config && connection.config.user) {
-                currentUser = connection.config.user;
-                this.logger.log(`Using connection config username: ${currentUser}`);
-              }
-            }
-          }
-        }
-      } catch (error) {
-        this.logger.warn(`Could not determine current user: ${error.message}`);
-      }
-      
-      this.logger.log(`Connected as user: ${currentUser}`);
-      
-      // Detect available schemas - prioritize user's schema and commonly used ones
-      const schemaData = await this.getSmartSchemaInfo(connection, currentUser, schema);
+      // Reuse cached schema metadata for this connection and only scan the database on a miss
+      const schemaData = await this.getCachedSchemaInfo(connection, dbType, askRequestDto);
       
       this.logger.log(`Scanned ${schemaData.processedSchemas} schemas with ${schemaData.tables.length} tables`);
+      // Only the tables the question is about, and their foreign key neighbors, go into the prompt
+      const selection = this.schemaIndexService.select(
+        this.schemaCacheService.fingerprint({ ...askRequestDto, type: dbType }),
+        schemaData,
+        prompt
+      );
+      emit('schema', {
+        schemas: schemaData.processedSchemas,
+        tables: schemaData.tables.length,
+        promptTables: selection.schema.tables.length,
+      });
       
       // Translate natural language to SQL using OpenAI with the schema data
       this.logger.log('Translating natural language to SQL using database schema information...');
       let sqlQueries = [];
       
       // Don't use fallbacks or workarounds - just get the plain data
-      sqlQueries = await this.openaiService.translateToSql(prompt, schemaData);
+      sqlQueries = await this.openaiService.translateToSql(
+        prompt,
+        selection.schema,
+        onProgress && ((index, text) => onProgress('sql_delta', { index, text }))
+      );
       this.logger.log(`Generated ${sqlQueries.length} SQL queries`);
       
       // Log each generated query for debugging
@@ -174,17 +159,51 @@ export class AskService {
       if (safeQueries.length < sqlQueries.length) {
         this.logger.warn(`${sqlQueries.length - safeQueries.length} queries were filtered for safety`);
       }
+      emit('sql', { queries: safeQueries, filtered: sqlQueries.length - safeQueries.length });
       
-      // Execute safe SQL queries
-      this.logger.log('Executing SQL queries...');
-      const results = [];
+      // Rows are spilled to disk as they are read, so the answer carries one page per result
+      // and memory holds one batch per query however many rows there are
+      let writer: ResultWriter = null;
+      if (this.resultStore.enabled) {
+        try {
+          writer = await this.resultStore.open();
+        } catch (storeError) {
+          this.logger.warn(`Could not store results, answering with every row: ${storeError.message}`);
+        }
+      }
       
-      for (const query of safeQueries) {
-        this.logger.log(`Executing query: ${query}`);
-        // Increase timeout to 30 seconds per query for more complex operations
-        const queryResult = await this.databaseService.executeQuery(connection, query, 30000);
-        results.push(queryResult);
+      // Execute safe SQL queries, in parallel on pooled connections when there are several
+      this.logger.log('Executing SQL queries...');
+      let outcomes: QueryOutcome[];
+      let stored = null;
+      try {
+        outcomes = await this.executeQueries(
+          connection,
+          safeQueries,
+          askRequestDto,
+          dbType,
+          writer,
+          onProgress && ((index, offset, rows) => {
+            // Send large results in batches, so no single event holds every row
+            for (let start = 0; start < rows.length; start += this.streamBatchRows) {
+              onProgress('rows', { index, offset: offset + start, rows: rows.slice(start, start + this.streamBatchRows) });
+            }
+          }),
+          (index, outcome, queryStartedAt) => {
+            emit('query', { index, query: safeQueries[index], rowCount: outcome.totalRows, truncated: outcome.truncated }, queryStartedAt);
+          }
+        );
+        stored = writer && await writer.commit(outcomes.length, outcomes.map(outcome => outcome.truncated));
+      } catch (executeError) {
+        await writer?.discard().catch(discardError =>
+          this.logger.warn(`Could not remove stored results: ${discardError.message}`)
+        );
+        throw executeError;
       }
+      emit('executed', { queries: safeQueries.length, resultHandle: stored?.handle, resultPages: stored?.pages });
+      
+      const samples = outcomes.map(outcome => outcome.sample);
+      const totalRows = outcomes.map(outcome => outcome.totalRows);
       
       // Generate summary of results using OpenAI with error handling
       this.logger.log('Generating summary of results...');
@@ -193,7 +212,14 @@ export class AskService {
       let errorInfo = null;
       
       try {
-        summary = await this.openaiService.generateSummary(prompt, safeQueries, results);
+        summary = await this.openaiService.generateSummary(
+          prompt,
+          safeQueries,
+          samples,
+          onProgress && ((index, text) => onProgress('summary_delta', { text })),
+          totalRows
+        );
+        emit('summary', { result: summary });
         
         // Generate suggested follow-up prompts
         this.logger.log('Generating suggested follow-up prompts...');
@@ -201,8 +227,9 @@ export class AskService {
           suggestedPrompts = await this.openaiService.generatePromptSuggestions(
             prompt, 
             safeQueries, 
-            results,
-            schemaData
+            samples,
+            schemaData,
+            totalRows
           );
         } catch (suggestionsError) {
           this.logger.warn(`Failed to generate suggestions: ${suggestionsError.message}`);
@@ -213,12 +240,13 @@ export class AskService {
             "What relationships exist between the tables?"
           ];
         }
+        emit('suggestions', { suggestedPrompts });
       } catch (summaryError) {
         // Handle rate limit errors gracefully
         this.logger.warn(`Summary generation failed: ${summaryError.message}`);
         
         // Create a fallback summary with the data we have
-        if (results.length > 0) {
+        if (outcomes.length > 0) {
           const tableNames = safeQueries
             .map(q => {
               // Try to extract table name from the query using regex
@@ -227,16 +255,12 @@ export class AskService {
             })
             .filter(Boolean); // Remove nulls
             
-          const rowCounts = results.map(result => 
-            Array.isArray(result) ? result.length : 'unknown'
-          );
-          
           // Create a basic summary
           summary = `Query executed successfully. Retrieved data from ${tableNames.length} tables. `;
           
           // Add information about the largest result sets
-          const largestResults = rowCounts
-            .map((count, index) => ({ count: count === 'unknown' ? 0 : count as number, index }))
+          const largestResults = totalRows
+            .map((count, index) => ({ count, index }))
             .filter(item => item.count > 0)
             .sort((a, b) => b.count - a.count)
             .slice(0, 3);
@@ -274,13 +298,17 @@ export class AskService {
           message: summaryError.message,
           type: summaryError.message.includes('429') ? 'RATE_LIMIT_EXCEEDED' : 'SUMMARY_GENERATION_ERROR'
         };
+        emit('summary', { result: summary, errorInfo });
+        emit('suggestions', { suggestedPrompts });
       }
       
       // Use our safe serialization to handle any circular references
       return {
         result: summary,
         executedQueries: safeQueries,
-        rawResults: safelySerializable(results),
+        rawResults: outcomes.map(outcome => outcome.rows),
+        resultHandle: stored?.handle,
+        resultPages: stored?.pages,
         suggestedPrompts: suggestedPrompts,
         errorInfo // Include error info if there was a problem
       };
@@ -288,11 +316,11 @@ export class AskService {
       this.logger.error(`Error processing natural language query: ${error.message}`);
       throw error;
     } finally {
-      // Close database connection
+      // Release database connection back to its pool
       if (connection) {
         try {
           await this.databaseService.closeConnection(connection);
-          this.logger.log('Database connection closed');
+          this.logger.log('Database connection released');
         } catch (err) {
           this.logger.error(`Error closing database connection: ${err.message}`);
         }
@@ -300,14 +328,339 @@ export class AskService {
     }
   }
   
+  /**
+   * Run the generated queries with bounded concurrency, keeping their order in the results
+   * Queries not started before the deadline are skipped and the request fails, like any query error would fail it.
+   * Rows are read in batches through a cursor and stop at the row and byte limits. Each batch goes to
+   * the writer, if given, and into a bounded sample; only the rows of the answer stay in memory.
+   * onRows, if given, gets those rows as they are read, and onQueryDone each query as it finishes.
+   */
+  private async executeQueries(
+    connection: any,
+    queries: string[],
+    connectionDetails: Omit<AskRequestDto, 'prompt'>,
+    dbType: string,
+    writer: ResultWriter | null,
+    onRows?: (index: number, offset: number, rows: any[]) => void,
+    onQueryDone?: (index: number, outcome: QueryOutcome, startedAt: number) => void
+  ): Promise<QueryOutcome[]> {
+    const concurrency = Math.min(
+      this.queryConcurrency,
+      Math.max(1, connectionDetails.maxConcurrency || this.queryConcurrency)
+    );
+    const deadline = Date.now() + this.queryDeadlineMs;
+    this.logger.log(`Running ${queries.length} queries on up to ${Math.min(concurrency, queries.length)} connections`);
+    
+    return this.runOnPooledConnections(
+      connection,
+      queries.length,
+      concurrency,
+      this.connectionOpener(connectionDetails, dbType),
+      async (workerConnection, index) => {
+        const remainingMs = deadline - Date.now();
+        if (remainingMs <= 0) {
+          throw new Error(
+            `Query execution exceeded the ${this.queryDeadlineMs}ms deadline before query ${index + 1} of ${queries.length} could start`
+          );
+        }
+        
+        this.logger.log(`Executing query ${index + 1}: ${queries[index]}`);
+        const startedAt = Date.now();
+        const stream = this.databaseService.streamQuery(workerConnection, queries[index], {
+          timeoutMs: Math.min(this.queryTimeoutMs, remainingMs),
+          batchRows: this.fetchRows,
+          maxRows: this.maxRows,
+          maxBytes: this.maxBytes,
+        });
+        
+        const sampler = new RowSampler(this.sampleRows);
+        const kept: any[] = [];
+        for await (const batch of stream) {
+          const rows = safelySerializable(batch);
+          const offset = sampler.totalRows;
+          sampler.add(rows);
+          await writer?.append(index, rows);
+          
+          // With the result store only the first page is kept, the rest is read back by handle
+          const keep = writer ? rows.slice(0, Math.max(0, this.resultStore.pageRows - offset)) : rows;
+          for (const row of keep) {
+            kept.push(row);
+          }
+          if (keep.length > 0) {
+            onRows?.(index, offset, keep);
+          }
+        }
+        
+        const outcome: QueryOutcome = {
+          rows: kept,
+          sample: sampler.rows(),
+          totalRows: stream.rows,
+          truncated: stream.truncated !== null,
+        };
+        onQueryDone?.(index, outcome, startedAt);
+        return outcome;
+      }
+    );
+  }
+  
+  /**
+   * Run count tasks over up to concurrency connections, keeping their order in the results
+   * The first worker uses the given connection, the others borrow pooled connections from
+   * openConnection and release them when the queue is empty. The first task error stops
+   * new tasks from starting and is thrown once the running ones have finished.
+   */
+  private runOnPooledConnections<T>(
+    connection: any,
+    count: number,
+    concurrency: number,
+    openConnection: (() => Promise<any>) | null,
+    task: (workerConnection: any, index: number) => Promise<T>
+  ): Promise<T[]> {
+    const results = new Array<T>(count);
+    const workers = openConnection ? Math.max(1, Math.min(count, concurrency)) : 1;
+    
+    return new Promise<T[]>((resolve, reject) => {
+      let next = 0;
+      let running = 0;
+      let failure: Error = null;
+      
+      const settleIfDone = () => {
+        if (running === 0 && (failure || next >= count)) {
+          failure ? reject(failure) : resolve(results);
+        }
+      };
+      
+      // Each worker takes the next task until none are left or one has failed
+      const runOn = async (workerConnection: any) => {
+        while (!failure && next < count) {
+          const index = next++;
+          running++;
+          try {
+            results[index] = await task(workerConnection, index);
+          } catch (error) {
+            failure = failure || error;
+          } finally {
+            running--;
+          }
+        }
+        settleIfDone();
+      };
+      
+      for (let i = 1; i < workers; i++) {
+        openConnection().then(
+          async extraConnection => {
+            try {
+              await runOn(extraConnection);
+            } finally {
+              await this.databaseService.closeConnection(extraConnection).catch(err =>
+                this.logger.error(`Error closing database connection: ${err.message}`)
+              );
+            }
+          },
+          // The given connection still works through the queue
+          error => this.logger.warn(`Running on fewer connections: ${error.message}`)
+        );
+      }
+      
+      runOn(connection);
+    });
+  }
+  
+  /**
+   * Borrow another pooled connection with the same details as the request's connection
+   */
+  private connectionOpener(connectionDetails: Omit<AskRequestDto, 'prompt'>, dbType: string): () => Promise<any> {
+    return () => this.databaseService.connect(
+      connectionDetails.username,
+      connectionDetails.password,
+      connectionDetails.connectionString,
+      { port: connectionDetails.port, type: dbType, database: connectionDetails.database }
+    );
+  }
+  
+  /**
+   * Get schema metadata for a connection from the schema cache
+   * Refreshes stale entries incrementally, falls back to a full scan on a miss and stores the result
+   */
+  private async getCachedSchemaInfo(
+    connection: any,
+    dbType: string,
+    connectionDetails: Omit<AskRequestDto, 'prompt'>,
+    forceRefresh = false
+  ): Promise<any> {
+    const fingerprint = this.schemaCacheService.fingerprint({ ...connectionDetails, type: dbType });
+    const cached = forceRefresh ? null : this.schemaCacheService.lookup(fingerprint);
+    
+    if (cached?.fresh) {
+      this.logger.log(`Using cached schema metadata (${cached.data.tables.length} tables)`);
+      return cached.data;
+    }
+    
+    const currentUser = await this.getCurrentUser(connection, dbType);
+    this.logger.log(`Connected as user: ${currentUser}`);
+    
+    // Detect available schemas - prioritize user's schema and commonly used ones
+    // A stale cache entry is the snapshot, so only tables altered since then are re-read
+    const schemaData = await this.getSmartSchemaInfo(
+      connection,
+      currentUser,
+      connectionDetails.schema,
+      cached?.data,
+      this.connectionOpener(connectionDetails, dbType)
+    );
+    
+    // Don't cache a failed or empty scan, the next question should try again
+    if (schemaData.tables.length > 0) {
+      this.schemaCacheService.set(fingerprint, connectionDetails, dbType, schemaData);
+    }
+    
+    return schemaData;
+  }
+  
+  /**
+   * Scan a database and store its schema metadata in the schema cache ahead of the first question
+   */
+  async warmSchemaCache(connectionDetails: Omit<AskRequestDto, 'prompt'>): Promise<any> {
+    const { username, password, connectionString, port, database, type } = connectionDetails;
+    
+    let dbType = (type || 'oracle').toLowerCase();
+    if (dbType === 'postgres' || dbType === 'postgresql') {
+      dbType = 'postgresql';
+    }
+    
+    const connection = await this.databaseService.connect(
+      username,
+      password,
+      connectionString,
+      { port, type: dbType, database }
+    );
+    
+    try {
+      await this.getCachedSchemaInfo(connection, dbType, connectionDetails, true);
+      return this.schemaCacheService.describe(
+        this.schemaCacheService.fingerprint({ ...connectionDetails, type: dbType })
+      );
+    } finally {
+      try {
+        await this.databaseService.closeConnection(connection);
+      } catch (err) {
+        this.logger.error(`Error closing database connection: ${err.message}`);
+      }
+    }
+  }
+  
+  /**
+   * Get the current database user based on database type
+   */
+  private async getCurrentUser(connection: any, dbType: string): Promise<string> {
+    let currentUser = '';
+    
+    try {
+      if (dbType === 'oracle') {
+        const currentUserQuery = "SELECT SYS_CONTEXT('USERENV', 'SESSION_USER') AS CURRENT_USER FROM dual";
+        const currentUserResult = await this.databaseService.executeQuery(connection, currentUserQuery, 3000);
+        currentUser = currentUserResult[0]?.CURRENT_USER || '';
+      } else if (dbType === 'postgresql' || dbType === 'postgres') {
+        const currentUserQuery = "SELECT current_user AS current_user";
+        const currentUserResult = await this.databaseService.executeQuery(connection, currentUserQuery, 3000);
+        currentUser = currentUserResult[0]?.current_user || '';
+      } else if (dbType.toLowerCase() === 'mysql') {
+        // Try different MySQL syntax variants for getting current user
+        let currentUserResult = null;
+        
+        // Array of possible MySQL user queries with different syntax
+        const userQueries = [
+          "SELECT USER() AS user",
+          "SELECT CURRENT_USER AS user",
+          "SELECT SESSION_USER() AS user",
+          "SELECT SYSTEM_USER() AS user"
+        ];
+        
+        // Try each query until one works
+        for (const query of userQueries) {
+          try {
+            currentUserResult = await this.databaseService.executeQuery(connection, query, 3000);
+            if (currentUserResult && currentUserResult.length > 0) {
+              const row = currentUserResult[0];
+              // Extract the raw user value
+              let userValue = row.user || row.USER || '';
+              
+              // Clean up MySQL user name by removing the host part (e.g., 'user@host' becomes 'user')
+              if (userValue && userValue.includes('@')) {
+                currentUser = userValue.split('@')[0];
+                this.logger.log(`Retrieved MySQL user with host info: ${userValue}, using cleaned username: ${currentUser}`);
+              } else {
+                currentUser = userValue;
+                this.logger.log(`Successfully retrieved MySQL user with query: ${query}`);
+              }
+              
+              if (currentUser) {
+                break;
+              }
+            }
+          } catch (queryError) {
+            // If this query fails, try the next one
+            this.logger.debug(`MySQL user query failed: ${query}, trying next option`);
+          }
+        }
+        
+        // If all queries fail, set to empty string
+        if (!currentUser) {
+          currentUser = '';
+        }
+      } else if (dbType.toLowerCase() === 'mssql' || dbType.toLowerCase() === 'sqlserver') {
+        // SQL Server has special syntax for getting the current user
+        try {
+          // Try using USER_NAME() function without the AS keyword which may cause syntax issues
+          const userNameQuery = "SELECT USER_NAME() user_name";
+          const userNameResult = await this.databaseService.executeQuery(connection, userNameQuery, 3000);
+          currentUser = userNameResult[0]?.user_name || '';
+          
+          if (!currentUser) {
+            // Try a different approach using SUSER_NAME()
+            const suserQuery = "SELECT SUSER_NAME() login_name";
+            const suserResult = await this.databaseService.executeQuery(connection, suserQuery, 3000);
+            currentUser = suserResult[0]?.login_name || '';
+          }
+        } catch (error) {
+          // Last resort fallback - try with different syntax (without AS keyword)
+          try {
+            const loginQuery = "SELECT ORIGINAL_LOGIN() login_name";
+            const loginResult = await this.databaseService.executeQuery(connection, loginQuery, 3000);
+            currentUser = loginResult[0]?.login_name || '';
+          } catch (innerError) {
+            this.logger.warn(`Could not get SQL Server user: ${innerError.message}`);
+            
+            // If connection info is available, extract username from there
+            if (connection.config && connection.config.user) {
+              currentUser = connection.config.user;
+              this.logger.log(`Using connection config username: ${currentUser}`);
+            }
+          }
+        }
+      }
+    } catch (error) {
+      this.logger.warn(`Could not determine current user: ${error.message}`);
+    }
+    
+    return currentUser;
+  }
+  
   /**
    * Smart schema discovery and scanning for any database type
    * This implementation automatically detects and prioritizes schemas based on:
    * 1. User's own schema
    * 2. Commonly used application schemas (like HR, SCOTT, etc.)
    * 3. Schemas with manageable number of tables
+   * When a previous snapshot is given, only tables whose DDL changed since then are re-read
    */
-  private async getSmartSchemaInfo(connection: any, currentUser: string, userSpecifiedSchema?: string): Promise<any> {
+  private async getSmartSchemaInfo(
+    connection: any,
+    currentUser: string,
+    userSpecifiedSchema?: string,
+    previousSnapshot?: any,
+    openConnection?: () => Promise<any>
+  ): Promise<any> {
     // Determine database type from connection
     let dbType = 'Oracle'; // Default
     let dbName = 'Unknown';
@@ -413,7 +766,8 @@ export class AskService {
       processedTables: 0,
       processedSchemas: 0,
       tables: [],
-      relationships: []
+      relationships: [],
+      changeMarkers: {} as Record<string, string>
     };
     
     try {
@@ -490,9 +844,9 @@ export class AskService {
                 const schemaCheckQuery = `
                   SELECT COUNT(*) AS table_count 
                   FROM INFORMATION_SCHEMA.TABLES 
-                  WHERE TABLE_SCHEMA = '${defaultSchema}'
+                  WHERE TABLE_SCHEMA = :schema
                 `;
-                const checkResult = await this.databaseService.executeQuery(connection, schemaCheckQuery, 3000);
+                const checkResult = await this.databaseService.executeQuery(connection, schemaCheckQuery, 3000, { schema: defaultSchema });
                 
                 if (checkResult[0]?.table_count > 0) {
                   mssqlSchemas.push(defaultSchema);
@@ -661,6 +1015,7 @@ export class AskService {
       const MAX_SAMPLE_ROWS = 30; // Reduced sample data
       let processedSchemas = 0;
       let totalProcessedTables = 0;
+      let reusedTables = 0;
       
       for (const schema of prioritizedSchemas) {
         if (processedSchemas >= MAX_SCHEMAS) {
@@ -675,10 +1030,10 @@ export class AskService {
           if (dbType === 'Oracle') {
             tablesQuery = `
               SELECT table_name FROM all_tables 
-              WHERE owner = '${schema}' 
+              WHERE owner = :schema 
               ORDER BY table_name
             `;
-            tablesResult = await this.databaseService.executeQuery(connection, tablesQuery, 5000);
+            tablesResult = await this.databaseService.executeQuery(connection, tablesQuery, 5000, { schema });
           } 
           else if (dbType === 'MSSQL') {
             // SQL Server - try both methods for maximum compatibility
@@ -688,42 +1043,42 @@ export class AskService {
                 SELECT t.name AS table_name 
                 FROM sys.tables t
                 INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
-                WHERE s.name = '${schema}'
+                WHERE s.name = :schema
                 ORDER BY t.name
               `;
-              tablesResult = await this.databaseService.executeQuery(connection, tablesQuery, 5000);
+              tablesResult = await this.databaseService.executeQuery(connection, tablesQuery, 5000, { schema });
               
               if (tablesResult.length === 0) {
                 // Try INFORMATION_SCHEMA as a backup
                 const infoSchemaTablesQuery = `
                   SELECT TABLE_NAME AS table_name
                   FROM INFORMATION_SCHEMA.TABLES
-                  WHERE TABLE_SCHEMA = '${schema}'
+                  WHERE TABLE_SCHEMA = :schema
                   AND TABLE_TYPE = 'BASE TABLE'
                   ORDER BY TABLE_NAME
                 `;
-                tablesResult = await this.databaseService.executeQuery(connection, infoSchemaTablesQuery, 5000);
+                tablesResult = await this.databaseService.executeQuery(connection, infoSchemaTablesQuery, 5000, { schema });
               }
             } catch (error) {
               // Fallback to INFORMATION_SCHEMA which is more portable
               const infoSchemaBackupQuery = `
                 SELECT TABLE_NAME AS table_name
                 FROM INFORMATION_SCHEMA.TABLES
-                WHERE TABLE_SCHEMA = '${schema}'
+                WHERE TABLE_SCHEMA = :schema
                 AND TABLE_TYPE = 'BASE TABLE'
                 ORDER BY TABLE_NAME
               `;
-              tablesResult = await this.databaseService.executeQuery(connection, infoSchemaBackupQuery, 5000);
+              tablesResult = await this.databaseService.executeQuery(connection, infoSchemaBackupQuery, 5000, { schema });
             }
           }
           else if (dbType === 'PostgreSQL') {
             tablesQuery = `
               SELECT tablename AS table_name 
               FROM pg_tables 
-              WHERE schemaname = '${schema}'
+              WHERE schemaname = :schema
               ORDER BY tablename
             `;
-            tablesResult = await this.databaseService.executeQuery(connection, tablesQuery, 5000);
+            tablesResult = await this.databaseService.executeQuery(connection, tablesQuery, 5000, { schema });
           }
           else if (dbType === 'MySQL') {
             tablesQuery = `
@@ -748,494 +1103,71 @@ export class AskService {
           // Select a subset of tables to process
           const tablesToProcess = tablesResult.slice(0, MAX_TABLES_PER_SCHEMA);
           
-          // Process each table
-          for (const table of tablesToProcess) {
+          // Change markers tell us which tables were altered since the previous snapshot
+          const changeMarkers = await this.getTableChangeMarkers(connection, dbType, schema);
+          const previousTables = new Map<string, any>(
+            (previousSnapshot?.tables || [])
+              .filter(t => t.owner === schema)
+              .map(t => [t.tableName, t])
+          );
+          let schemaChanged = !previousSnapshot || previousTables.size !== tablesToProcess.length;
+          
+          // Reuse tables whose DDL is unchanged, keeping the catalog order
+          const schemaTables = new Array(tablesToProcess.length);
+          const tablesToRead: number[] = [];
+          tablesToProcess.forEach((table, index) => {
             const tableName = table.table_name || table.TABLE_NAME;
-            this.logger.log(`Getting metadata for ${schema}.${tableName}`);
+            const marker = changeMarkers.get(tableName);
+            const previousTable = previousTables.get(tableName);
             
-            // Get columns based on database type
-            let columnsQuery = '';
-            let columnsResult = [];
-            
-            if (dbType === 'Oracle') {
-              columnsQuery = `
-                SELECT column_name, data_type, data_length, nullable, column_id
-                FROM all_tab_columns 
-                WHERE owner = '${schema}' AND table_name = '${tableName}'
-                ORDER BY column_id
-              `;
-              columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000);
-            } 
-            else if (dbType === 'MSSQL') {
-              try {
-                // Try sys.columns first
-                columnsQuery = `
-                  SELECT 
-                    c.name AS column_name, 
-                    t.name AS data_type,
-                    c.max_length AS data_length,
-                    c.precision AS data_precision,
-                    c.scale AS data_scale,
-                    c.is_nullable AS nullable,
-                    c.column_id
-                  FROM 
-                    sys.columns c
-                    INNER JOIN sys.types t ON c.user_type_id = t.user_type_id
-                    INNER JOIN sys.tables tbl ON c.object_id = tbl.object_id
-                    INNER JOIN sys.schemas s ON tbl.schema_id = s.schema_id
-                  WHERE 
-                    s.name = '${schema}' 
-                    AND tbl.name = '${tableName}'
-                  ORDER BY 
-                    c.column_id
-                `;
-                columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000);
-              } catch (error) {
-                // Fallback to INFORMATION_SCHEMA which is more broadly supported
-                this.logger.log(`Falling back to INFORMATION_SCHEMA for column info: ${error.message}`);
-                columnsQuery = `
-                  SELECT 
-                    COLUMN_NAME AS column_name,
-                    DATA_TYPE AS data_type,
-                    CHARACTER_MAXIMUM_LENGTH AS data_length,
-                    NUMERIC_PRECISION AS data_precision,
-                    NUMERIC_SCALE AS data_scale, 
-                    IS_NULLABLE AS nullable,
-                    ORDINAL_POSITION AS column_id
-                  FROM 
-                    INFORMATION_SCHEMA.COLUMNS
-                  WHERE 
-                    TABLE_SCHEMA = '${schema}'
-                    AND TABLE_NAME = '${tableName}'
-                  ORDER BY 
-                    ORDINAL_POSITION
-                `;
-                columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000);
-              }
-              
-              // Format to match Oracle format
-              columnsResult = columnsResult.map(col => ({
-                COLUMN_NAME: col.column_name,
-                DATA_TYPE: col.data_type,
-                DATA_LENGTH: col.data_length,
-                DATA_PRECISION: col.data_precision,
-                DATA_SCALE: col.data_scale,
-                NULLABLE: (col.nullable === 'YES' || col.nullable === true || col.nullable === 1) ? 'Y' : 'N',
-                COLUMN_ID: col.column_id
-              }));
+            if (previousTable && marker && previousSnapshot.changeMarkers?.[`${schema}.${tableName}`] === marker) {
+              // DDL unchanged, reuse the stored metadata
+              schemaTables[index] = previousTable;
+              reusedTables++;
+            } else {
+              tablesToRead.push(index);
+              schemaChanged = true;
             }
-            else if (dbType === 'PostgreSQL') {
-              columnsQuery = `
-                SELECT 
-                  column_name, 
-                  data_type, 
-                  character_maximum_length AS data_length,
-                  is_nullable AS nullable,
-                  ordinal_position AS column_id
-                FROM 
-                  information_schema.columns
-                WHERE 
-                  table_schema = '${schema}' 
-                  AND table_name = '${tableName}'
-                ORDER BY 
-                  ordinal_position
-              `;
-              columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000);
-              
-              // Format to match Oracle format
-              columnsResult = columnsResult.map(col => ({
-                COLUMN_NAME: col.column_name,
-                DATA_TYPE: col.data_type,
-                DATA_LENGTH: col.data_length,
-                NULLABLE: col.nullable === 'YES' ? 'Y' : 'N',
-                COLUMN_ID: col.column_id
-              }));
-            }
-            else if (dbType === 'MySQL') {
-              columnsQuery = `
-                SELECT 
-                  COLUMN_NAME AS column_name, 
-                  DATA_TYPE AS data_type, 
-                  CHARACTER_MAXIMUM_LENGTH AS data_length,
-                  IS_NULLABLE AS nullable,
-                  ORDINAL_POSITION AS column_id
-                FROM 
-                  INFORMATION_SCHEMA.COLUMNS
-                WHERE 
-                  TABLE_SCHEMA = '${schema}' 
-                  AND TABLE_NAME = '${tableName}'
-                ORDER BY 
-                  ORDINAL_POSITION
-              `;
-              columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000);
-              
-              // Format to match Oracle format
-              columnsResult = columnsResult.map(col => ({
-                COLUMN_NAME: col.column_name,
-                DATA_TYPE: col.data_type,
-                DATA_LENGTH: col.data_length,
-                NULLABLE: col.nullable === 'YES' ? 'Y' : 'N',
-                COLUMN_ID: col.column_id
-              }));
-            }
-            
-            // Get primary key based on database type
-            let pkQuery = '';
-            let pkResult = [];
-            let primaryKey = [];
             
-            if (dbType === 'Oracle') {
-              pkQuery = `
-                SELECT cols.column_name
-                FROM all_constraints cons, all_cons_columns cols
-                WHERE cons.constraint_type = 'P'
-                AND cons.table_name = '${tableName}'
-                AND cons.owner = '${schema}'
-                AND cons.constraint_name = cols.constraint_name
-                AND cons.owner = cols.owner
-                ORDER BY cols.position
-              `;
-              pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000);
-              primaryKey = pkResult.map(row => row.COLUMN_NAME);
-            }
-            else if (dbType === 'MSSQL') {
-              try {
-                // Try using sys.indexes first
-                pkQuery = `
-                  SELECT 
-                    c.name AS column_name
-                  FROM 
-                    sys.indexes i
-                    INNER JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
-                    INNER JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
-                    INNER JOIN sys.tables t ON i.object_id = t.object_id
-                    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
-                  WHERE 
-                    i.is_primary_key = 1
-                    AND s.name = '${schema}'
-                    AND t.name = '${tableName}'
-                  ORDER BY 
-                    ic.key_ordinal
-                `;
-                pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000);
-                if (pkResult.length > 0) {
-                  primaryKey = pkResult.map(row => row.column_name);
-                } else {
-                  throw new Error("No primary key found with sys.indexes");
-                }
-              } catch (error) {
-                try {
-                  // Fallback to INFORMATION_SCHEMA which is more broadly supported
-                  this.logger.log(`Falling back to INFORMATION_SCHEMA for primary key info: ${error.message}`);
-                  pkQuery = `
-                    SELECT 
-                      kcu.COLUMN_NAME AS column_name
-                    FROM 
-                      INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
-                      JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
-                        ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME
-                        AND tc.TABLE_SCHEMA = kcu.TABLE_SCHEMA
-                    WHERE 
-                      tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
-                      AND tc.TABLE_SCHEMA = '${schema}'
-                      AND tc.TABLE_NAME = '${tableName}'
-                    ORDER BY 
-                      kcu.ORDINAL_POSITION
-                  `;
-                  pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000);
-                  primaryKey = pkResult.map(row => row.column_name);
-                } catch (innerError) {
-                  this.logger.warn(`Failed to get primary key info: ${innerError.message}`);
-                  // Try to guess primary key by looking for ID columns as a last resort
-                  const potentialIdColumns = columnsResult
-                    .filter(col => 
-                      col.COLUMN_NAME.toLowerCase() === 'id' || 
-                      col.COLUMN_NAME.toLowerCase().endsWith('id')
-                    )
-                    .map(col => col.COLUMN_NAME);
-                    
-                  if (potentialIdColumns.length > 0) {
-                    this.logger.log(`Using heuristic to guess primary key: ${potentialIdColumns[0]}`);
-                    primaryKey = [potentialIdColumns[0]];
-                  } else {
-                    primaryKey = [];
-                  }
-                }
-              }
-            }
-            else if (dbType === 'PostgreSQL') {
-              pkQuery = `
-                SELECT 
-                  kcu.column_name
-                FROM 
-                  information_schema.table_constraints tc
-                  JOIN information_schema.key_column_usage kcu
-                    ON tc.constraint_name = kcu.constraint_name
-                    AND tc.table_schema = kcu.table_schema
-                WHERE 
-                  tc.constraint_type = 'PRIMARY KEY'
-                  AND tc.table_schema = '${schema}'
-                  AND tc.table_name = '${tableName}'
-                ORDER BY 
-                  kcu.ordinal_position
-              `;
-              pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000);
-              primaryKey = pkResult.map(row => row.column_name);
-            }
-            else if (dbType === 'MySQL') {
-              pkQuery = `
-                SELECT 
-                  COLUMN_NAME AS column_name
-                FROM 
-                  INFORMATION_SCHEMA.KEY_COLUMN_USAGE
-                WHERE 
-                  CONSTRAINT_NAME = 'PRIMARY'
-                  AND TABLE_SCHEMA = '${schema}'
-                  AND TABLE_NAME = '${tableName}'
-                ORDER BY 
-                  ORDINAL_POSITION
-              `;
-              pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000);
-              primaryKey = pkResult.map(row => row.column_name);
-            }
-            
-            // Get sample data with limited columns and fewer rows
-            let sampleData = [];
-            let sampleQuery = '';
-            
-            // Limit columns for sample data to reduce size
-            const limitedColumns = columnsResult
-              .slice(0, MAX_COLUMNS_PER_TABLE)
-              .map(col => col.COLUMN_NAME);
-            
-            // If we have important columns like IDs or primary keys, make sure they're included
-            primaryKey.forEach(pkCol => {
-              if (!limitedColumns.includes(pkCol)) {
-                limitedColumns.unshift(pkCol); // Add to beginning
-                // Keep within limits
-                if (limitedColumns.length > MAX_COLUMNS_PER_TABLE) {
-                  limitedColumns.pop();
-                }
-              }
-            });
-            
-            // Create a comma-separated list of column names
-            const columnList = limitedColumns.map(colName => {
-              // Format column names based on database type syntax
-              if (dbType === 'MSSQL') {
-                return `[${colName}]`;
-              } else if (dbType === 'MySQL') {
-                return `\`${colName}\``;
-              } else if (dbType === 'Oracle') {
-                return `"${colName}"`;
-              } else {
-                return `"${colName}"`;
-              }
-            }).join(', ');
-            
-            // Build sample query with limited columns and rows
-            if (dbType === 'Oracle') {
-              sampleQuery = `SELECT ${columnList} FROM ${schema}.${tableName} WHERE ROWNUM <= ${MAX_SAMPLE_ROWS}`;
-            } 
-            else if (dbType === 'MSSQL') {
-              sampleQuery = `SELECT TOP ${MAX_SAMPLE_ROWS} ${columnList} FROM [${schema}].[${tableName}]`;
-            }
-            else if (dbType === 'PostgreSQL') {
-              sampleQuery = `SELECT ${columnList} FROM "${schema}"."${tableName}" LIMIT ${MAX_SAMPLE_ROWS}`;
-            }
-            else if (dbType === 'MySQL') {
-              sampleQuery = `SELECT ${columnList} FROM \`${schema}\`.\`${tableName}\` LIMIT ${MAX_SAMPLE_ROWS}`;
-            }
-            
-            try {
-              sampleData = await this.databaseService.executeQuery(connection, sampleQuery, 5000);
-            } catch (error) {
-              this.logger.warn(`Error getting sample data for ${schema}.${tableName}: ${error.message}`);
-              sampleData = []; // Empty array if there's an error
+            if (marker) {
+              schemaData.changeMarkers[`${schema}.${tableName}`] = marker;
             }
+          });
+          
+          if (tablesToRead.length > 0) {
+            const namesToRead = tablesToRead.map(index => tablesToProcess[index].table_name || tablesToProcess[index].TABLE_NAME);
             
-            // Limit the number of columns in the schema data to reduce size
-            const limitedColumnsData = columnsResult.slice(0, MAX_COLUMNS_PER_TABLE);
+            // One catalog query for the columns of all these tables where the database allows it
+            const schemaColumns = await this.collectSchemaColumns(connection, dbType, schema, namesToRead);
             
-            // Add table info to schema data with limited columns
-            schemaData.tables.push({
-              owner: schema,
-              tableName: tableName,
-              columns: limitedColumnsData,
-              primaryKey: primaryKey,
-              sampleData: sampleData
+            // Primary keys and sample rows are read per table, several tables at a time on pooled connections
+            this.logger.log(`Getting metadata for ${namesToRead.length} tables in ${schema} with up to ${this.schemaScanWorkers} workers`);
+            const tablesRead = await this.runOnPooledConnections(
+              connection,
+              namesToRead.length,
+              this.schemaScanWorkers,
+              openConnection || null,
+              (workerConnection, i) => this.collectTableMetadata(
+                workerConnection, dbType, schema, namesToRead[i], MAX_COLUMNS_PER_TABLE, MAX_SAMPLE_ROWS, schemaColumns?.get(namesToRead[i])
+              )
+            );
+            tablesRead.forEach((table, i) => {
+              schemaTables[tablesToRead[i]] = table;
             });
-            
-            totalProcessedTables++;
           }
           
-          // Get relevant foreign key relationships for this schema based on database type
-          if (tablesToProcess.length > 0) {
-            let fkQuery = '';
-            let fkResult = [];
-            
-            try {
-              // Build list of table names in appropriate format
-              const tableNames = tablesToProcess.map(t => {
-                const tName = t.table_name || t.TABLE_NAME;
-                return `'${tName}'`;
-              }).join(',');
-              
-              if (dbType === 'Oracle') {
-                fkQuery = `
-                  SELECT 
-                    cons.table_name as table_name,
-                    cols.column_name as column_name,
-                    r_cons.table_name as r_table_name,
-                    r_cols.column_name as r_column_name
-                  FROM 
-                    all_constraints cons
-                    JOIN all_cons_columns cols ON cons.constraint_name = cols.constraint_name AND cons.owner = cols.owner
-                    JOIN all_constraints r_cons ON cons.r_constraint_name = r_cons.constraint_name AND cons.r_owner = r_cons.owner
-                    JOIN all_cons_columns r_cols ON r_cons.constraint_name = r_cols.constraint_name AND r_cons.owner = r_cols.owner
-                  WHERE 
-                    cons.constraint_type = 'R'
-                    AND cons.owner = '${schema}'
-                    AND cons.table_name IN (${tableNames})
-                `;
-                fkResult = await this.databaseService.executeQuery(connection, fkQuery, 5000);
-                
-                // Process Oracle results
-                for (const fk of fkResult) {
-                  schemaData.relationships.push({
-                    type: 'Foreign Key',
-                    source: {
-                      schema: schema,
-                      table: fk.TABLE_NAME,
-                      column: fk.COLUMN_NAME
-                    },
-                    target: {
-                      schema: schema, // Note: could be a different schema
-                      table: fk.R_TABLE_NAME,
-                      column: fk.R_COLUMN_NAME
-                    }
-                  });
-                }
-              } 
-              else if (dbType === 'MSSQL') {
-                fkQuery = `
-                  SELECT
-                    ss.name AS source_schema,
-                    st.name AS source_table,
-                    sc.name AS source_column,
-                    ts.name AS target_schema,
-                    tt.name AS target_table,
-                    tc.name AS target_column
-                  FROM 
-                    sys.foreign_key_columns fkc
-                    INNER JOIN sys.tables st ON fkc.parent_object_id = st.object_id
-                    INNER JOIN sys.schemas ss ON st.schema_id = ss.schema_id
-                    INNER JOIN sys.columns sc ON fkc.parent_object_id = sc.object_id AND fkc.parent_column_id = sc.column_id
-                    INNER JOIN sys.tables tt ON fkc.referenced_object_id = tt.object_id
-                    INNER JOIN sys.schemas ts ON tt.schema_id = ts.schema_id
-                    INNER JOIN sys.columns tc ON fkc.referenced_object_id = tc.object_id AND fkc.referenced_column_id = tc.column_id
-                  WHERE 
-                    ss.name = '${schema}'
-                    AND st.name IN (${tableNames})
-                `;
-                fkResult = await this.databaseService.executeQuery(connection, fkQuery, 5000);
-                
-                // Process SQL Server results
-                for (const fk of fkResult) {
-                  schemaData.relationships.push({
-                    type: 'Foreign Key',
-                    source: {
-                      schema: fk.source_schema,
-                      table: fk.source_table,
-                      column: fk.source_column
-                    },
-                    target: {
-                      schema: fk.target_schema, 
-                      table: fk.target_table,
-                      column: fk.target_column
-                    }
-                  });
-                }
-              }
-              else if (dbType === 'PostgreSQL') {
-                fkQuery = `
-                  SELECT
-                    kcu.table_schema AS source_schema,
-                    kcu.table_name AS source_table, 
-                    kcu.column_name AS source_column,
-                    ccu.table_schema AS target_schema,
-                    ccu.table_name AS target_table,
-                    ccu.column_name AS target_column 
-                  FROM 
-                    information_schema.table_constraints AS tc 
-                    JOIN information_schema.key_column_usage AS kcu
-                      ON tc.constraint_name = kcu.constraint_name
-                      AND tc.table_schema = kcu.table_schema
-                    JOIN information_schema.constraint_column_usage AS ccu
-                      ON ccu.constraint_name = tc.constraint_name
-                      AND ccu.table_schema = tc.table_schema
-                  WHERE 
-                    tc.constraint_type = 'FOREIGN KEY'
-                    AND kcu.table_schema = '${schema}'
-                    AND kcu.table_name IN (${tableNames})
-                `;
-                fkResult = await this.databaseService.executeQuery(connection, fkQuery, 5000);
-                
-                // Process PostgreSQL results
-                for (const fk of fkResult) {
-                  schemaData.relationships.push({
-                    type: 'Foreign Key',
-                    source: {
-                      schema: fk.source_schema,
-                      table: fk.source_table,
-                      column: fk.source_column
-                    },
-                    target: {
-                      schema: fk.target_schema,
-                      table: fk.target_table,
-                      column: fk.target_column
-                    }
-                  });
-                }
-              }
-              else if (dbType === 'MySQL') {
-                fkQuery = `
-                  SELECT 
-                    TABLE_SCHEMA AS source_schema,
-                    TABLE_NAME AS source_table,
-                    COLUMN_NAME AS source_column,
-                    REFERENCED_TABLE_SCHEMA AS target_schema,
-                    REFERENCED_TABLE_NAME AS target_table,
-                    REFERENCED_COLUMN_NAME AS target_column
-                  FROM
-                    INFORMATION_SCHEMA.KEY_COLUMN_USAGE
-                  WHERE
-                    REFERENCED_TABLE_NAME IS NOT NULL
-                    AND TABLE_SCHEMA = '${schema}'
-                    AND TABLE_NAME IN (${tableNames})
-                `;
-                fkResult = await this.databaseService.executeQuery(connection, fkQuery, 5000);
-                
-                // Process MySQL results
-                for (const fk of fkResult) {
-                  schemaData.relationships.push({
-                    type: 'Foreign Key',
-                    source: {
-                      schema: fk.source_schema,
-                      table: fk.source_table,
-                      column: fk.source_column
-                    },
-                    target: {
-                      schema: fk.target_schema,
-                      table: fk.target_table,
-                      column: fk.target_column
-                    }
-                  });
-                }
-              }
-            } catch (error) {
-              this.logger.warn(`Error getting relationships for schema ${schema}: ${error.message}`);
-            }
+          schemaData.tables.push(...schemaTables);
+          totalProcessedTables += tablesToProcess.length;
+          
+          // Get relevant foreign key relationships for this schema, unless none of its tables changed
+          if (!schemaChanged) {
+            schemaData.relationships.push(
+              ...previousSnapshot.relationships.filter(rel => rel.source?.schema === schema)
+            );
+          } else if (tablesToProcess.length > 0) {
+            schemaData.relationships.push(
+              ...await this.collectSchemaRelationships(connection, schema, tablesToProcess)
+            );
           }
           
           processedSchemas++;
@@ -1247,6 +1179,10 @@ export class AskService {
       schemaData.processedSchemas = processedSchemas;
       schemaData.processedTables = totalProcessedTables;
       
+      if (previousSnapshot) {
+        this.logger.log(`Incremental schema refresh: ${totalProcessedTables - reusedTables} tables re-read, ${reusedTables} reused from snapshot`);
+      }
+      
       // Use our safe serialization to handle any circular references
       return safelySerializable(schemaData);
     } catch (error) {
@@ -1268,6 +1204,503 @@ export class AskService {
     }
   }
   
+  /**
+   * Get a DDL change marker per table of a schema, used to detect tables altered since the last snapshot
+   * Tables without a usable marker are always re-read
+   */
+  private async getTableChangeMarkers(connection: any, dbType: string, schema: string): Promise<Map<string, string>> {
+    const markers = new Map<string, string>();
+    let markersQuery = '';
+    
+    if (dbType === 'Oracle') {
+      markersQuery = `
+        SELECT object_name AS table_name,
+               TO_CHAR(last_ddl_time, 'YYYY-MM-DD HH24:MI:SS') AS change_marker
+        FROM all_objects
+        WHERE owner = :schema AND object_type = 'TABLE'
+      `;
+    }
+    else if (dbType === 'MSSQL') {
+      markersQuery = `
+        SELECT o.name AS table_name,
+               CONVERT(varchar(33), o.modify_date, 126) AS change_marker
+        FROM sys.objects o
+        INNER JOIN sys.schemas s ON o.schema_id = s.schema_id
+        WHERE s.name = :schema AND o.type = 'U'
+      `;
+    }
+    else if (dbType === 'PostgreSQL') {
+      // PostgreSQL keeps no DDL timestamp, but every catalog row DDL touches gets a new xmin:
+      // pg_class for the table itself, pg_attribute for renamed, retyped, (un)nullable and dropped
+      // columns, and pg_constraint for added or dropped primary keys
+      markersQuery = `
+        SELECT c.relname AS table_name,
+               c.xmin::text || ':' || md5(
+                 COALESCE((SELECT string_agg(a.attnum || '.' || a.xmin::text, ',' ORDER BY a.attnum)
+                           FROM pg_attribute a
+                           WHERE a.attrelid = c.oid AND a.attnum > 0), '')
+                 || '|' ||
+                 COALESCE((SELECT string_agg(k.oid::text || '.' || k.xmin::text, ',' ORDER BY k.oid)
+                           FROM pg_constraint k
+                           WHERE k.conrelid = c.oid), '')
+               ) AS change_marker
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :schema AND c.relkind IN ('r', 'p')
+      `;
+    }
+    else if (dbType === 'MySQL') {
+      // CREATE_TIME changes when ALTER TABLE rebuilds the table
+      markersQuery = `
+        SELECT TABLE_NAME AS table_name,
+               CONCAT_WS('|', CREATE_TIME, UPDATE_TIME) AS change_marker
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = :schema AND TABLE_TYPE = 'BASE TABLE'
+      `;
+    }
+    
+    if (!markersQuery) {
+      return markers;
+    }
+    
+    try {
+      const markersResult = await this.databaseService.executeQuery(connection, markersQuery, 5000, { schema });
+      for (const row of markersResult) {
+        const tableName = row.table_name || row.TABLE_NAME;
+        const marker = row.change_marker ?? row.CHANGE_MARKER;
+        if (tableName && marker) {
+          markers.set(tableName, String(marker));
+        }
+      }
+    } catch (error) {
+      this.logger.warn(`Could not read change markers for schema ${schema}: ${error.message}`);
+    }
+    
+    return markers;
+  }
+  
+  /**
+   * Get the columns of several tables of one schema with a single catalog query
+   * Only Oracle and PostgreSQL are read in bulk; returns null for the others or if the query fails,
+   * and collectTableMetadata then reads the columns per table
+   */
+  private async collectSchemaColumns(
+    connection: any,
+    dbType: string,
+    schema: string,
+    tableNames: string[]
+  ): Promise<Map<string, any[]> | null> {
+    const columnsByTable = new Map<string, any[]>();
+    
+    try {
+      if (dbType === 'Oracle') {
+        const columnsQuery = `
+          SELECT table_name, column_name, data_type, data_length, nullable, column_id
+          FROM all_tab_columns 
+          WHERE owner = :schema AND table_name IN (:tables)
+          ORDER BY table_name, column_id
+        `;
+        const columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 10000, { schema, tables: tableNames });
+        for (const { TABLE_NAME, ...column } of columnsResult) {
+          if (!columnsByTable.has(TABLE_NAME)) {
+            columnsByTable.set(TABLE_NAME, []);
+          }
+          columnsByTable.get(TABLE_NAME).push(column);
+        }
+      }
+      else if (dbType === 'PostgreSQL') {
+        const columnsQuery = `
+          SELECT 
+            table_name,
+            column_name, 
+            data_type, 
+            character_maximum_length AS data_length,
+            is_nullable AS nullable,
+            ordinal_position AS column_id
+          FROM 
+            information_schema.columns
+          WHERE 
+            table_schema = :schema 
+            AND table_name IN (:tables)
+          ORDER BY 
+            table_name, ordinal_position
+        `;
+        const columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 10000, { schema, tables: tableNames });
+        for (const col of columnsResult) {
+          if (!columnsByTable.has(col.table_name)) {
+            columnsByTable.set(col.table_name, []);
+          }
+          // Format to match Oracle format
+          columnsByTable.get(col.table_name).push({
+            COLUMN_NAME: col.column_name,
+            DATA_TYPE: col.data_type,
+            DATA_LENGTH: col.data_length,
+            NULLABLE: col.nullable === 'YES' ? 'Y' : 'N',
+            COLUMN_ID: col.column_id
+          });
+        }
+      }
+      else {
+        return null;
+      }
+    } catch (error) {
+      this.logger.warn(`Bulk column query failed for schema ${schema}, reading columns per table: ${error.message}`);
+      return null;
+    }
+    
+    return columnsByTable;
+  }
+  
+  /**
+   * Collect columns, primary key and sample rows for one table
+   * Columns already read in bulk by collectSchemaColumns can be passed in to skip the per-table column query
+   */
+  private async collectTableMetadata(
+    connection: any,
+    dbType: string,
+    schema: string,
+    tableName: string,
+    maxColumns: number,
+    maxSampleRows: number,
+    prefetchedColumns?: any[]
+  ): Promise<any> {
+    // Get columns based on database type
+    let columnsQuery = '';
+    let columnsResult = [];
+    
+    if (prefetchedColumns) {
+      columnsResult = prefetchedColumns;
+    }
+    else if (dbType === 'Oracle') {
+      columnsQuery = `
+        SELECT column_name, data_type, data_length, nullable, column_id
+        FROM all_tab_columns 
+        WHERE owner = :schema AND table_name = :tableName
+        ORDER BY column_id
+      `;
+      columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000, { schema, tableName });
+    } 
+    else if (dbType === 'MSSQL') {
+      try {
+        // Try sys.columns first
+        columnsQuery = `
+          SELECT 
+            c.name AS column_name, 
+            t.name AS data_type,
+            c.max_length AS data_length,
+            c.precision AS data_precision,
+            c.scale AS data_scale,
+            c.is_nullable AS nullable,
+            c.column_id
+          FROM 
+            sys.columns c
+            INNER JOIN sys.types t ON c.user_type_id = t.user_type_id
+            INNER JOIN sys.tables tbl ON c.object_id = tbl.object_id
+            INNER JOIN sys.schemas s ON tbl.schema_id = s.schema_id
+          WHERE 
+            s.name = :schema 
+            AND tbl.name = :tableName
+          ORDER BY 
+            c.column_id
+        `;
+        columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000, { schema, tableName });
+      } catch (error) {
+        // Fallback to INFORMATION_SCHEMA which is more broadly supported
+        this.logger.log(`Falling back to INFORMATION_SCHEMA for column info: ${error.message}`);
+        columnsQuery = `
+          SELECT 
+            COLUMN_NAME AS column_name,
+            DATA_TYPE AS data_type,
+            CHARACTER_MAXIMUM_LENGTH AS data_length,
+            NUMERIC_PRECISION AS data_precision,
+            NUMERIC_SCALE AS data_scale, 
+            IS_NULLABLE AS nullable,
+            ORDINAL_POSITION AS column_id
+          FROM 
+            INFORMATION_SCHEMA.COLUMNS
+          WHERE 
+            TABLE_SCHEMA = :schema
+            AND TABLE_NAME = :tableName
+          ORDER BY 
+            ORDINAL_POSITION
+        `;
+        columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000, { schema, tableName });
+      }
+      
+      // Format to match Oracle format
+      columnsResult = columnsResult.map(col => ({
+        COLUMN_NAME: col.column_name,
+        DATA_TYPE: col.data_type,
+        DATA_LENGTH: col.data_length,
+        DATA_PRECISION: col.data_precision,
+        DATA_SCALE: col.data_scale,
+        NULLABLE: (col.nullable === 'YES' || col.nullable === true || col.nullable === 1) ? 'Y' : 'N',
+        COLUMN_ID: col.column_id
+      }));
+    }
+    else if (dbType === 'PostgreSQL') {
+      columnsQuery = `
+        SELECT 
+          column_name, 
+          data_type, 
+          character_maximum_length AS data_length,
+          is_nullable AS nullable,
+          ordinal_position AS column_id
+        FROM 
+          information_schema.columns
+        WHERE 
+          table_schema = :schema 
+          AND table_name = :tableName
+        ORDER BY 
+          ordinal_position
+      `;
+      columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000, { schema, tableName });
+      
+      // Format to match Oracle format
+      columnsResult = columnsResult.map(col => ({
+        COLUMN_NAME: col.column_name,
+        DATA_TYPE: col.data_type,
+        DATA_LENGTH: col.data_length,
+        NULLABLE: col.nullable === 'YES' ? 'Y' : 'N',
+        COLUMN_ID: col.column_id
+      }));
+    }
+    else if (dbType === 'MySQL') {
+      columnsQuery = `
+        SELECT 
+          COLUMN_NAME AS column_name, 
+          DATA_TYPE AS data_type, 
+          CHARACTER_MAXIMUM_LENGTH AS data_length,
+          IS_NULLABLE AS nullable,
+          ORDINAL_POSITION AS column_id
+        FROM 
+          INFORMATION_SCHEMA.COLUMNS
+        WHERE 
+          TABLE_SCHEMA = :schema 
+          AND TABLE_NAME = :tableName
+        ORDER BY 
+          ORDINAL_POSITION
+      `;
+      columnsResult = await this.databaseService.executeQuery(connection, columnsQuery, 5000, { schema, tableName });
+      
+      // Format to match Oracle format
+      columnsResult = columnsResult.map(col => ({
+        COLUMN_NAME: col.column_name,
+        DATA_TYPE: col.data_type,
+        DATA_LENGTH: col.data_length,
+        NULLABLE: col.nullable === 'YES' ? 'Y' : 'N',
+        COLUMN_ID: col.column_id
+      }));
+    }
+    
+    // Get primary key based on database type
+    let pkQuery = '';
+    let pkResult = [];
+    let primaryKey = [];
+    
+    if (dbType === 'Oracle') {
+      pkQuery = `
+        SELECT cols.column_name
+        FROM all_constraints cons, all_cons_columns cols
+        WHERE cons.constraint_type = 'P'
+        AND cons.table_name = :tableName
+        AND cons.owner = :schema
+        AND cons.constraint_name = cols.constraint_name
+        AND cons.owner = cols.owner
+        ORDER BY cols.position
+      `;
+      pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000, { schema, tableName });
+      primaryKey = pkResult.map(row => row.COLUMN_NAME);
+    }
+    else if (dbType === 'MSSQL') {
+      try {
+        // Try using sys.indexes first
+        pkQuery = `
+          SELECT 
+            c.name AS column_name
+          FROM 
+            sys.indexes i
+            INNER JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+            INNER JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+            INNER JOIN sys.tables t ON i.object_id = t.object_id
+            INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+          WHERE 
+            i.is_primary_key = 1
+            AND s.name = :schema
+            AND t.name = :tableName
+          ORDER BY 
+            ic.key_ordinal
+        `;
+        pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000, { schema, tableName });
+        if (pkResult.length > 0) {
+          primaryKey = pkResult.map(row => row.column_name);
+        } else {
+          throw new Error("No primary key found with sys.indexes");
+        }
+      } catch (error) {
+        try {
+          // Fallback to INFORMATION_SCHEMA which is more broadly supported
+          this.logger.log(`Falling back to INFORMATION_SCHEMA for primary key info: ${error.message}`);
+          pkQuery = `
+            SELECT 
+              kcu.COLUMN_NAME AS column_name
+            FROM 
+              INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+              JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+                ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME
+                AND tc.TABLE_SCHEMA = kcu.TABLE_SCHEMA
+            WHERE 
+              tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+              AND tc.TABLE_SCHEMA = :schema
+              AND tc.TABLE_NAME = :tableName
+            ORDER BY 
+              kcu.ORDINAL_POSITION
+          `;
+          pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000, { schema, tableName });
+          primaryKey = pkResult.map(row => row.column_name);
+        } catch (innerError) {
+          this.logger.warn(`Failed to get primary key info: ${innerError.message}`);
+          // Try to guess primary key by looking for ID columns as a last resort
+          const potentialIdColumns = columnsResult
+            .filter(col => 
+              col.COLUMN_NAME.toLowerCase() === 'id' || 
+              col.COLUMN_NAME.toLowerCase().endsWith('id')
+            )
+            .map(col => col.COLUMN_NAME);
+            
+          if (potentialIdColumns.length > 0) {
+            this.logger.log(`Using heuristic to guess primary key: ${potentialIdColumns[0]}`);
+            primaryKey = [potentialIdColumns[0]];
+          } else {
+            primaryKey = [];
+          }
+        }
+      }
+    }
+    else if (dbType === 'PostgreSQL') {
+      pkQuery = `
+        SELECT 
+          kcu.column_name
+        FROM 
+          information_schema.table_constraints tc
+          JOIN information_schema.key_column_usage kcu
+            ON tc.constraint_name = kcu.constraint_name
+            AND tc.table_schema = kcu.table_schema
+        WHERE 
+          tc.constraint_type = 'PRIMARY KEY'
+          AND tc.table_schema = :schema
+          AND tc.table_name = :tableName
+        ORDER BY 
+          kcu.ordinal_position
+      `;
+      pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000, { schema, tableName });
+      primaryKey = pkResult.map(row => row.column_name);
+    }
+    else if (dbType === 'MySQL') {
+      pkQuery = `
+        SELECT 
+          COLUMN_NAME AS column_name
+        FROM 
+          INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+        WHERE 
+          CONSTRAINT_NAME = 'PRIMARY'
+          AND TABLE_SCHEMA = :schema
+          AND TABLE_NAME = :tableName
+        ORDER BY 
+          ORDINAL_POSITION
+      `;
+      pkResult = await this.databaseService.executeQuery(connection, pkQuery, 3000, { schema, tableName });
+      primaryKey = pkResult.map(row => row.column_name);
+    }
+    
+    // Get sample data with limited columns and fewer rows
+    let sampleData = [];
+    let sampleQuery = '';
+    
+    // Limit columns for sample data to reduce size
+    const limitedColumns = columnsResult
+      .slice(0, maxColumns)
+      .map(col => col.COLUMN_NAME);
+    
+    // If we have important columns like IDs or primary keys, make sure they're included
+    primaryKey.forEach(pkCol => {
+      if (!limitedColumns.includes(pkCol)) {
+        limitedColumns.unshift(pkCol); // Add to beginning
+        // Keep within limits
+        if (limitedColumns.length > maxColumns) {
+          limitedColumns.pop();
+        }
+      }
+    });
+    
+    // Create a comma-separated list of column names
+    const columnList = limitedColumns.map(colName => {
+      // Format column names based on database type syntax
+      if (dbType === 'MSSQL') {
+        return `[${colName}]`;
+      } else if (dbType === 'MySQL') {
+        return `\`${colName}\``;
+      } else if (dbType === 'Oracle') {
+        return `"${colName}"`;
+      } else {
+        return `"${colName}"`;
+      }
+    }).join(', ');
+    
+    // Build sample query with limited columns and rows
+    if (dbType === 'Oracle') {
+      sampleQuery = `SELECT ${columnList} FROM ${schema}.${tableName} WHERE ROWNUM <= ${maxSampleRows}`;
+    } 
+    else if (dbType === 'MSSQL') {
+      sampleQuery = `SELECT TOP ${maxSampleRows} ${columnList} FROM [${schema}].[${tableName}]`;
+    }
+    else if (dbType === 'PostgreSQL') {
+      sampleQuery = `SELECT ${columnList} FROM "${schema}"."${tableName}" LIMIT ${maxSampleRows}`;
+    }
+    else if (dbType === 'MySQL') {
+      sampleQuery = `SELECT ${columnList} FROM \`${schema}\`.\`${tableName}\` LIMIT ${maxSampleRows}`;
+    }
+    
+    try {
+      sampleData = await this.databaseService.executeQuery(connection, sampleQuery, 5000);
+    } catch (error) {
+      this.logger.warn(`Error getting sample data for ${schema}.${tableName}: ${error.message}`);
+      sampleData = []; // Empty array if there's an error
+    }
+    
+    // Limit the number of columns in the schema data to reduce size
+    const limitedColumnsData = columnsResult.slice(0, maxColumns);
+    
+    // Return table info with limited columns
+    return {
+      owner: schema,
+      tableName: tableName,
+      columns: limitedColumnsData,
+      primaryKey: primaryKey,
+      sampleData: sampleData
+    };
+  }
+  
+  /**
+   * Get foreign key relationships for the given tables of one schema
+   * The foreign keys of the whole schema come from one catalog query; those held by the
+   * given tables are picked from the graph.
+   */
+  private async collectSchemaRelationships(
+    connection: any,
+    schema: string,
+    tablesToProcess: any[]
+  ): Promise<any[]> {
+    try {
+      const graph = new ForeignKeyGraph(await this.databaseService.getForeignKeys(connection, schema));
+      return graph.from(tablesToProcess.map(t => tableKey(schema, t.table_name || t.TABLE_NAME)));
+    } catch (error) {
+      this.logger.warn(`Error getting relationships for schema ${schema}: ${error.message}`);
+      return [];
+    }
+  }
+
+  
   /**
    * Helper method to prioritize schemas
    * @param schemas List of all available schemas
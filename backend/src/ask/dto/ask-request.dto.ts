@@ -77,6 +77,16 @@ export class AskRequestDto {
   @IsOptional()
   schema?: string;
 
+  @ApiProperty({
+    description: 'Maximum number of generated queries to run at the same time (capped by ASK_QUERY_CONCURRENCY)',
+    example: 4,
+    required: false
+  })
+  @IsNumber()
+  @IsOptional()
+  @Min(1)
+  maxConcurrency?: number;
+
   @ApiProperty({
     description: 'Natural language query to be translated to SQL',
     example: 'Show me all customers who ordered more than 5 items last month',
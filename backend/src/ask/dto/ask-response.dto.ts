@@ -1,4 +1,5 @@
 import { ApiProperty } from '@nestjs/swagger';
+import { ResultPageInfo } from '../result-store.service';
 
 export class AskResponseDto {
   @ApiProperty({
@@ -25,6 +26,23 @@ export class AskResponseDto {
   })
   rawResults: any[];
   
+  @ApiProperty({
+    description: 'Handle of the stored results; rows past the first page are fetched from /ask/results/{handle}',
+    example: '3f2a9c0d4b8e4f6a9d1c2b3a4e5f6a7b',
+    required: false
+  })
+  resultHandle?: string;
+  
+  @ApiProperty({
+    description: 'Per query: total rows, rows included in rawResults, the offset of the next page (null when complete) ' +
+      'and whether the row or byte limit stopped the query early',
+    example: [{ query: 0, totalRows: 2500, returnedRows: 100, nextOffset: 100, truncated: false }],
+    type: 'array',
+    isArray: true,
+    required: false
+  })
+  resultPages?: ResultPageInfo[];
+  
   @ApiProperty({
     description: 'Suggested follow-up prompts based on current query results',
     example: [
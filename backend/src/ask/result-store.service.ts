@@ -0,0 +1,323 @@
+import { Injectable, Logger, OnModuleDestroy } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+import { randomBytes } from 'crypto';
+import * as fs from 'fs';
+import * as path from 'path';
+import { safeStringify } from '../utils/serialize.util';
+
+const META_FILE = 'meta.json';
+const HANDLE_PATTERN = /^[0-9a-f]{32}$/;
+
+/**
+ * Rows of one query stored under a result handle, as reported with the first page
+ */
+export interface ResultPageInfo {
+  query: number;
+  totalRows: number;
+  returnedRows: number;
+  nextOffset: number | null;
+  /** Whether the query was stopped at a row or byte limit before its last row */
+  truncated: boolean;
+}
+
+/**
+ * One page of a stored query result
+ */
+export interface ResultPage extends ResultPageInfo {
+  handle: string;
+  offset: number;
+  rows: any[];
+  expiresAt: string;
+}
+
+/**
+ * Results of an answer being spilled to the store as they are read
+ * Several queries can be written at once, the batches of each one in order.
+ */
+export interface ResultWriter {
+  handle: string;
+  /** Append a batch of rows to the result of a query */
+  append(query: number, rows: any[]): Promise<void>;
+  /** Make the results of the first queries count readable, and report their first pages */
+  commit(queries: number, truncated?: boolean[]): Promise<{ handle: string; pages: ResultPageInfo[] }>;
+  /** Remove whatever was written */
+  discard(): Promise<void>;
+}
+
+interface StoredResultMeta {
+  createdAt: number;
+  queries: { rows: number; bytes: number; truncated?: boolean }[];
+}
+
+interface SpillFiles {
+  data: fs.promises.FileHandle;
+  index: fs.promises.FileHandle;
+  rows: number;
+  bytes: number;
+}
+
+/**
+ * Disk spill store for the rows of /ask answers
+ * Every query result of an answer is written under a random handle as NDJSON, with an index of
+ * where each row starts, so any page is read with one positioned read however large the result.
+ * Rows are appended batch by batch while the query is still being read.
+ * Answers then carry only their first page of rows. The directory is shared by every NestJS
+ * worker; handles expire after a TTL, and the oldest are removed when the store outgrows its
+ * size limit.
+ */
+@Injectable()
+export class ResultStoreService implements OnModuleDestroy {
+  private readonly logger = new Logger(ResultStoreService.name);
+  readonly enabled: boolean;
+  readonly pageRows: number;
+  readonly maxPageRows: number;
+  private readonly dir: string;
+  private readonly ttlMs: number;
+  private readonly maxBytes: number;
+  private readonly sweepTimer: NodeJS.Timeout;
+  private readonly stats = { stored: 0, pages: 0, misses: 0, expired: 0, evicted: 0 };
+
+  constructor(private configService: ConfigService) {
+    this.enabled = !['0', 'false', 'no'].includes(
+      (this.configService.get<string>('RESULT_STORE_ENABLED') || 'true').toLowerCase()
+    );
+    this.pageRows = Math.max(1, Number(this.configService.get<string>('ASK_RESULT_PAGE_ROWS') || 100));
+    this.maxPageRows = Math.max(this.pageRows, Number(this.configService.get<string>('RESULT_PAGE_MAX_ROWS') || 1000));
+    this.ttlMs = Number(this.configService.get<string>('RESULT_STORE_TTL_SECONDS') || 3600) * 1000;
+    this.maxBytes = Number(this.configService.get<string>('RESULT_STORE_MAX_BYTES') || 512 * 1024 * 1024);
+    this.dir = this.configService.get<string>('RESULT_STORE_DIR') ||
+      path.join(process.cwd(), 'data', 'results');
+    fs.mkdirSync(this.dir, { recursive: true });
+
+    this.sweepTimer = setInterval(() => this.sweep().catch(error =>
+      this.logger.warn(`Result store sweep failed: ${error.message}`)
+    ), 60000);
+    this.sweepTimer.unref();
+
+    this.logger.log(
+      `Result store ${this.enabled ? 'enabled' : 'disabled'} at ${this.dir} ` +
+      `(${this.pageRows} rows per answer, TTL ${this.ttlMs / 1000}s, ${this.maxBytes} bytes)`
+    );
+  }
+
+  onModuleDestroy() {
+    clearInterval(this.sweepTimer);
+  }
+
+  /**
+   * Start spilling the results of an answer to disk
+   */
+  async open(): Promise<ResultWriter> {
+    const handle = randomBytes(16).toString('hex');
+    const target = path.join(this.dir, handle);
+    await fs.promises.mkdir(target);
+
+    const files = new Map<number, SpillFiles>();
+    const filesFor = async (query: number): Promise<SpillFiles> => {
+      if (!files.has(query)) {
+        files.set(query, {
+          data: await fs.promises.open(path.join(target, `${query}.ndjson`), 'w'),
+          index: await fs.promises.open(path.join(target, `${query}.idx`), 'w'),
+          rows: 0,
+          bytes: 0,
+        });
+      }
+      return files.get(query);
+    };
+    const closeAll = async () => {
+      for (const spill of files.values()) {
+        await spill.data.close().catch(() => undefined);
+        await spill.index.close().catch(() => undefined);
+      }
+      files.clear();
+    };
+
+    return {
+      handle,
+      append: async (query, rows) => {
+        const spill = await filesFor(query);
+        // Start of each row in the data file
+        const offsets = new Float64Array(rows.length);
+        const lines = rows.map((row, index) => {
+          const line = safeStringify(row) + '\n';
+          offsets[index] = spill.bytes;
+          spill.bytes += Buffer.byteLength(line);
+          return line;
+        });
+        await spill.data.write(lines.join(''));
+        await spill.index.write(Buffer.from(offsets.buffer));
+        spill.rows += rows.length;
+      },
+      commit: async (queries, truncated = []) => {
+        const meta: StoredResultMeta = { createdAt: Date.now(), queries: [] };
+        for (let query = 0; query < queries; query++) {
+          const spill = await filesFor(query);
+          // The end of the last row closes the index
+          await spill.index.write(Buffer.from(new Float64Array([spill.bytes]).buffer));
+          meta.queries.push({ rows: spill.rows, bytes: spill.bytes, truncated: !!truncated[query] });
+        }
+        await closeAll();
+        // Written last: a handle without its meta file is still being stored
+        await fs.promises.writeFile(path.join(target, META_FILE), JSON.stringify(meta));
+        this.stats.stored++;
+
+        this.sweep().catch(error => this.logger.warn(`Result store sweep failed: ${error.message}`));
+
+        return {
+          handle,
+          pages: meta.queries.map((stored, query) =>
+            this.pageInfo(query, 0, Math.min(this.pageRows, stored.rows), stored.rows, stored.truncated)
+          ),
+        };
+      },
+      discard: async () => {
+        await closeAll();
+        await this.remove(handle);
+      },
+    };
+  }
+
+  /**
+   * A page of a stored result, or null if the handle is unknown or has expired
+   */
+  async page(handle: string, query: number, offset: number, limit: number): Promise<ResultPage | null> {
+    const page = await this.rawPage(handle, query, offset, limit);
+    if (!page) {
+      return null;
+    }
+    const { data, ...info } = page;
+    const rows = data.toString('utf8').split('\n').filter(line => line).map(line => JSON.parse(line));
+    return { ...info, rows };
+  }
+
+  /**
+   * A page of a stored result as the NDJSON lines it is stored as, without parsing them
+   */
+  async rawPage(handle: string, query: number, offset: number, limit: number): Promise<(Omit<ResultPage, 'rows'> & { data: Buffer }) | null> {
+    const meta = await this.readMeta(handle);
+    if (!meta || !meta.queries[query]) {
+      this.stats.misses++;
+      return null;
+    }
+
+    const totalRows = meta.queries[query].rows;
+    const start = Math.min(Math.max(0, offset), totalRows);
+    const end = Math.min(start + Math.min(Math.max(1, limit), this.maxPageRows), totalRows);
+    const target = path.join(this.dir, handle);
+
+    let data = Buffer.alloc(0);
+    if (end > start) {
+      const index = await this.readRange(path.join(target, `${query}.idx`), start * 8, (end - start + 1) * 8);
+      const offsets = new Float64Array(index.buffer, index.byteOffset, end - start + 1);
+      data = await this.readRange(path.join(target, `${query}.ndjson`), offsets[0], offsets[end - start] - offsets[0]);
+    }
+
+    this.stats.pages++;
+    return {
+      handle,
+      offset: start,
+      data,
+      expiresAt: new Date(meta.createdAt + this.ttlMs).toISOString(),
+      ...this.pageInfo(query, start, end - start, totalRows, meta.queries[query].truncated),
+    };
+  }
+
+  /**
+   * Store settings, size and counters
+   */
+  async describe(): Promise<any> {
+    const entries = await this.entries();
+    return {
+      enabled: this.enabled,
+      pageRows: this.pageRows,
+      maxPageRows: this.maxPageRows,
+      ttlSeconds: this.ttlMs / 1000,
+      maxBytes: this.maxBytes,
+      handles: entries.length,
+      sizeBytes: entries.reduce((sum, entry) => sum + entry.bytes, 0),
+      stats: { ...this.stats },
+    };
+  }
+
+  private pageInfo(query: number, offset: number, returnedRows: number, totalRows: number, truncated = false): ResultPageInfo {
+    const next = offset + returnedRows;
+    return { query, totalRows, returnedRows, nextOffset: next < totalRows ? next : null, truncated: !!truncated };
+  }
+
+  private async readMeta(handle: string): Promise<StoredResultMeta | null> {
+    if (!HANDLE_PATTERN.test(handle)) {
+      return null;
+    }
+    try {
+      const meta: StoredResultMeta = JSON.parse(await fs.promises.readFile(path.join(this.dir, handle, META_FILE), 'utf8'));
+      if (Date.now() - meta.createdAt > this.ttlMs) {
+        await this.remove(handle);
+        this.stats.expired++;
+        return null;
+      }
+      return meta;
+    } catch (error) {
+      return null;
+    }
+  }
+
+  private async readRange(file: string, position: number, length: number): Promise<Buffer> {
+    const handle = await fs.promises.open(file, 'r');
+    try {
+      const buffer = Buffer.alloc(length);
+      await handle.read(buffer, 0, length, position);
+      return buffer;
+    } finally {
+      await handle.close();
+    }
+  }
+
+  /**
+   * Stored handles with their age and size, oldest first
+   */
+  private async entries(): Promise<{ handle: string; createdAt: number; bytes: number }[]> {
+    const entries = [];
+    for (const handle of await fs.promises.readdir(this.dir)) {
+      if (!HANDLE_PATTERN.test(handle)) {
+        continue;
+      }
+      try {
+        const meta: StoredResultMeta = JSON.parse(await fs.promises.readFile(path.join(this.dir, handle, META_FILE), 'utf8'));
+        const bytes = meta.queries.reduce((sum, stored) => sum + stored.bytes + (stored.rows + 1) * 8, 0);
+        entries.push({ handle, createdAt: meta.createdAt, bytes });
+      } catch (error) {
+        // Still being written by a worker, or left half written by one that died
+        const stat = await fs.promises.stat(path.join(this.dir, handle)).catch(() => null);
+        if (stat && Date.now() - stat.mtimeMs > this.ttlMs) {
+          entries.push({ handle, createdAt: stat.mtimeMs, bytes: 0 });
+        }
+      }
+    }
+    return entries.sort((a, b) => a.createdAt - b.createdAt);
+  }
+
+  /**
+   * Remove expired handles, then the oldest ones until the store fits in its size limit
+   */
+  private async sweep(): Promise<void> {
+    const entries = await this.entries();
+    let total = entries.reduce((sum, entry) => sum + entry.bytes, 0);
+    for (const entry of entries) {
+      const expired = Date.now() - entry.createdAt > this.ttlMs;
+      if (!expired && total <= this.maxBytes) {
+        break;
+      }
+      await this.remove(entry.handle);
+      total -= entry.bytes;
+      if (expired) {
+        this.stats.expired++;
+      } else {
+        this.stats.evicted++;
+      }
+    }
+  }
+
+  private async remove(handle: string): Promise<void> {
+    await fs.promises.rm(path.join(this.dir, handle), { recursive: true, force: true });
+  }
+}
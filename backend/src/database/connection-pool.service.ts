@@ -0,0 +1,481 @@
+import { Injectable, Logger, OnModuleDestroy } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+import { createHash, randomBytes } from 'crypto';
+import { DatabaseFactoryService, DatabaseType } from './database-factory.service';
+import { DatabaseProvider } from './interfaces/database-provider.interface';
+
+/**
+ * A provider connection owned by a pool
+ */
+interface PooledConnection {
+  connection: any;
+  pool: ConnectionPool;
+  createdAt: number;
+  lastUsedAt: number;
+  lastCheckedAt: number;
+}
+
+/**
+ * A request waiting for a connection to be released
+ */
+interface Waiter {
+  resolve: (pooled: PooledConnection) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+/**
+ * Connections to one database as one user with one password
+ */
+class ConnectionPool {
+  readonly idle: PooledConnection[] = [];
+  readonly inUse = new Set<PooledConnection>();
+  readonly waiters: Waiter[] = [];
+  pending = 0;
+  lastActiveAt = Date.now();
+  readonly stats = {
+    acquired: 0,
+    created: 0,
+    destroyed: 0,
+    timeouts: 0,
+    failedHealthChecks: 0,
+    totalWaitMs: 0,
+    maxWaitMs: 0,
+  };
+
+  constructor(
+    readonly key: string,
+    readonly tenant: string,
+    readonly label: string,
+    readonly dbType: DatabaseType,
+    readonly provider: DatabaseProvider,
+    readonly config: any,
+  ) {}
+
+  get size(): number {
+    return this.idle.length + this.inUse.size + this.pending;
+  }
+}
+
+/**
+ * Registry of long-lived connection pools keyed by connection fingerprint
+ * Connections are opened through the database providers and reused across
+ * requests, instead of connecting and closing on every request
+ */
+@Injectable()
+export class ConnectionPoolService implements OnModuleDestroy {
+  private readonly logger = new Logger(ConnectionPoolService.name);
+  private readonly pools: Map<string, ConnectionPool> = new Map();
+  private readonly owners: Map<any, PooledConnection> = new Map();
+  private readonly maintenanceTimer: NodeJS.Timeout;
+  // Per-process salt of the ids in getStats(), so they can't be matched against guessed credentials
+  private readonly statsSalt = randomBytes(16).toString('hex');
+
+  private readonly minSize: number;
+  private readonly maxSize: number;
+  private readonly maxPerTenant: number;
+  private readonly idleTimeoutMs: number;
+  private readonly healthCheckIntervalMs: number;
+  private readonly acquireTimeoutMs: number;
+
+  constructor(
+    private configService: ConfigService,
+    private readonly databaseFactoryService: DatabaseFactoryService,
+  ) {
+    // One /ask request holds up to this many connections of its pool at once: its own, plus
+    // the extra ones schema discovery and then its generated queries borrow
+    const perRequest = Math.max(
+      1,
+      this.numberSetting('SCHEMA_SCAN_WORKERS', 4),
+      this.numberSetting('ASK_QUERY_CONCURRENCY', 4),
+    );
+    this.minSize = this.numberSetting('DB_POOL_MIN', 0);
+    // By default two requests on the same connection details both run at full concurrency
+    this.maxSize = Math.max(1, this.numberSetting('DB_POOL_MAX', 2 * perRequest));
+    this.maxPerTenant = Math.max(1, this.numberSetting('DB_POOL_MAX_PER_TENANT', Math.max(10, this.maxSize)));
+    this.idleTimeoutMs = this.numberSetting('DB_POOL_IDLE_TIMEOUT_MS', 300000);
+    this.healthCheckIntervalMs = this.numberSetting('DB_POOL_HEALTH_CHECK_INTERVAL_MS', 60000);
+    this.acquireTimeoutMs = this.numberSetting('DB_POOL_ACQUIRE_TIMEOUT_MS', 30000);
+
+    // Evict idle connections and health-check the rest in the background
+    this.maintenanceTimer = setInterval(() => {
+      this.maintain().catch(error => this.logger.warn(`Pool maintenance failed: ${error.message}`));
+    }, this.healthCheckIntervalMs);
+    this.maintenanceTimer.unref();
+
+    if (Math.min(this.maxSize, this.maxPerTenant) < perRequest) {
+      this.logger.warn(
+        `Pools hold fewer connections than one request uses (${perRequest}, from SCHEMA_SCAN_WORKERS and ` +
+        `ASK_QUERY_CONCURRENCY); requests will wait up to ${this.acquireTimeoutMs}ms for extra connections`
+      );
+    }
+
+    this.logger.log(
+      `Connection pools: min ${this.minSize}, max ${this.maxSize}, max ${this.maxPerTenant} per tenant, ` +
+      `idle timeout ${this.idleTimeoutMs}ms, health check every ${this.healthCheckIntervalMs}ms`
+    );
+  }
+
+  async onModuleDestroy() {
+    clearInterval(this.maintenanceTimer);
+    for (const pool of this.pools.values()) {
+      for (const waiter of pool.waiters.splice(0)) {
+        clearTimeout(waiter.timer);
+        waiter.reject(new Error('Connection pool is shutting down'));
+      }
+      for (const pooled of [...pool.idle, ...pool.inUse]) {
+        await this.destroy(pooled);
+      }
+    }
+    this.pools.clear();
+  }
+
+  /**
+   * Borrow a connection for these connection details, opening one if the pool has room
+   * @param dbType Database type
+   * @param config Provider connection configuration
+   * @returns Provider connection, to be handed back with release()
+   */
+  async acquire(dbType: DatabaseType, config: any): Promise<any> {
+    const key = this.poolKey(dbType, config);
+    let pool = this.pools.get(key);
+
+    if (!pool) {
+      pool = new ConnectionPool(
+        key,
+        this.tenantKey(dbType, config),
+        `${config.username}@${config.connectionString}${config.database ? `/${config.database}` : ''}`,
+        dbType,
+        this.databaseFactoryService.createProvider(dbType),
+        { ...config },
+      );
+      this.pools.set(key, pool);
+    }
+
+    const startedAt = Date.now();
+    let pooled: PooledConnection;
+    try {
+      pooled = await this.borrow(pool);
+    } catch (error) {
+      // Don't keep empty pools around for credentials that never worked
+      if (pool.size === 0 && pool.waiters.length === 0) {
+        this.pools.delete(key);
+      }
+      throw error;
+    }
+
+    const waitMs = Date.now() - startedAt;
+    pool.stats.acquired++;
+    pool.stats.totalWaitMs += waitMs;
+    pool.stats.maxWaitMs = Math.max(pool.stats.maxWaitMs, waitMs);
+    pooled.lastUsedAt = Date.now();
+    pool.lastActiveAt = pooled.lastUsedAt;
+
+    return pooled.connection;
+  }
+
+  /**
+   * Return a connection to its pool
+   * @returns False if the connection isn't pooled
+   */
+  async release(connection: any): Promise<boolean> {
+    const pooled = this.owners.get(connection);
+    if (!pooled) {
+      return false;
+    }
+
+    if (pooled.pool.provider.isUsable?.(connection) === false) {
+      await this.destroy(pooled);
+      return true;
+    }
+    await this.checkIn(pooled, true);
+    return true;
+  }
+
+  /**
+   * Provider that owns a pooled connection
+   */
+  providerFor(connection: any): DatabaseProvider | null {
+    return this.owners.get(connection)?.pool.provider || null;
+  }
+
+  /**
+   * Utilization and wait times per pool
+   */
+  getStats(): any {
+    const pools = Array.from(this.pools.values()).map(pool => ({
+      id: this.statsId(pool.key),
+      tenant: this.statsId(pool.tenant),
+      type: pool.dbType,
+      size: pool.size,
+      inUse: pool.inUse.size,
+      idle: pool.idle.length,
+      waiting: pool.waiters.length,
+      max: this.maxSize,
+      utilization: pool.inUse.size / this.maxSize,
+      acquired: pool.stats.acquired,
+      created: pool.stats.created,
+      destroyed: pool.stats.destroyed,
+      timeouts: pool.stats.timeouts,
+      failedHealthChecks: pool.stats.failedHealthChecks,
+      avgWaitMs: pool.stats.acquired ? Math.round(pool.stats.totalWaitMs / pool.stats.acquired) : 0,
+      maxWaitMs: pool.stats.maxWaitMs,
+    }));
+
+    return {
+      config: {
+        min: this.minSize,
+        max: this.maxSize,
+        maxPerTenant: this.maxPerTenant,
+        idleTimeoutMs: this.idleTimeoutMs,
+        healthCheckIntervalMs: this.healthCheckIntervalMs,
+        acquireTimeoutMs: this.acquireTimeoutMs,
+      },
+      totals: {
+        pools: pools.length,
+        connections: pools.reduce((sum, pool) => sum + pool.size, 0),
+        inUse: pools.reduce((sum, pool) => sum + pool.inUse, 0),
+        idle: pools.reduce((sum, pool) => sum + pool.idle, 0),
+        waiting: pools.reduce((sum, pool) => sum + pool.waiting, 0),
+      },
+      pools,
+    };
+  }
+
+  private async borrow(pool: ConnectionPool): Promise<PooledConnection> {
+    // Most recently used first, so surplus connections stay idle long enough to be evicted
+    while (pool.idle.length > 0) {
+      const pooled = pool.idle.pop();
+      pool.inUse.add(pooled);
+
+      // Validate connections that sat idle past the health-check interval
+      if (Date.now() - pooled.lastCheckedAt < this.healthCheckIntervalMs || await this.isHealthy(pooled)) {
+        return pooled;
+      }
+      await this.destroy(pooled);
+    }
+
+    if (pool.size < this.maxSize && this.tenantSize(pool.tenant) < this.maxPerTenant) {
+      return this.create(pool);
+    }
+
+    return this.waitForConnection(pool);
+  }
+
+  /**
+   * Hand a connection to the next waiter, or put it back in the idle list
+   */
+  private async checkIn(pooled: PooledConnection, used: boolean): Promise<void> {
+    const pool = pooled.pool;
+    pool.inUse.delete(pooled);
+    if (used) {
+      pooled.lastUsedAt = Date.now();
+      pool.lastActiveAt = pooled.lastUsedAt;
+    }
+
+    const waiter = pool.waiters.shift();
+    if (waiter) {
+      clearTimeout(waiter.timer);
+      pool.inUse.add(pooled);
+      waiter.resolve(pooled);
+    } else if (this.hasTenantWaiters(pool.tenant)) {
+      // Another pool of this tenant is waiting for a slot, hand it ours
+      await this.destroy(pooled);
+    } else {
+      pool.idle.push(pooled);
+    }
+  }
+
+  private async create(pool: ConnectionPool): Promise<PooledConnection> {
+    pool.pending++;
+    let connection: any;
+    try {
+      connection = await pool.provider.connect({ ...pool.config });
+    } finally {
+      pool.pending--;
+    }
+
+    const now = Date.now();
+    const pooled: PooledConnection = { connection, pool, createdAt: now, lastUsedAt: now, lastCheckedAt: now };
+    this.owners.set(connection, pooled);
+    pool.inUse.add(pooled);
+    pool.stats.created++;
+    this.logger.log(`Opened pooled connection for ${pool.label} (${pool.size}/${this.maxSize})`);
+
+    return pooled;
+  }
+
+  private waitForConnection(pool: ConnectionPool): Promise<PooledConnection> {
+    this.logger.log(`Waiting for a pooled connection for ${pool.label} (${pool.inUse.size} in use)`);
+
+    return new Promise<PooledConnection>((resolve, reject) => {
+      const waiter: Waiter = {
+        resolve,
+        reject,
+        timer: setTimeout(() => {
+          const index = pool.waiters.indexOf(waiter);
+          if (index >= 0) {
+            pool.waiters.splice(index, 1);
+          }
+          pool.stats.timeouts++;
+          reject(new Error(
+            `Timed out after ${this.acquireTimeoutMs}ms waiting for a database connection ` +
+            `(${pool.inUse.size} of ${this.maxSize} in use)`
+          ));
+        }, this.acquireTimeoutMs),
+      };
+      pool.waiters.push(waiter);
+    });
+  }
+
+  private async destroy(pooled: PooledConnection): Promise<void> {
+    const pool = pooled.pool;
+    const index = pool.idle.indexOf(pooled);
+    if (index >= 0) {
+      pool.idle.splice(index, 1);
+    }
+    pool.inUse.delete(pooled);
+    this.owners.delete(pooled.connection);
+    pool.stats.destroyed++;
+
+    try {
+      await pool.provider.closeConnection(pooled.connection);
+    } catch (error) {
+      this.logger.warn(`Error closing pooled connection for ${pool.label}: ${error.message}`);
+    }
+
+    // A tenant slot just freed up
+    this.serveTenantWaiters(pool.tenant);
+  }
+
+  private async isHealthy(pooled: PooledConnection): Promise<boolean> {
+    const pool = pooled.pool;
+    const healthQuery = pool.dbType === DatabaseType.ORACLE ? 'SELECT 1 FROM dual' : 'SELECT 1';
+
+    try {
+      await pool.provider.executeQuery(pooled.connection, healthQuery, 5000);
+      pooled.lastCheckedAt = Date.now();
+      return true;
+    } catch (error) {
+      pool.stats.failedHealthChecks++;
+      this.logger.warn(`Pooled connection for ${pool.label} failed its health check: ${error.message}`);
+      return false;
+    }
+  }
+
+  /**
+   * Evict connections idle past the timeout, health-check the rest and drop unused pools
+   */
+  private async maintain(): Promise<void> {
+    const now = Date.now();
+
+    for (const pool of Array.from(this.pools.values())) {
+      // Least recently used first
+      for (const pooled of [...pool.idle]) {
+        if (pool.size <= this.minSize) {
+          break;
+        }
+        if (now - pooled.lastUsedAt > this.idleTimeoutMs) {
+          await this.destroy(pooled);
+        }
+      }
+
+      for (const pooled of [...pool.idle]) {
+        if (now - pooled.lastCheckedAt < this.healthCheckIntervalMs || !pool.idle.includes(pooled)) {
+          continue;
+        }
+        // Take it out of the idle list while it is checked
+        pool.idle.splice(pool.idle.indexOf(pooled), 1);
+        pool.inUse.add(pooled);
+        if (await this.isHealthy(pooled)) {
+          await this.checkIn(pooled, false);
+        } else {
+          await this.destroy(pooled);
+        }
+      }
+
+      if (pool.size === 0 && pool.waiters.length === 0 && now - pool.lastActiveAt > this.idleTimeoutMs) {
+        this.pools.delete(pool.key);
+        continue;
+      }
+
+      // Keep the minimum number of connections open for pools still in use
+      while (pool.size < this.minSize && this.tenantSize(pool.tenant) < this.maxPerTenant) {
+        try {
+          await this.checkIn(await this.create(pool), false);
+        } catch (error) {
+          this.logger.warn(`Could not open minimum connections for ${pool.label}: ${error.message}`);
+          break;
+        }
+      }
+    }
+  }
+
+  private serveTenantWaiters(tenant: string): void {
+    for (const pool of this.pools.values()) {
+      if (pool.tenant !== tenant) {
+        continue;
+      }
+      while (pool.waiters.length > 0 && pool.size < this.maxSize && this.tenantSize(tenant) < this.maxPerTenant) {
+        const waiter = pool.waiters.shift();
+        clearTimeout(waiter.timer);
+        this.create(pool).then(waiter.resolve, waiter.reject);
+      }
+    }
+  }
+
+  private hasTenantWaiters(tenant: string): boolean {
+    for (const pool of this.pools.values()) {
+      if (pool.tenant === tenant && pool.waiters.length > 0) {
+        return true;
+      }
+    }
+    return false;
+  }
+
+  private tenantSize(tenant: string): number {
+    let size = 0;
+    for (const pool of this.pools.values()) {
+      if (pool.tenant === tenant) {
+        size += pool.size;
+      }
+    }
+    return size;
+  }
+
+  /**
+   * Pools are per database, user and password, so a wrong password never gets a pooled connection
+   */
+  private poolKey(dbType: DatabaseType, config: any): string {
+    const parts = [
+      dbType,
+      config.connectionString || '',
+      config.port ? String(config.port) : '',
+      config.database || '',
+      config.username || '',
+      config.password || '',
+    ];
+    return createHash('sha256').update(parts.join('\x1f')).digest('hex');
+  }
+
+  /**
+   * A tenant is one target database, whichever user connects to it
+   */
+  private tenantKey(dbType: DatabaseType, config: any): string {
+    return [dbType, config.connectionString || '', config.port || '', config.database || ''].join('|');
+  }
+
+  /**
+   * Short id of a pool or tenant for the stats, which are served without authentication and
+   * must not show database usernames or hosts
+   */
+  private statsId(key: string): string {
+    return createHash('sha256').update(`${this.statsSalt}\x1f${key}`).digest('hex').substring(0, 12);
+  }
+
+  private numberSetting(name: string, defaultValue: number): number {
+    const raw = this.configService.get<string>(name);
+    const value = Number(raw);
+    return raw !== undefined && raw !== '' && Number.isFinite(value) ? value : defaultValue;
+  }
+}
@@ -1,4 +1,5 @@
 import { Injectable, Logger } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
 import { OracleDatabaseProvider } from './providers/oracle-database.provider';
 import { PostgresDatabaseProvider } from './providers/postgres-database.provider';
 import { MysqlDatabaseProvider } from './providers/mysql-database.provider';
@@ -21,6 +22,12 @@ export enum DatabaseType {
 @Injectable()
 export class DatabaseFactoryService {
   private readonly logger = new Logger(DatabaseFactoryService.name);
+  private readonly statementCacheSize: number;
+  
+  constructor(private configService: ConfigService) {
+    // Prepared statements each connection keeps for catalog queries
+    this.statementCacheSize = Math.max(0, Number(this.configService.get<string>('DB_STATEMENT_CACHE_SIZE') || 100));
+  }
   
   /**
    * Create a database provider instance based on the database type
@@ -32,11 +39,11 @@ export class DatabaseFactoryService {
     
     switch (type) {
       case DatabaseType.ORACLE:
-        return new OracleDatabaseProvider();
+        return new OracleDatabaseProvider(this.statementCacheSize);
       case DatabaseType.POSTGRES:
         return new PostgresDatabaseProvider();
       case DatabaseType.MYSQL:
-        return new MysqlDatabaseProvider();
+        return new MysqlDatabaseProvider(this.statementCacheSize);
       case DatabaseType.MSSQL:
         return new MssqlDatabaseProvider();
       default:
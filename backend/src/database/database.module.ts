@@ -1,9 +1,10 @@
 import { Module } from '@nestjs/common';
 import { DatabaseService } from './database.service';
 import { DatabaseFactoryService } from './database-factory.service';
+import { ConnectionPoolService } from './connection-pool.service';
 
 @Module({
-  providers: [DatabaseService, DatabaseFactoryService],
-  exports: [DatabaseService, DatabaseFactoryService],
+  providers: [DatabaseService, DatabaseFactoryService, ConnectionPoolService],
+  exports: [DatabaseService, DatabaseFactoryService, ConnectionPoolService],
 })
 export class DatabaseModule {}
\ No newline at end of file
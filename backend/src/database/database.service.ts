@@ -2,6 +2,34 @@ import { Injectable, Logger } from '@nestjs/common';
 import * as oracledb from 'oracledb';
 import { DatabaseFactoryService, DatabaseType } from './database-factory.service';
 import { DatabaseProvider } from './interfaces/database-provider.interface';
+import { ConnectionPoolService } from './connection-pool.service';
+import { safeStringify } from '../utils/serialize.util';
+import { QueryBinds, bindQuery } from '../utils/sql-binds.util';
+import { ForeignKeyGraph, ForeignKeyRelationship, tableKey } from '../utils/foreign-key-graph.util';
+
+/**
+ * Limits of a streamed query
+ */
+export interface QueryStreamLimits {
+  /** Query timeout in milliseconds, for the whole stream */
+  timeoutMs?: number;
+  /** Rows fetched per round trip and per batch */
+  batchRows?: number;
+  /** Most rows read before the query is stopped */
+  maxRows?: number;
+  /** Most bytes read, counted as JSON, before the query is stopped */
+  maxBytes?: number;
+}
+
+/**
+ * Row batches of a running query, with what has been read so far
+ */
+export interface QueryStream extends AsyncIterable<any[]> {
+  rows: number;
+  bytes: number;
+  /** Which limit stopped the query early, or null if every row was read */
+  truncated: 'rows' | 'bytes' | null;
+}
 
 /**
  * Enhanced database service with support for multiple database types
@@ -9,10 +37,11 @@ import { DatabaseProvider } from './interfaces/database-provider.interface';
 @Injectable()
 export class DatabaseService {
   private readonly logger = new Logger(DatabaseService.name);
-  private activeConnections: Map<string, any> = new Map();
-  private activeProviders: Map<string, DatabaseProvider> = new Map();
 
-  constructor(private readonly databaseFactoryService: DatabaseFactoryService) {
+  constructor(
+    private readonly databaseFactoryService: DatabaseFactoryService,
+    private readonly connectionPoolService: ConnectionPoolService,
+  ) {
     this.logger.log('Database service initialized');
     
     // Initialize Oracle client for backward compatibility
@@ -27,6 +56,7 @@ export class DatabaseService {
   /**
    * Multi-database connect method
    * Supports Oracle, PostgreSQL, MySQL, and MS SQL Server
+   * Connections come from a long-lived pool per connection fingerprint; hand them back with closeConnection
    */
   async connect(
     username: string,
@@ -43,12 +73,6 @@ export class DatabaseService {
     this.logger.log(`Connecting to database: ${connectionId}`);
     
     try {
-      // Check if we already have an active connection
-      if (this.activeConnections.has(connectionId)) {
-        this.logger.log(`Reusing existing connection: ${connectionId}`);
-        return this.activeConnections.get(connectionId);
-      }
-      
       // Set default port based on detected database type
       if (!options.port) {
         const dbTypeLower = options.type?.toLowerCase() || '';
@@ -95,15 +119,8 @@ export class DatabaseService {
       
       this.logger.log(`Detected database type: ${dbType}`);
       
-      // Get the appropriate provider
-      const provider = this.databaseFactoryService.createProvider(dbType);
-      this.activeProviders.set(connectionId, provider);
-      
-      // Connect using the provider
-      const connection = await provider.connect(connectionConfig);
-      
-      // Store the connection for reuse
-      this.activeConnections.set(connectionId, connection);
+      // Borrow a pooled connection, the pool opens one through the provider if needed
+      const connection = await this.connectionPoolService.acquire(dbType, connectionConfig);
       this.logger.log(`Connected successfully to ${dbType} database: ${connectionId}`);
       
       return connection;
@@ -116,11 +133,15 @@ export class DatabaseService {
   /**
    * Execute a SQL query on a database connection with timeout
    * Works with any supported database type
+   * Catalog queries pass their schema and table names as binds, written as :name placeholders
+   * in the SQL, so each provider runs them as prepared statements instead of parsing a new
+   * statement for every name.
    */
   async executeQuery(
     connection: any,
     sql: string,
     timeoutMs: number = 10000, // Default 10 second timeout
+    binds?: QueryBinds,
   ): Promise<any[]> {
     try {
       // Check if query is safe
@@ -139,16 +160,8 @@ export class DatabaseService {
       
       this.logger.log(`Executing SQL query: ${processedSql}`);
       
-      // Find the connection ID to get the appropriate provider
-      let provider: DatabaseProvider = null;
-      
-      // Search for this connection in our active connections
-      for (const [connectionId, conn] of this.activeConnections.entries()) {
-        if (conn === connection) {
-          provider = this.activeProviders.get(connectionId);
-          break;
-        }
-      }
+      // Find the provider that owns this pooled connection
+      const provider: DatabaseProvider = this.connectionPoolService.providerFor(connection);
       
       if (!provider) {
         // If we can't find the provider, assume it's an Oracle connection (for backward compatibility)
@@ -161,7 +174,8 @@ export class DatabaseService {
             outFormat: oracledb.OUT_FORMAT_OBJECT
           };
           
-          const result = await connection.execute(processedSql, {}, options);
+          const bound = binds ? bindQuery(processedSql, binds, 'oracle') : { sql: processedSql, values: {} };
+          const result = await connection.execute(bound.sql, bound.values, options);
           return result.rows || [];
         } else {
           throw new Error('Unknown connection type, cannot execute query');
@@ -169,53 +183,134 @@ export class DatabaseService {
       }
       
       // Execute the query using the provider
-      return await provider.executeQuery(connection, processedSql, timeoutMs);
+      return await provider.executeQuery(connection, processedSql, timeoutMs, binds);
     } catch (error) {
       this.logger.error(`Error executing SQL query: ${error.message}`);
       throw error;
     }
   }
 
+  /**
+   * Execute a SQL query through a cursor, reading its rows in batches as the caller consumes them
+   * The query is stopped, and its cursor closed, once maxRows rows or maxBytes bytes have
+   * been read; the stream then reports which limit it hit. Check stream.truncated after
+   * the loop.
+   */
+  streamQuery(connection: any, sql: string, limits: QueryStreamLimits = {}): QueryStream {
+    const stream: QueryStream = {
+      rows: 0,
+      bytes: 0,
+      truncated: null,
+      [Symbol.asyncIterator]: () => this.readLimited(connection, sql, limits, stream),
+    };
+    return stream;
+  }
+
+  private async *readLimited(
+    connection: any,
+    sql: string,
+    limits: QueryStreamLimits,
+    stream: QueryStream,
+  ): AsyncGenerator<any[]> {
+    const { timeoutMs = 10000, batchRows = 500, maxRows = Infinity, maxBytes = Infinity } = limits;
+    
+    if (!this.isSafeSqlQuery(sql)) {
+      this.logger.warn(`Unsafe SQL query rejected: ${sql}`);
+      throw new Error('Unsafe SQL query. Destructive operations are not allowed.');
+    }
+    
+    let processedSql = sql.trim();
+    if (processedSql.endsWith(';')) {
+      processedSql = processedSql.substring(0, processedSql.length - 1);
+    }
+    
+    const deadline = Date.now() + timeoutMs;
+    for await (const batch of this.batches(connection, processedSql, timeoutMs, batchRows)) {
+      let take = Math.min(batch.length, maxRows - stream.rows);
+      for (let index = 0; index < take; index++) {
+        const rowBytes = this.rowBytes(batch[index]);
+        if (stream.bytes + rowBytes > maxBytes) {
+          take = index;
+          stream.truncated = 'bytes';
+          break;
+        }
+        stream.bytes += rowBytes;
+      }
+      if (take < batch.length && !stream.truncated) {
+        stream.truncated = 'rows';
+      }
+      
+      if (take > 0) {
+        stream.rows += take;
+        yield take < batch.length ? batch.slice(0, take) : batch;
+      }
+      if (stream.truncated) {
+        this.logger.warn(`Query stopped after ${stream.rows} rows (${stream.bytes} bytes): ${stream.truncated} limit reached`);
+        return;
+      }
+      // The drivers time out single round trips; this bounds the whole stream
+      if (Date.now() > deadline) {
+        throw new Error(`Query timed out after ${timeoutMs}ms, ${stream.rows} rows read`);
+      }
+    }
+  }
+
+  private async *batches(connection: any, sql: string, timeoutMs: number, batchRows: number): AsyncGenerator<any[]> {
+    const provider: DatabaseProvider = this.connectionPoolService.providerFor(connection);
+    if (provider) {
+      yield* provider.streamQuery(connection, sql, { timeout: timeoutMs, batchRows });
+      return;
+    }
+    // Connections outside the pool have no provider to stream with; read them in one go
+    yield await this.executeQuery(connection, sql, timeoutMs);
+  }
+
+  /**
+   * Approximate size of a row as JSON, without serializing it
+   */
+  private rowBytes(row: any): number {
+    if (!row || typeof row !== 'object') {
+      return String(row).length;
+    }
+    let bytes = 2;
+    for (const key of Object.keys(row)) {
+      const value = row[key];
+      bytes += key.length + 4;
+      if (typeof value === 'string') {
+        bytes += value.length + 2;
+      } else if (value instanceof Date) {
+        bytes += 26;
+      } else if (Buffer.isBuffer(value)) {
+        bytes += value.length * 4;
+      } else if (value && typeof value === 'object') {
+        bytes += safeStringify(value).length;
+      } else {
+        bytes += 8;
+      }
+    }
+    return bytes;
+  }
+
   /**
    * Close a database connection
-   * Works with any supported database type
+   * Pooled connections are returned to their pool and stay open for the next request
    */
   async closeConnection(connection: any): Promise<void> {
     try {
-      // Find the connection ID to get the appropriate provider
-      let provider: DatabaseProvider = null;
-      let connectionId: string = null;
-      
-      // Search for this connection in our active connections
-      for (const [connId, conn] of this.activeConnections.entries()) {
-        if (conn === connection) {
-          provider = this.activeProviders.get(connId);
-          connectionId = connId;
-          break;
-        }
+      if (await this.connectionPoolService.release(connection)) {
+        this.logger.log('Database connection returned to pool');
+        return;
       }
       
-      if (!provider) {
-        // If we can't find the provider, assume it's an Oracle connection (for backward compatibility)
-        this.logger.warn('Provider not found for connection, assuming Oracle');
-        
-        // For Oracle connections, use the legacy method which is compatible with older code
-        if (typeof connection.close === 'function') {
-          await connection.close();
-          this.logger.log('Oracle database connection closed successfully');
-        } else {
-          throw new Error('Unknown connection type, cannot close connection');
-        }
+      // If the pool doesn't know it, assume it's an Oracle connection (for backward compatibility)
+      this.logger.warn('Provider not found for connection, assuming Oracle');
+      
+      // For Oracle connections, use the legacy method which is compatible with older code
+      if (typeof connection.close === 'function') {
+        await connection.close();
+        this.logger.log('Oracle database connection closed successfully');
       } else {
-        // Close using the provider
-        await provider.closeConnection(connection);
-        this.logger.log('Database connection closed successfully');
-        
-        // Remove from maps
-        if (connectionId) {
-          this.activeConnections.delete(connectionId);
-          this.activeProviders.delete(connectionId);
-        }
+        throw new Error('Unknown connection type, cannot close connection');
       }
     } catch (error) {
       this.logger.error(`Error closing database connection: ${error.message}`);
@@ -223,6 +318,13 @@ export class DatabaseService {
     }
   }
 
+  /**
+   * Utilization and wait times of the connection pools
+   */
+  getPoolStats() {
+    return this.connectionPoolService.getStats();
+  }
+
   /**
    * Check if a SQL query is safe to execute
    * Prevents destructive operations like DROP, DELETE, UPDATE without WHERE, etc.
@@ -628,6 +730,8 @@ export class DatabaseService {
         let columnQuery = '';
         let pkQuery = '';
         let sampleQuery = '';
+        // Catalog queries bind the names, so every table runs the same prepared statements
+        const binds = { tableName, schema: dbType === 'mysql' ? tableOwner || dbInfo.name : tableOwner };
         
         // Database-specific column queries
         if (dbType === 'oracle') {
@@ -640,8 +744,8 @@ export class DatabaseService {
               nullable, 
               column_id
             FROM all_tab_columns 
-            WHERE table_name = '${tableName}' 
-            AND owner = '${tableOwner}'
+            WHERE table_name = :tableName 
+            AND owner = :schema
             ORDER BY column_id
           `;
           
@@ -650,8 +754,8 @@ export class DatabaseService {
             SELECT cols.column_name
             FROM all_constraints cons, all_cons_columns cols
             WHERE cons.constraint_type = 'P'
-            AND cons.table_name = '${tableName}'
-            AND cons.owner = '${tableOwner}'
+            AND cons.table_name = :tableName
+            AND cons.owner = :schema
             AND cons.constraint_name = cols.constraint_name
             AND cons.owner = cols.owner
             ORDER BY cols.position
@@ -675,8 +779,8 @@ export class DatabaseService {
               is_nullable AS nullable,
               ordinal_position AS column_id
             FROM information_schema.columns
-            WHERE table_name = '${tableName}'
-            AND table_schema = '${tableOwner}'
+            WHERE table_name = :tableName
+            AND table_schema = :schema
             ORDER BY ordinal_position
           `;
           
@@ -691,8 +795,8 @@ export class DatabaseService {
                 AND tc.table_schema = kcu.table_schema
             WHERE 
               tc.constraint_type = 'PRIMARY KEY'
-              AND tc.table_schema = '${tableOwner}'
-              AND tc.table_name = '${tableName}'
+              AND tc.table_schema = :schema
+              AND tc.table_name = :tableName
             ORDER BY 
               kcu.ordinal_position
           `;
@@ -715,8 +819,8 @@ export class DatabaseService {
               IS_NULLABLE AS nullable,
               ORDINAL_POSITION AS column_id
             FROM information_schema.COLUMNS
-            WHERE TABLE_NAME = '${tableName}'
-            AND TABLE_SCHEMA = '${tableOwner || dbInfo.name}'
+            WHERE TABLE_NAME = :tableName
+            AND TABLE_SCHEMA = :schema
             ORDER BY ORDINAL_POSITION
           `;
           
@@ -728,8 +832,8 @@ export class DatabaseService {
               information_schema.KEY_COLUMN_USAGE
             WHERE 
               CONSTRAINT_NAME = 'PRIMARY'
-              AND TABLE_SCHEMA = '${tableOwner || dbInfo.name}'
-              AND TABLE_NAME = '${tableName}'
+              AND TABLE_SCHEMA = :schema
+              AND TABLE_NAME = :tableName
             ORDER BY 
               ORDINAL_POSITION
           `;
@@ -757,8 +861,8 @@ export class DatabaseService {
               INNER JOIN sys.tables tbl ON c.object_id = tbl.object_id
               INNER JOIN sys.schemas s ON tbl.schema_id = s.schema_id
             WHERE 
-              tbl.name = '${tableName}'
-              AND s.name = '${tableOwner}'
+              tbl.name = :tableName
+              AND s.name = :schema
             ORDER BY 
               c.column_id
           `;
@@ -775,8 +879,8 @@ export class DatabaseService {
               INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
             WHERE 
               i.is_primary_key = 1
-              AND t.name = '${tableName}'
-              AND s.name = '${tableOwner}'
+              AND t.name = :tableName
+              AND s.name = :schema
             ORDER BY 
               ic.key_ordinal
           `;
@@ -793,14 +897,14 @@ export class DatabaseService {
               column_name, 
               data_type
             FROM information_schema.columns
-            WHERE table_name = '${tableName}'
+            WHERE table_name = :tableName
             LIMIT 50
           `;
         }
         
         // Execute column query
         try {
-          columns = await this.executeQuery(connection, columnQuery, 5000);
+          columns = await this.executeQuery(connection, columnQuery, 5000, binds);
           
           // Normalize column names across database types
           columns = columns.map(col => ({
@@ -823,7 +927,7 @@ export class DatabaseService {
         // Get primary key if we have a valid query
         if (pkQuery) {
           try {
-            const pkColumns = await this.executeQuery(connection, pkQuery, 3000);
+            const pkColumns = await this.executeQuery(connection, pkQuery, 3000, binds);
             primaryKey = pkColumns.map(row => row.column_name || row.COLUMN_NAME);
           } catch (error) {
             this.logger.warn(`Error getting primary key for ${tableOwner}.${tableName}: ${error.message}`);
@@ -866,218 +970,59 @@ export class DatabaseService {
   }
   
   /**
-   * Get basic relationships without full scan
-   * This method is database-type aware and uses appropriate queries for each database
+   * Get every foreign key of a schema with one catalog query, through the connection's provider
    */
-  private async getBasicRelationships(connection: any, tables: any[]): Promise<any[]> {
-    const relationships = [];
-    
-    try {
-      if (tables.length === 0) {
-        return relationships;
-      }
-      
-      // Get database type info first
-      const dbInfo = await this.getBasicDatabaseInfo(connection);
-      const dbType = dbInfo.type.toLowerCase();
-      
-      // Normalize table names and owners across different database types
-      const normalizedTables = tables.map(t => ({
-        tableName: t.table_name || t.TABLE_NAME,
-        owner: t.owner || t.OWNER || t.schema
-      }));
-      
-      // Build a list of table names and schema names for queries
-      const tableNames = normalizedTables.map(t => `'${t.tableName}'`).join(',');
-      const schemaNames = [...new Set(normalizedTables.map(t => t.owner))].map(s => `'${s}'`).join(',');
-      
-      if (!tableNames || !schemaNames) {
-        return relationships;
-      }
-      
-      let fkQuery = '';
-      
-      // Database-specific foreign key queries
-      if (dbType === 'oracle') {
-        // Oracle foreign key query
-        fkQuery = `
-          SELECT 
-            cons.owner as schema_name,
-            cons.table_name as table_name,
-            cols.column_name as column_name,
-            cons.r_owner as r_schema_name,
-            r_cons.table_name as r_table_name,
-            r_cols.column_name as r_column_name
-          FROM 
-            all_constraints cons
-            JOIN all_cons_columns cols ON cons.constraint_name = cols.constraint_name AND cons.owner = cols.owner
-            JOIN all_constraints r_cons ON cons.r_constraint_name = r_cons.constraint_name AND cons.r_owner = r_cons.owner
-            JOIN all_cons_columns r_cols ON r_cons.constraint_name = r_cols.constraint_name AND r_cons.owner = r_cols.owner
-          WHERE 
-            cons.constraint_type = 'R'
-            AND cons.table_name IN (${tableNames})
-            AND cons.owner IN (${schemaNames})
-        `;
-      }
-      else if (dbType === 'postgresql') {
-        // PostgreSQL foreign key query
-        fkQuery = `
-          SELECT
-            tc.table_schema AS schema_name,
-            tc.table_name AS table_name,
-            kcu.column_name AS column_name,
-            ccu.table_schema AS r_schema_name,
-            ccu.table_name AS r_table_name,
-            ccu.column_name AS r_column_name
-          FROM 
-            information_schema.table_constraints AS tc 
-            JOIN information_schema.key_column_usage AS kcu
-              ON tc.constraint_name = kcu.constraint_name
-              AND tc.table_schema = kcu.table_schema
-            JOIN information_schema.constraint_column_usage AS ccu
-              ON ccu.constraint_name = tc.constraint_name
-              AND ccu.table_schema = tc.table_schema
-          WHERE 
-            tc.constraint_type = 'FOREIGN KEY'
-            AND tc.table_name IN (${tableNames})
-            AND tc.table_schema IN (${schemaNames})
-        `;
-      }
-      else if (dbType === 'mysql') {
-        // MySQL foreign key query using information_schema
-        fkQuery = `
-          SELECT 
-            kcu.table_schema AS schema_name,
-            kcu.table_name AS table_name,
-            kcu.column_name AS column_name,
-            kcu.referenced_table_schema AS r_schema_name,
-            kcu.referenced_table_name AS r_table_name,
-            kcu.referenced_column_name AS r_column_name
-          FROM 
-            information_schema.key_column_usage kcu
-          WHERE 
-            kcu.referenced_table_name IS NOT NULL
-            AND kcu.table_name IN (${tableNames})
-            AND kcu.table_schema IN (${schemaNames})
-        `;
-      }
-      else if (dbType === 'mssql') {
-        // SQL Server foreign key query
-        fkQuery = `
-          SELECT 
-            schema_name(fk.schema_id) AS schema_name,
-            object_name(fk.parent_object_id) AS table_name,
-            col_name(fkc.parent_object_id, fkc.parent_column_id) AS column_name,
-            schema_name(pk.schema_id) AS r_schema_name,
-            object_name(fk.referenced_object_id) AS r_table_name,
-            col_name(fkc.referenced_object_id, fkc.referenced_column_id) AS r_column_name
-          FROM 
-            sys.foreign_keys fk
-            INNER JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
-            INNER JOIN sys.tables pk ON fk.referenced_object_id = pk.object_id
-          WHERE 
-            object_name(fk.parent_object_id) IN (${tableNames})
-            AND schema_name(fk.schema_id) IN (${schemaNames})
-        `;
-      }
-      else {
-        // Generic fallback using information_schema (might work for some databases)
-        fkQuery = `
-          SELECT 
-            tc.table_schema AS schema_name,
-            tc.table_name AS table_name,
-            kcu.column_name AS column_name,
-            ccu.table_schema AS r_schema_name,
-            ccu.table_name AS r_table_name,
-            ccu.column_name AS r_column_name
-          FROM 
-            information_schema.table_constraints AS tc 
-            JOIN information_schema.key_column_usage AS kcu
-              ON tc.constraint_name = kcu.constraint_name
-            JOIN information_schema.constraint_column_usage AS ccu
-              ON ccu.constraint_name = tc.constraint_name
-          WHERE 
-            tc.constraint_type = 'FOREIGN KEY'
-            AND tc.table_name IN (${tableNames})
-          LIMIT 100
-        `;
+  async getForeignKeys(connection: any, schema: string): Promise<ForeignKeyRelationship[]> {
+    const provider: DatabaseProvider = this.connectionPoolService.providerFor(connection);
+    if (!provider) {
+      throw new Error('Unknown connection type, cannot read foreign keys');
+    }
+    return provider.getForeignKeys(connection, schema);
+  }
+  
+  /**
+   * Foreign keys of the schemas of the given tables, as a graph
+   * Each schema is read with one query however many of its tables are asked for; schemas
+   * that can't be read are left out.
+   */
+  async getForeignKeyGraph(connection: any, schemas: Iterable<string>): Promise<ForeignKeyGraph> {
+    const graph = new ForeignKeyGraph();
+    for (const schema of new Set(schemas)) {
+      if (!schema) {
+        continue;
       }
-      
-      // Execute the foreign key query
-      let foreignKeys = [];
       try {
-        foreignKeys = await this.executeQuery(connection, fkQuery, 8000);
-        this.logger.log(`Found ${foreignKeys.length} foreign key relationships for the tables`);
+        graph.add(await this.getForeignKeys(connection, schema));
       } catch (error) {
-        this.logger.warn(`Error executing foreign key query: ${error.message}`);
-        // Try a simplified fallback if available
-        if (dbType === 'oracle') {
-          try {
-            // Simplified Oracle query with fewer joins
-            const simpleFkQuery = `
-              SELECT 
-                a.owner as schema_name,
-                a.table_name as table_name,
-                a.column_name as column_name,
-                c_pk.owner as r_schema_name,
-                c_pk.table_name as r_table_name, 
-                c_pk.column_name as r_column_name
-              FROM 
-                all_cons_columns a
-                JOIN all_constraints c ON a.owner = c.owner AND a.constraint_name = c.constraint_name
-                JOIN all_constraints c_pk ON c.r_owner = c_pk.owner AND c.r_constraint_name = c_pk.constraint_name
-                JOIN all_cons_columns c_pk_col ON c_pk.owner = c_pk_col.owner AND c_pk.constraint_name = c_pk_col.constraint_name
-              WHERE 
-                c.constraint_type = 'R'
-                AND rownum <= 100
-            `;
-            foreignKeys = await this.executeQuery(connection, simpleFkQuery, 5000);
-            this.logger.log(`Found ${foreignKeys.length} relationships with simplified query`);
-          } catch (fallbackError) {
-            this.logger.warn(`Fallback relationship query also failed: ${fallbackError.message}`);
-          }
-        }
-      }
-      
-      // Normalize column names and process foreign keys into relationship objects
-      for (const fk of foreignKeys) {
-        try {
-          // Extract field values with fallbacks for different case conventions
-          const sourceName = fk.table_name || fk.TABLE_NAME;
-          const sourceSchema = fk.schema_name || fk.SCHEMA_NAME;
-          const sourceColumn = fk.column_name || fk.COLUMN_NAME;
-          const targetName = fk.r_table_name || fk.R_TABLE_NAME;
-          const targetSchema = fk.r_schema_name || fk.R_SCHEMA_NAME;
-          const targetColumn = fk.r_column_name || fk.R_COLUMN_NAME;
-          
-          // Only add valid relationships
-          if (sourceName && sourceColumn && targetName && targetColumn) {
-            relationships.push({
-              type: 'Foreign Key',
-              source: {
-                schema: sourceSchema,
-                table: sourceName,
-                column: sourceColumn
-              },
-              target: {
-                schema: targetSchema,
-                table: targetName,
-                column: targetColumn
-              }
-            });
-          }
-        } catch (parseError) {
-          this.logger.warn(`Error parsing foreign key relationship: ${parseError.message}`);
-          // Skip this relationship and continue
-        }
+        this.logger.warn(`Error reading foreign keys of schema ${schema}: ${error.message}`);
       }
-    } catch (error) {
-      this.logger.error(`Error collecting basic relationships: ${error.message}`);
-      // Continue with empty relationships
+    }
+    return graph;
+  }
+  
+  /**
+   * Get basic relationships without full scan
+   * Foreign keys are read once per schema and picked from the graph by source table.
+   */
+  private async getBasicRelationships(connection: any, tables: any[]): Promise<any[]> {
+    if (tables.length === 0) {
+      return [];
     }
     
+    // Normalize table names and owners across different database types
+    const normalizedTables = tables
+      .map(t => ({
+        tableName: t.table_name || t.TABLE_NAME,
+        owner: t.owner || t.OWNER || t.schema
+      }))
+      .filter(t => t.tableName && t.owner);
+    
+    const graph = await this.getForeignKeyGraph(connection, normalizedTables.map(t => t.owner));
+    const relationships = graph.from(normalizedTables.map(t => tableKey(t.owner, t.tableName)));
+    this.logger.log(`Found ${relationships.length} foreign key relationships for the tables`);
     return relationships;
   }
+
   
   /**
    * Get dictionary views metadata when no regular tables are accessible
@@ -1173,6 +1118,8 @@ export class DatabaseService {
         
         this.logger.log(`Processing detailed metadata for table: ${tableOwner}.${tableName}`);
         
+        const binds = { tableName, schema: tableOwner };
+        
         // Get column information
         const columnQuery = `
           SELECT 
@@ -1184,12 +1131,12 @@ export class DatabaseService {
             nullable, 
             column_id
           FROM all_tab_columns 
-          WHERE table_name = '${tableName}' 
-          AND owner = '${tableOwner}'
+          WHERE table_name = :tableName 
+          AND owner = :schema
           ORDER BY column_id
         `;
         
-        const columns = await this.executeQuery(connection, columnQuery, 5000);
+        const columns = await this.executeQuery(connection, columnQuery, 5000, binds);
         
         // Get table comments
         let tableComment = '';
@@ -1197,11 +1144,11 @@ export class DatabaseService {
           const commentQuery = `
             SELECT comments 
             FROM all_tab_comments 
-            WHERE table_name = '${tableName}' 
-            AND owner = '${tableOwner}'
+            WHERE table_name = :tableName 
+            AND owner = :schema
           `;
           
-          const comments = await this.executeQuery(connection, commentQuery, 3000);
+          const comments = await this.executeQuery(connection, commentQuery, 3000, binds);
           if (comments.length > 0 && comments[0].COMMENTS) {
             tableComment = comments[0].COMMENTS;
           }
@@ -1215,12 +1162,12 @@ export class DatabaseService {
             const colCommentQuery = `
               SELECT comments 
               FROM all_col_comments 
-              WHERE table_name = '${tableName}' 
-              AND owner = '${tableOwner}'
-              AND column_name = '${column.COLUMN_NAME}'
+              WHERE table_name = :tableName 
+              AND owner = :schema
+              AND column_name = :columnName
             `;
             
-            const colComments = await this.executeQuery(connection, colCommentQuery, 3000);
+            const colComments = await this.executeQuery(connection, colCommentQuery, 3000, { ...binds, columnName: column.COLUMN_NAME });
             if (colComments.length > 0 && colComments[0].COMMENTS) {
               column.COMMENT = colComments[0].COMMENTS;
             }
@@ -1236,14 +1183,14 @@ export class DatabaseService {
             SELECT cols.column_name
             FROM all_constraints cons, all_cons_columns cols
             WHERE cons.constraint_type = 'P'
-            AND cons.table_name = '${tableName}'
-            AND cons.owner = '${tableOwner}'
+            AND cons.table_name = :tableName
+            AND cons.owner = :schema
             AND cons.constraint_name = cols.constraint_name
             AND cons.owner = cols.owner
             ORDER BY cols.position
           `;
           
-          const pkColumns = await this.executeQuery(connection, pkQuery, 3000);
+          const pkColumns = await this.executeQuery(connection, pkQuery, 3000, binds);
           primaryKey = pkColumns.map(row => row.COLUMN_NAME);
         } catch (error) {
           this.logger.warn(`Could not get primary key for ${tableOwner}.${tableName}: ${error.message}`);
@@ -1309,64 +1256,19 @@ export class DatabaseService {
   
   /**
    * Collect relationship information between tables
+   * Keys held by the tables and keys pointing at them from the same schemas are both kept.
    */
   private async collectTableRelationships(connection: any, tables: any[]): Promise<any[]> {
-    const relationships = [];
-    
-    try {
-      // Get all foreign key relationships for the tables we're processing
-      const tableNames = tables.map(t => `'${t.TABLE_NAME}'`).join(',');
-      const schemaNames = [...new Set(tables.map(t => t.OWNER))].map(s => `'${s}'`).join(',');
-      
-      if (tableNames.length === 0 || schemaNames.length === 0) {
-        return relationships;
-      }
-      
-      const fkQuery = `
-        SELECT 
-          cons.owner as schema_name,
-          cons.table_name as table_name,
-          cols.column_name as column_name,
-          cons.r_owner as r_schema_name,
-          r_cons.table_name as r_table_name,
-          r_cols.column_name as r_column_name
-        FROM 
-          all_constraints cons
-          JOIN all_cons_columns cols ON cons.constraint_name = cols.constraint_name AND cons.owner = cols.owner
-          JOIN all_constraints r_cons ON cons.r_constraint_name = r_cons.constraint_name AND cons.r_owner = r_cons.owner
-          JOIN all_cons_columns r_cols ON r_cons.constraint_name = r_cols.constraint_name AND r_cons.owner = r_cols.owner
-        WHERE 
-          cons.constraint_type = 'R'
-          AND (cons.owner IN (${schemaNames}) OR cons.r_owner IN (${schemaNames}))
-          AND (cons.table_name IN (${tableNames}) OR r_cons.table_name IN (${tableNames}))
-      `;
-      
-      const foreignKeys = await this.executeQuery(connection, fkQuery, 10000);
-      this.logger.log(`Found ${foreignKeys.length} foreign key relationships`);
-      
-      // Process foreign keys into relationship objects
-      for (const fk of foreignKeys) {
-        relationships.push({
-          type: 'Foreign Key',
-          source: {
-            schema: fk.SCHEMA_NAME,
-            table: fk.TABLE_NAME,
-            column: fk.COLUMN_NAME
-          },
-          target: {
-            schema: fk.R_SCHEMA_NAME,
-            table: fk.R_TABLE_NAME,
-            column: fk.R_COLUMN_NAME
-          }
-        });
-      }
-    } catch (error) {
-      this.logger.error(`Error collecting table relationships: ${error.message}`);
-      // Continue with empty relationships rather than failing
+    if (tables.length === 0) {
+      return [];
     }
     
+    const graph = await this.getForeignKeyGraph(connection, tables.map(t => t.OWNER));
+    const relationships = graph.touching(tables.map(t => tableKey(t.OWNER, t.TABLE_NAME)));
+    this.logger.log(`Found ${relationships.length} foreign key relationships`);
     return relationships;
   }
+
   
   /**
    * Get general database information
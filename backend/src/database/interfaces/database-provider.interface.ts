@@ -1,3 +1,16 @@
+import { QueryBinds } from '../../utils/sql-binds.util';
+import { ForeignKeyRelationship } from '../../utils/foreign-key-graph.util';
+
+/**
+ * Options of a query whose rows are fetched in batches
+ */
+export interface QueryStreamOptions {
+  /** Query timeout in milliseconds */
+  timeout?: number;
+  /** Rows fetched per round trip to the database, and per batch */
+  batchRows?: number;
+}
+
 /**
  * Interface for database providers
  * This ensures consistent implementation across different database systems
@@ -15,9 +28,22 @@ export interface DatabaseProvider {
    * @param connection Database connection
    * @param sql SQL query to execute
    * @param timeout Query timeout in milliseconds
+   * @param binds Values of the :name placeholders in the query; a query with binds runs as a
+   * prepared statement that the connection keeps for the next call with the same text
    * @returns Query results
    */
-  executeQuery(connection: any, sql: string, timeout?: number): Promise<any[]>;
+  executeQuery(connection: any, sql: string, timeout?: number, binds?: QueryBinds): Promise<any[]>;
+  
+  /**
+   * Execute a SQL query through a cursor, yielding its rows in batches as they are fetched
+   * Only one batch is held in memory at a time. Stopping the iteration early closes the
+   * cursor, and the connection can be used again unless isUsable() says otherwise.
+   * @param connection Database connection
+   * @param sql SQL query to execute
+   * @param options Timeout and batch size
+   * @returns Batches of rows
+   */
+  streamQuery(connection: any, sql: string, options?: QueryStreamOptions): AsyncGenerator<any[]>;
   
   /**
    * Close a database connection
@@ -25,6 +51,14 @@ export interface DatabaseProvider {
    */
   closeConnection(connection: any): Promise<void>;
   
+  /**
+   * Whether a connection can run another query; providers that can give up on a connection
+   * mid-query report it here, and the pool closes it instead of reusing it
+   * @param connection Database connection
+   * @returns False if the connection must not be reused
+   */
+  isUsable?(connection: any): boolean;
+  
   /**
    * Check if a SQL query is safe to execute
    * @param sql SQL query to validate
@@ -45,4 +79,12 @@ export interface DatabaseProvider {
    * @returns Database metadata including tables, columns, and relationships
    */
   getDatabaseMetadata(connection: any): Promise<any>;
+  
+  /**
+   * Get every foreign key of a schema with one set-based catalog query
+   * @param connection Database connection
+   * @param schema Schema whose tables hold the foreign keys
+   * @returns One relationship per foreign key column
+   */
+  getForeignKeys(connection: any, schema: string): Promise<ForeignKeyRelationship[]>;
 }
\ No newline at end of file
@@ -1,6 +1,9 @@
 import { Logger } from '@nestjs/common';
 import * as mssql from 'mssql';
-import { DatabaseProvider } from '../interfaces/database-provider.interface';
+import { DatabaseProvider, QueryStreamOptions } from '../interfaces/database-provider.interface';
+import { rowBatches } from '../../utils/row-batch.util';
+import { QueryBinds, bindQuery } from '../../utils/sql-binds.util';
+import { ForeignKeyGraph, ForeignKeyRelationship, tableKey } from '../../utils/foreign-key-graph.util';
 
 /**
  * Microsoft SQL Server database provider implementation
@@ -102,12 +105,15 @@ export class MssqlDatabaseProvider implements DatabaseProvider {
    * @param connection SQL Server connection pool
    * @param sql SQL query to execute
    * @param timeout Query timeout in milliseconds
+   * @param binds Values of the :name placeholders; the query then runs through sp_executesql
+   * with typed parameters, so SQL Server reuses one cached plan for every value
    * @returns Query results as array of objects
    */
   async executeQuery(
     connection: mssql.ConnectionPool, 
     sql: string, 
-    timeout: number = 10000
+    timeout: number = 10000,
+    binds?: QueryBinds
   ): Promise<any[]> {
     const cleanSql = sql.trim();
     this.logger.log(`Executing SQL Server query: ${cleanSql}`);
@@ -116,8 +122,22 @@ export class MssqlDatabaseProvider implements DatabaseProvider {
       // Create a request with our own timeout handling
       const request = connection.request();
       
+      let text = cleanSql;
+      if (binds) {
+        const bound = bindQuery(cleanSql, binds, 'mssql');
+        for (const [name, value] of Object.entries(bound.values)) {
+          // One declared type for every string, so every value shares the cached plan
+          if (typeof value === 'string' || value === null) {
+            request.input(name, mssql.NVarChar(4000), value);
+          } else {
+            request.input(name, value);
+          }
+        }
+        text = bound.sql;
+      }
+      
       // Using a promise race to implement timeout
-      const queryPromise = request.query(cleanSql);
+      const queryPromise = request.query(text);
       const timeoutPromise = new Promise<any>((_, reject) => {
         setTimeout(() => reject(new Error('Query execution timed out')), timeout);
       });
@@ -129,57 +149,113 @@ export class MssqlDatabaseProvider implements DatabaseProvider {
       return result.recordset || [];
     } catch (error) {
       this.logger.error(`Error executing SQL Server query: ${error.message}`);
-      
-      // Enhanced error handling for SQL Server query execution
-      // Error numbers: https://learn.microsoft.com/en-us/sql/relational-databases/errors-events/database-engine-events-and-errors
-      
-      // Timeout errors
-      if (error.code === 'ETIMEOUT') {
-        throw new Error(`Query execution timed out. The query took longer than ${timeout}ms to execute.`);
-      }
-      
-      // SQL Server specific error codes
-      if (error.number === 208) {
-        throw new Error(`Invalid object name. The specified table or view does not exist.`);
-      }
-      if (error.number === 207) {
-        throw new Error(`Invalid column name. One or more columns in the query do not exist.`);
-      }
-      if (error.number === 156 || error.number === 170) {
-        throw new Error(`SQL syntax error. Check the query syntax: ${error.message}`);
-      }
-      if (error.number === 1205) {
-        throw new Error(`Transaction deadlock. Try simplifying the transaction or retry later.`);
-      }
-      if (error.number === 229) {
-        throw new Error(`Permission denied. The current user lacks SELECT permission on the object.`);
-      }
-      if (error.number === 4060) {
-        throw new Error(`Cannot open database. The database might not exist or you don't have access to it.`);
-      }
-      if (error.number === 4064) {
-        throw new Error(`Database is not available. The database may be offline or inaccessible.`);
-      }
-      if (error.number === 547) {
-        throw new Error(`Constraint violation. The statement conflicted with a database constraint.`);
-      }
-      if (error.number === 262) {
-        throw new Error(`Table/view does not have a primary key defined and cannot be referenced.`);
-      }
-      if (error.number === 8152) {
-        throw new Error(`String or binary data would be truncated. The data is too long for a column.`);
+      throw this.queryError(error, connection, timeout);
+    }
+  }
+  
+  /**
+   * Execute a SQL query on SQL Server connection in stream mode, yielding its rows in batches
+   * The request is paused while the consumer is behind, and cancelled when the timeout
+   * passes or the caller stops early.
+   * @param connection SQL Server connection pool
+   * @param sql SQL query to execute
+   * @param options Timeout and batch size
+   */
+  async *streamQuery(
+    connection: mssql.ConnectionPool,
+    sql: string,
+    options: QueryStreamOptions = {}
+  ): AsyncGenerator<any[]> {
+    const { timeout = 10000, batchRows = 500 } = options;
+    const cleanSql = sql.trim();
+    this.logger.log(`Streaming SQL Server query: ${cleanSql}`);
+    
+    const request = connection.request();
+    request.stream = true;
+    const stream = request.toReadableStream({ highWaterMark: batchRows });
+    
+    let timedOut = false;
+    const timer = setTimeout(() => {
+      timedOut = true;
+      request.cancel();
+    }, timeout);
+    request.query(cleanSql);
+    
+    let rows = 0;
+    let complete = false;
+    try {
+      for await (const batch of rowBatches(stream, batchRows)) {
+        rows += batch.length;
+        yield batch;
       }
-      
-      // Connection state errors
-      if (!connection.connected) {
-        throw new Error(`Connection closed or broken. The SQL Server connection is no longer active.`);
+      complete = true;
+      this.logger.log(`Query streamed successfully, rows returned: ${rows}`);
+    } catch (error) {
+      this.logger.error(`Error streaming SQL Server query: ${error.message}`);
+      throw this.queryError(timedOut ? Object.assign(error, { code: 'ETIMEOUT' }) : error, connection, timeout);
+    } finally {
+      clearTimeout(timer);
+      if (!complete) {
+        // The cancellation error has nobody left to read it
+        request.on('error', () => undefined);
+        request.cancel();
       }
-      
-      // Default error with more context
-      throw new Error(`SQL Server query execution failed: ${error.message}. Error code: ${error.code || error.number || 'unknown'}`);
     }
   }
   
+  /**
+   * Error with a diagnostic message for a failed SQL Server query
+   */
+  private queryError(error: any, connection: mssql.ConnectionPool, timeout: number): Error {
+    // Enhanced error handling for SQL Server query execution
+    // Error numbers: https://learn.microsoft.com/en-us/sql/relational-databases/errors-events/database-engine-events-and-errors
+    
+    // Timeout errors
+    if (error.code === 'ETIMEOUT') {
+      return new Error(`Query execution timed out. The query took longer than ${timeout}ms to execute.`);
+    }
+    
+    // SQL Server specific error codes
+    if (error.number === 208) {
+      return new Error(`Invalid object name. The specified table or view does not exist.`);
+    }
+    if (error.number === 207) {
+      return new Error(`Invalid column name. One or more columns in the query do not exist.`);
+    }
+    if (error.number === 156 || error.number === 170) {
+      return new Error(`SQL syntax error. Check the query syntax: ${error.message}`);
+    }
+    if (error.number === 1205) {
+      return new Error(`Transaction deadlock. Try simplifying the transaction or retry later.`);
+    }
+    if (error.number === 229) {
+      return new Error(`Permission denied. The current user lacks SELECT permission on the object.`);
+    }
+    if (error.number === 4060) {
+      return new Error(`Cannot open database. The database might not exist or you don't have access to it.`);
+    }
+    if (error.number === 4064) {
+      return new Error(`Database is not available. The database may be offline or inaccessible.`);
+    }
+    if (error.number === 547) {
+      return new Error(`Constraint violation. The statement conflicted with a database constraint.`);
+    }
+    if (error.number === 262) {
+      return new Error(`Table/view does not have a primary key defined and cannot be referenced.`);
+    }
+    if (error.number === 8152) {
+      return new Error(`String or binary data would be truncated. The data is too long for a column.`);
+    }
+    
+    // Connection state errors
+    if (!connection.connected) {
+      return new Error(`Connection closed or broken. The SQL Server connection is no longer active.`);
+    }
+    
+    // Default error with more context
+    return new Error(`SQL Server query execution failed: ${error.message}. Error code: ${error.code || error.number || 'unknown'}`);
+  }
+  
   /**
    * Close a SQL Server connection
    * @param connection SQL Server connection pool to close
@@ -389,13 +465,13 @@ export class MssqlDatabaseProvider implements DatabaseProvider {
             INNER JOIN sys.tables tbl ON c.object_id = tbl.object_id
             INNER JOIN sys.schemas s ON tbl.schema_id = s.schema_id
           WHERE 
-            s.name = '${table.schema}' 
-            AND tbl.name = '${table.table_name}'
+            s.name = :schema 
+            AND tbl.name = :tableName
           ORDER BY 
             c.column_id
         `;
         
-        const columns = await this.executeQuery(connection, columnsQuery, 5000);
+        const columns = await this.executeQuery(connection, columnsQuery, 5000, { schema: table.schema, tableName: table.table_name });
         
         // Format columns to be consistent with Oracle format
         const formattedColumns = columns.map(column => ({
@@ -419,13 +495,13 @@ export class MssqlDatabaseProvider implements DatabaseProvider {
             INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
           WHERE 
             i.is_primary_key = 1
-            AND s.name = '${table.schema}'
-            AND t.name = '${table.table_name}'
+            AND s.name = :schema
+            AND t.name = :tableName
           ORDER BY 
             ic.key_ordinal
         `;
         
-        const pkColumns = await this.executeQuery(connection, pkQuery, 5000);
+        const pkColumns = await this.executeQuery(connection, pkQuery, 5000, { schema: table.schema, tableName: table.table_name });
         const primaryKey = pkColumns.map(row => row.column_name);
         
         // Get sample data (limited to 5 rows)
@@ -454,91 +530,76 @@ export class MssqlDatabaseProvider implements DatabaseProvider {
   }
   
   /**
-   * Collect relationship information between tables
-   * @param connection SQL Server connection pool
+   * Get every foreign key of a schema with one catalog query
+   * @param connection Database connection
+   * @param schema Schema whose tables hold the foreign keys
+   * @returns One relationship per foreign key column
+   */
+  async getForeignKeys(connection: mssql.ConnectionPool, schema: string): Promise<ForeignKeyRelationship[]> {
+    const foreignKeysQuery = `
+      SELECT
+        fk.name AS constraint_name,
+        ss.name AS source_schema,
+        st.name AS source_table,
+        sc.name AS source_column,
+        ts.name AS target_schema,
+        tt.name AS target_table,
+        tc.name AS target_column
+      FROM
+        sys.foreign_keys fk
+        INNER JOIN sys.foreign_key_columns fkc ON fkc.constraint_object_id = fk.object_id
+        INNER JOIN sys.tables st ON fk.parent_object_id = st.object_id
+        INNER JOIN sys.schemas ss ON st.schema_id = ss.schema_id
+        INNER JOIN sys.columns sc ON fkc.parent_object_id = sc.object_id AND fkc.parent_column_id = sc.column_id
+        INNER JOIN sys.tables tt ON fk.referenced_object_id = tt.object_id
+        INNER JOIN sys.schemas ts ON tt.schema_id = ts.schema_id
+        INNER JOIN sys.columns tc ON fkc.referenced_object_id = tc.object_id AND fkc.referenced_column_id = tc.column_id
+      WHERE
+        ss.name = :schema
+      ORDER BY
+        st.name, fk.name, fkc.constraint_column_id
+    `;
+    
+    const rows = await this.executeQuery(connection, foreignKeysQuery, 10000, { schema });
+    return rows.map((row): ForeignKeyRelationship => ({
+      type: 'Foreign Key',
+      constraint: row.constraint_name,
+      source: {
+        schema: row.source_schema,
+        table: row.source_table,
+        column: row.source_column
+      },
+      target: {
+        schema: row.target_schema,
+        table: row.target_table,
+        column: row.target_column
+      }
+    }));
+  }
+  
+  /**
+   * Collect relationships between tables
+   * Foreign keys are read once per schema and then picked from the graph by table.
+   * @param connection Database connection
    * @param tables List of tables to collect relationships for
    * @returns Table relationships
    */
   private async collectTableRelationships(connection: mssql.ConnectionPool, tables: any[]): Promise<any[]> {
-    const relationships = [];
-    
     // Only try to get relationships if we have tables
     if (tables.length === 0) {
-      return relationships;
+      return [];
     }
     
-    try {
-      // Create a list of schema.table_name values
-      const tableList = tables.map(t => `'${t.schema}.${t.table_name}'`).join(',');
-      
-      const relationshipsQuery = `
-        SELECT
-          ss.name AS source_schema,
-          st.name AS source_table,
-          sc.name AS source_column,
-          ts.name AS target_schema,
-          tt.name AS target_table,
-          tc.name AS target_column
-        FROM 
-          sys.foreign_key_columns fkc
-          INNER JOIN sys.tables st ON fkc.parent_object_id = st.object_id
-          INNER JOIN sys.schemas ss ON st.schema_id = ss.schema_id
-          INNER JOIN sys.columns sc ON fkc.parent_object_id = sc.object_id AND fkc.parent_column_id = sc.column_id
-          INNER JOIN sys.tables tt ON fkc.referenced_object_id = tt.object_id
-          INNER JOIN sys.schemas ts ON tt.schema_id = ts.schema_id
-          INNER JOIN sys.columns tc ON fkc.referenced_object_id = tc.object_id AND fkc.referenced_column_id = tc.column_id
-        WHERE 
-          ss.name + '.' + st.name IN (${tableList})
-        ORDER BY
-          ss.name, st.name, sc.name
-      `;
-      
-      // SQL Server may have issues with the query above, provide a fallback
-      let relationshipRows;
+    const graph = new ForeignKeyGraph();
+    for (const schema of new Set(tables.map(t => t.schema))) {
       try {
-        relationshipRows = await this.executeQuery(connection, relationshipsQuery, 10000);
+        graph.add(await this.getForeignKeys(connection, schema));
       } catch (error) {
-        this.logger.warn(`Error executing relationship query: ${error.message}. Trying fallback.`);
-        
-        // Fallback to a simpler relationship query
-        const fallbackQuery = `
-          SELECT
-            OBJECT_SCHEMA_NAME(f.parent_object_id) AS source_schema,
-            OBJECT_NAME(f.parent_object_id) AS source_table,
-            COL_NAME(fc.parent_object_id, fc.parent_column_id) AS source_column,
-            OBJECT_SCHEMA_NAME(f.referenced_object_id) AS target_schema,
-            OBJECT_NAME(f.referenced_object_id) AS target_table,
-            COL_NAME(fc.referenced_object_id, fc.referenced_column_id) AS target_column
-          FROM 
-            sys.foreign_keys AS f
-            INNER JOIN sys.foreign_key_columns AS fc ON f.object_id = fc.constraint_object_id
-          ORDER BY
-            source_schema, source_table
-        `;
-        
-        relationshipRows = await this.executeQuery(connection, fallbackQuery, 10000);
+        this.logger.warn(`Error collecting SQL Server relationships for schema ${schema}: ${error.message}`);
       }
-      
-      // Process relationships
-      for (const row of relationshipRows) {
-        relationships.push({
-          type: 'Foreign Key',
-          source: {
-            schema: row.source_schema,
-            table: row.source_table,
-            column: row.source_column
-          },
-          target: {
-            schema: row.target_schema,
-            table: row.target_table,
-            column: row.target_column
-          }
-        });
-      }
-    } catch (error) {
-      this.logger.warn(`Error collecting SQL Server relationships: ${error.message}`);
     }
     
-    return relationships;
+    return graph.from(tables.map(t => tableKey(t.schema, t.table_name)));
   }
+
 }
\ No newline at end of file
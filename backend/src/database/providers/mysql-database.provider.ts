@@ -1,12 +1,24 @@
 import { Logger } from '@nestjs/common';
 import * as mysql from 'mysql2/promise';
-import { DatabaseProvider } from '../interfaces/database-provider.interface';
+import { DatabaseProvider, QueryStreamOptions } from '../interfaces/database-provider.interface';
+import { rowBatches } from '../../utils/row-batch.util';
+import { QueryBinds, bindQuery } from '../../utils/sql-binds.util';
+import { ForeignKeyGraph, ForeignKeyRelationship, tableKey } from '../../utils/foreign-key-graph.util';
 
 /**
  * MySQL database provider implementation
  */
 export class MysqlDatabaseProvider implements DatabaseProvider {
   private readonly logger = new Logger(MysqlDatabaseProvider.name);
+  // Settings each connection was opened with, to open a second one that can kill its query
+  private readonly connectionConfigs = new WeakMap<mysql.Connection, any>();
+  // Connections dropped mid-query, which can't run another statement
+  private readonly brokenConnections = new WeakSet<mysql.Connection>();
+  
+  /**
+   * @param statementCacheSize Prepared statements each connection keeps for reuse
+   */
+  constructor(private readonly statementCacheSize = 100) {}
   
   /**
    * Connect to a MySQL database
@@ -31,7 +43,9 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
           rejectUnauthorized: false // For self-signed certificates
         } : undefined,
         // Add connection timeout
-        connectTimeout: 5000
+        connectTimeout: 5000,
+        // Least recently used prepared statements are closed past this count
+        maxPreparedStatements: Math.max(1, this.statementCacheSize)
       };
       
       // Create connection
@@ -42,6 +56,7 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
       await connection.query('SELECT 1 AS connection_test');
       this.logger.log('✓ MySQL connection successful');
       
+      this.connectionConfigs.set(connection, connectionConfig);
       return connection;
     } catch (error) {
       this.logger.error(`Error connecting to MySQL: ${error.message}`);
@@ -92,12 +107,15 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
    * @param connection MySQL connection
    * @param sql SQL query to execute
    * @param timeout Query timeout in milliseconds
+   * @param binds Values of the :name placeholders; the query then runs as a prepared
+   * statement from the connection's statement cache
    * @returns Query results as array of objects
    */
   async executeQuery(
     connection: mysql.Connection, 
     sql: string, 
-    timeout: number = 10000
+    timeout: number = 10000,
+    binds?: QueryBinds
   ): Promise<any[]> {
     const cleanSql = sql.trim();
     this.logger.log(`Executing MySQL query: ${cleanSql}`);
@@ -107,7 +125,13 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
       await connection.query(`SET SESSION MAX_EXECUTION_TIME = ${Math.floor(timeout)}`);
       
       // Execute the query
-      const [rows] = await connection.query(cleanSql);
+      let rows: any;
+      if (binds) {
+        const bound = bindQuery(cleanSql, binds, 'mysql');
+        [rows] = await connection.execute(bound.sql, bound.values as any[]);
+      } else {
+        [rows] = await connection.query(cleanSql);
+      }
       
       this.logger.log(`Query executed successfully, rows returned: ${Array.isArray(rows) ? rows.length : 1}`);
       
@@ -115,55 +139,163 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
       return Array.isArray(rows) ? rows : [rows];
     } catch (error) {
       this.logger.error(`Error executing MySQL query: ${error.message}`);
-      
-      // Enhanced error handling for MySQL query execution
-      if (error.errno === 1064) {
-        throw new Error(`SQL syntax error in query: ${error.message}`);
-      }
-      if (error.errno === 1146) {
-        throw new Error(`Table doesn't exist: ${error.message}`);
-      }
-      if (error.errno === 1054) {
-        throw new Error(`Unknown column in query: ${error.message}`);
-      }
-      if (error.errno === 1052) {
-        throw new Error(`Column is ambiguous (appears in multiple tables): ${error.message}`);
-      }
-      if (error.errno === 1109) {
-        throw new Error(`Unknown table in query: ${error.message}`);
-      }
-      if (error.errno === 1142) {
-        throw new Error(`Permission denied. Insufficient privileges for this operation: ${error.message}`);
-      }
-      if (error.errno === 1065) {
-        throw new Error(`Query was empty: ${error.message}`);
-      }
-      if (error.errno === 1205) {
-        throw new Error(`Lock wait timeout exceeded. The transaction might have been deadlocked: ${error.message}`);
-      }
-      if (error.errno === 1213) {
-        throw new Error(`Deadlock detected. Try restarting the transaction: ${error.message}`);
-      }
-      if (error.errno === 1040) {
-        throw new Error(`Too many connections to MySQL server: ${error.message}`);
+      throw this.queryError(error);
+    }
+  }
+  
+  /**
+   * Execute a SQL query on MySQL connection as a row stream, yielding its rows in batches
+   * The driver pauses the socket while the consumer is behind, so only about one batch is
+   * buffered at a time. Stopping early kills the query from a second connection; if that
+   * fails the connection is dropped instead, and isUsable() reports it.
+   * @param connection MySQL connection
+   * @param sql SQL query to execute
+   * @param options Timeout and batch size
+   */
+  async *streamQuery(
+    connection: mysql.Connection,
+    sql: string,
+    options: QueryStreamOptions = {}
+  ): AsyncGenerator<any[]> {
+    const { timeout = 10000, batchRows = 500 } = options;
+    const cleanSql = sql.trim();
+    this.logger.log(`Streaming MySQL query: ${cleanSql}`);
+    
+    try {
+      await connection.query(`SET SESSION MAX_EXECUTION_TIME = ${Math.floor(timeout)}`);
+    } catch (error) {
+      this.logger.error(`Error streaming MySQL query: ${error.message}`);
+      throw this.queryError(error);
+    }
+    
+    // The promise wrapper has no streams; the callback connection underneath does
+    const core = connection.connection;
+    const query = core.query(cleanSql);
+    const finished = new Promise<void>(resolve => {
+      query.once('end', () => resolve());
+      query.once('error', () => resolve());
+    });
+    const stream = query.stream({ highWaterMark: batchRows });
+    
+    let rows = 0;
+    let complete = false;
+    try {
+      for await (const batch of rowBatches(stream, batchRows)) {
+        rows += batch.length;
+        yield batch;
       }
-      if (error.code === 'PROTOCOL_SEQUENCE_TIMEOUT') {
-        throw new Error(`Query execution timed out. The query might be too complex or the server is overloaded.`);
+      complete = true;
+      this.logger.log(`Query streamed successfully, rows returned: ${rows}`);
+    } catch (error) {
+      this.logger.error(`Error streaming MySQL query: ${error.message}`);
+      throw this.queryError(error);
+    } finally {
+      if (!complete) {
+        query.removeAllListeners('result');
+        stream.on('error', () => undefined);
+        stream.destroy();
+        // Otherwise the server sends the rest of the result, which would have to be read off
+        // the socket before the connection can run its next query
+        if (await this.killQuery(connection)) {
+          core.resume();
+          await finished;
+        } else {
+          this.brokenConnections.add(connection);
+          core.destroy();
+        }
       }
-      if (error.code === 'PROTOCOL_CONNECTION_LOST') {
-        throw new Error(`Connection to MySQL server was lost. The server might have been restarted or the network connection interrupted.`);
+    }
+  }
+  
+  /**
+   * Stop the statement a connection is running with KILL QUERY from a short-lived second connection
+   * @returns False if the query could not be killed
+   */
+  private async killQuery(connection: mysql.Connection): Promise<boolean> {
+    const config = this.connectionConfigs.get(connection);
+    const threadId = Number(connection.connection.threadId);
+    if (!config || !threadId) {
+      return false;
+    }
+    
+    let killer: mysql.Connection = null;
+    try {
+      killer = await mysql.createConnection(config);
+      await killer.query(`KILL QUERY ${threadId}`);
+      return true;
+    } catch (error) {
+      this.logger.warn(`Could not kill MySQL query on thread ${threadId}: ${error.message}`);
+      return false;
+    } finally {
+      if (killer) {
+        await killer.end().catch(() => undefined);
       }
-      
-      // Default error with more context
-      throw new Error(`MySQL query execution failed: ${error.message}. Error code: ${error.code || error.errno || 'unknown'}`);
     }
   }
   
+  /**
+   * Whether a connection can run another query; false once it was dropped mid-query
+   * @param connection MySQL connection
+   */
+  isUsable(connection: mysql.Connection): boolean {
+    return !this.brokenConnections.has(connection);
+  }
+  
+  /**
+   * Error with a diagnostic message for a failed MySQL query
+   */
+  private queryError(error: any): Error {
+    // Enhanced error handling for MySQL query execution
+    if (error.errno === 1064) {
+      return new Error(`SQL syntax error in query: ${error.message}`);
+    }
+    if (error.errno === 1146) {
+      return new Error(`Table doesn't exist: ${error.message}`);
+    }
+    if (error.errno === 1054) {
+      return new Error(`Unknown column in query: ${error.message}`);
+    }
+    if (error.errno === 1052) {
+      return new Error(`Column is ambiguous (appears in multiple tables): ${error.message}`);
+    }
+    if (error.errno === 1109) {
+      return new Error(`Unknown table in query: ${error.message}`);
+    }
+    if (error.errno === 1142) {
+      return new Error(`Permission denied. Insufficient privileges for this operation: ${error.message}`);
+    }
+    if (error.errno === 1065) {
+      return new Error(`Query was empty: ${error.message}`);
+    }
+    if (error.errno === 1205) {
+      return new Error(`Lock wait timeout exceeded. The transaction might have been deadlocked: ${error.message}`);
+    }
+    if (error.errno === 1213) {
+      return new Error(`Deadlock detected. Try restarting the transaction: ${error.message}`);
+    }
+    if (error.errno === 1040) {
+      return new Error(`Too many connections to MySQL server: ${error.message}`);
+    }
+    if (error.code === 'PROTOCOL_SEQUENCE_TIMEOUT') {
+      return new Error(`Query execution timed out. The query might be too complex or the server is overloaded.`);
+    }
+    if (error.code === 'PROTOCOL_CONNECTION_LOST') {
+      return new Error(`Connection to MySQL server was lost. The server might have been restarted or the network connection interrupted.`);
+    }
+    
+    // Default error with more context
+    return new Error(`MySQL query execution failed: ${error.message}. Error code: ${error.code || error.errno || 'unknown'}`);
+  }
+  
   /**
    * Close a MySQL connection
    * @param connection MySQL connection to close
    */
   async closeConnection(connection: mysql.Connection): Promise<void> {
+    if (this.brokenConnections.has(connection)) {
+      // Already destroyed; end() would wait for a server that is gone
+      return;
+    }
     try {
       await connection.end();
       this.logger.log('MySQL connection closed successfully');
@@ -398,12 +530,12 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
             information_schema.columns
           WHERE 
             table_schema = DATABASE() 
-            AND table_name = '${table.table_name}'
+            AND table_name = :tableName
           ORDER BY 
             ordinal_position
         `;
         
-        const columns = await this.executeQuery(connection, columnsQuery, 5000);
+        const columns = await this.executeQuery(connection, columnsQuery, 5000, { tableName: table.table_name });
         
         // Format columns to be consistent with Oracle format
         const formattedColumns = columns.map(column => ({
@@ -423,13 +555,13 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
             information_schema.key_column_usage
           WHERE 
             table_schema = DATABASE() 
-            AND table_name = '${table.table_name}'
+            AND table_name = :tableName
             AND constraint_name = 'PRIMARY'
           ORDER BY 
             ordinal_position
         `;
         
-        const pkColumns = await this.executeQuery(connection, pkQuery, 5000);
+        const pkColumns = await this.executeQuery(connection, pkQuery, 5000, { tableName: table.table_name });
         const primaryKey = pkColumns.map(row => row.column_name);
         
         // Get sample data (limited to 5 rows)
@@ -458,64 +590,70 @@ export class MysqlDatabaseProvider implements DatabaseProvider {
   }
   
   /**
-   * Collect relationship information between tables
-   * @param connection MySQL connection
+   * Get every foreign key of a schema with one catalog query
+   * @param connection Database connection
+   * @param schema Schema whose tables hold the foreign keys
+   * @returns One relationship per foreign key column
+   */
+  async getForeignKeys(connection: mysql.Connection, schema: string): Promise<ForeignKeyRelationship[]> {
+    const foreignKeysQuery = `
+      SELECT
+        constraint_name AS constraint_name,
+        table_schema AS source_schema,
+        table_name AS source_table,
+        column_name AS source_column,
+        referenced_table_schema AS target_schema,
+        referenced_table_name AS target_table,
+        referenced_column_name AS target_column
+      FROM
+        information_schema.key_column_usage
+      WHERE
+        table_schema = :schema
+        AND referenced_table_name IS NOT NULL
+      ORDER BY
+        table_name, constraint_name, ordinal_position
+    `;
+    
+    const rows = await this.executeQuery(connection, foreignKeysQuery, 10000, { schema });
+    return rows.map((row): ForeignKeyRelationship => ({
+      type: 'Foreign Key',
+      constraint: row.constraint_name,
+      source: {
+        schema: row.source_schema,
+        table: row.source_table,
+        column: row.source_column
+      },
+      target: {
+        schema: row.target_schema,
+        table: row.target_table,
+        column: row.target_column
+      }
+    }));
+  }
+  
+  /**
+   * Collect relationships between tables
+   * Foreign keys are read once per schema and then picked from the graph by table.
+   * @param connection Database connection
    * @param tables List of tables to collect relationships for
    * @returns Table relationships
    */
   private async collectTableRelationships(connection: mysql.Connection, tables: any[]): Promise<any[]> {
-    const relationships = [];
-    
     // Only try to get relationships if we have tables
     if (tables.length === 0) {
-      return relationships;
+      return [];
     }
     
-    try {
-      // Create a comma-separated list of table names in format: 'table_name'
-      const tableList = tables.map(t => `'${t.table_name}'`).join(',');
-      
-      const relationshipsQuery = `
-        SELECT
-          table_name AS source_table,
-          column_name AS source_column,
-          referenced_table_name AS target_table,
-          referenced_column_name AS target_column
-        FROM
-          information_schema.key_column_usage
-        WHERE
-          referenced_table_name IS NOT NULL
-          AND table_schema = DATABASE()
-          AND referenced_table_schema = DATABASE()
-          AND table_name IN (${tableList})
-      `;
-      
-      const relationshipRows = await this.executeQuery(connection, relationshipsQuery, 10000);
-      
-      // Process relationships
-      for (const row of relationshipRows) {
-        // Get the database name as schema
-        const schema = await this.executeQuery(connection, 'SELECT DATABASE() AS db_name', 1000);
-        const dbName = schema.length > 0 ? (schema[0] as any).db_name : 'unknown';
-        
-        relationships.push({
-          type: 'Foreign Key',
-          source: {
-            schema: dbName, // In MySQL, schema is typically the database name
-            table: row.source_table,
-            column: row.source_column
-          },
-          target: {
-            schema: dbName,
-            table: row.target_table,
-            column: row.target_column
-          }
-        });
+    const graph = new ForeignKeyGraph();
+    for (const schema of new Set(tables.map(t => t.schema))) {
+      try {
+        graph.add(await this.getForeignKeys(connection, schema));
+      } catch (error) {
+        this.logger.warn(`Error collecting MySQL relationships for schema ${schema}: ${error.message}`);
       }
-    } catch (error) {
-      this.logger.warn(`Error collecting MySQL relationships: ${error.message}`);
     }
     
-    return relationships;
+    return graph.from(tables.map(t => tableKey(t.schema, t.table_name)));
   }
+
 }
\ No newline at end of file
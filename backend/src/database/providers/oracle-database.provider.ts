@@ -1,7 +1,10 @@
 import { Logger } from '@nestjs/common';
 import * as oracledb from 'oracledb';
-import { DatabaseProvider } from '../interfaces/database-provider.interface';
+import { DatabaseProvider, QueryStreamOptions } from '../interfaces/database-provider.interface';
 import { safelySerializable } from '../../utils/serialize.util';
+import { rowBatches } from '../../utils/row-batch.util';
+import { QueryBinds, bindQuery } from '../../utils/sql-binds.util';
+import { ForeignKeyGraph, ForeignKeyRelationship, tableKey } from '../../utils/foreign-key-graph.util';
 
 /**
  * Oracle database provider implementation
@@ -9,7 +12,10 @@ import { safelySerializable } from '../../utils/serialize.util';
 export class OracleDatabaseProvider implements DatabaseProvider {
   private readonly logger = new Logger(OracleDatabaseProvider.name);
   
-  constructor() {
+  /**
+   * @param statementCacheSize Parsed statements each connection keeps for reuse
+   */
+  constructor(private readonly statementCacheSize = 100) {
     // Initialize Oracle client
     this.initOracleClient();
   }
@@ -23,6 +29,8 @@ export class OracleDatabaseProvider implements DatabaseProvider {
       // Set default connection attributes
       oracledb.autoCommit = true;
       oracledb.outFormat = oracledb.OUT_FORMAT_OBJECT;
+      // Default for connections that don't set their own
+      oracledb.stmtCacheSize = this.statementCacheSize;
       this.logger.log('Oracle client initialized successfully');
     } catch (error) {
       this.logger.error(`Error initializing Oracle client: ${error.message}`);
@@ -95,7 +103,7 @@ export class OracleDatabaseProvider implements DatabaseProvider {
           password: password,
           connectString: finalConnectionString,
           connectTimeout: 15,
-          stmtCacheSize: 30
+          stmtCacheSize: this.statementCacheSize
         }
       }
     ];
@@ -166,11 +174,14 @@ export class OracleDatabaseProvider implements DatabaseProvider {
   
   /**
    * Execute a SQL query on a given connection with timeout
+   * With binds the statement text stays the same across calls, so it is parsed once and
+   * then found in the connection's statement cache.
    */
   async executeQuery(
     connection: oracledb.Connection, 
     sql: string, 
-    timeout: number = 10000
+    timeout: number = 10000,
+    binds?: QueryBinds
   ): Promise<any[]> {
     // Clean the SQL query
     sql = sql.trim();
@@ -189,7 +200,8 @@ export class OracleDatabaseProvider implements DatabaseProvider {
       });
       
       // Create a query execution promise
-      const queryPromise = connection.execute(sql, {}, { outFormat: oracledb.OUT_FORMAT_OBJECT });
+      const bound = binds ? bindQuery(sql, binds, 'oracle') : { sql, values: {} };
+      const queryPromise = connection.execute(bound.sql, bound.values, { outFormat: oracledb.OUT_FORMAT_OBJECT });
       
       // Race the two promises
       const result = await Promise.race([queryPromise, timeoutPromise]);
@@ -213,6 +225,47 @@ export class OracleDatabaseProvider implements DatabaseProvider {
     }
   }
   
+  /**
+   * Execute a SQL query through a query stream, yielding its rows in batches
+   * fetchArraySize rows come back per round trip, and callTimeout bounds each round trip.
+   */
+  async *streamQuery(
+    connection: oracledb.Connection,
+    sql: string,
+    options: QueryStreamOptions = {}
+  ): AsyncGenerator<any[]> {
+    const { timeout = 10000, batchRows = 500 } = options;
+    sql = sql.trim();
+    if (sql.endsWith(';')) {
+      sql = sql.slice(0, -1);
+    }
+    
+    this.logger.log(`Streaming SQL query: ${sql}`);
+    
+    const previousCallTimeout = connection.callTimeout || 0;
+    connection.callTimeout = Math.floor(timeout);
+    const stream = connection.queryStream(sql, {}, {
+      outFormat: oracledb.OUT_FORMAT_OBJECT,
+      fetchArraySize: batchRows,
+    });
+    
+    let rows = 0;
+    try {
+      for await (const batch of rowBatches(stream, batchRows)) {
+        rows += batch.length;
+        yield batch;
+      }
+      this.logger.log(`Query streamed successfully, rows returned: ${rows}`);
+    } catch (error) {
+      this.logger.error(`Error streaming query: ${error.message}`);
+      throw error;
+    } finally {
+      // Closes the result set if the caller stopped early
+      stream.destroy();
+      connection.callTimeout = previousCallTimeout;
+    }
+  }
+  
   /**
    * Close an Oracle database connection
    */
@@ -298,11 +351,11 @@ export class OracleDatabaseProvider implements DatabaseProvider {
       const tablesQuery = `
         SELECT owner, table_name, num_rows 
         FROM all_tables 
-        WHERE owner = '${currentUser}' OR owner IN ('HR', 'SCOTT', 'SH', 'OE')
+        WHERE owner = :currentUser OR owner IN ('HR', 'SCOTT', 'SH', 'OE')
         ORDER BY owner, table_name
       `;
       
-      const tables = await this.executeQuery(connection, tablesQuery, 10000);
+      const tables = await this.executeQuery(connection, tablesQuery, 10000, { currentUser });
       
       if (tables.length === 0) {
         this.logger.warn('No tables found for user or common schemas');
@@ -452,25 +505,25 @@ export class OracleDatabaseProvider implements DatabaseProvider {
         const columnsQuery = `
           SELECT column_name, data_type, data_length, data_precision, data_scale, nullable
           FROM all_tab_columns
-          WHERE owner = '${table.OWNER}' AND table_name = '${table.TABLE_NAME}'
+          WHERE owner = :schema AND table_name = :tableName
           ORDER BY column_id
         `;
         
-        const columns = await this.executeQuery(connection, columnsQuery, 5000);
+        const columns = await this.executeQuery(connection, columnsQuery, 5000, { schema: table.OWNER, tableName: table.TABLE_NAME });
         
         // Get primary key columns
         const pkQuery = `
           SELECT cols.column_name
           FROM all_constraints cons, all_cons_columns cols
           WHERE cons.constraint_type = 'P'
-          AND cons.owner = '${table.OWNER}'
-          AND cons.table_name = '${table.TABLE_NAME}'
+          AND cons.owner = :schema
+          AND cons.table_name = :tableName
           AND cons.constraint_name = cols.constraint_name
           AND cons.owner = cols.owner
           ORDER BY cols.position
         `;
         
-        const pkColumns = await this.executeQuery(connection, pkQuery, 5000);
+        const pkColumns = await this.executeQuery(connection, pkQuery, 5000, { schema: table.OWNER, tableName: table.TABLE_NAME });
         const primaryKey = pkColumns.map(row => row.COLUMN_NAME);
         
         // Get sample data (limited to 5 rows)
@@ -495,62 +548,74 @@ export class OracleDatabaseProvider implements DatabaseProvider {
   }
   
   /**
-   * Collect relationship information between tables
+   * Get every foreign key of a schema with one catalog query
+   * @param connection Database connection
+   * @param schema Schema whose tables hold the foreign keys
+   * @returns One relationship per foreign key column
    */
-  private async collectTableRelationships(connection: oracledb.Connection, tables: any[]): Promise<any[]> {
-    const relationships = [];
+  async getForeignKeys(connection: oracledb.Connection, schema: string): Promise<ForeignKeyRelationship[]> {
+    const foreignKeysQuery = `
+      SELECT
+        cons.constraint_name,
+        cons.owner AS source_schema,
+        cons.table_name AS source_table,
+        cols.column_name AS source_column,
+        r_cons.owner AS target_schema,
+        r_cons.table_name AS target_table,
+        r_cols.column_name AS target_column
+      FROM
+        all_constraints cons
+        JOIN all_cons_columns cols ON cols.owner = cons.owner AND cols.constraint_name = cons.constraint_name
+        JOIN all_constraints r_cons ON r_cons.owner = cons.r_owner AND r_cons.constraint_name = cons.r_constraint_name
+        JOIN all_cons_columns r_cols ON r_cols.owner = r_cons.owner AND r_cols.constraint_name = r_cons.constraint_name
+          AND r_cols.position = cols.position
+      WHERE
+        cons.constraint_type = 'R'
+        AND cons.owner = :schema
+      ORDER BY
+        cons.table_name, cons.constraint_name, cols.position
+    `;
     
+    const rows = await this.executeQuery(connection, foreignKeysQuery, 10000, { schema });
+    return rows.map((row): ForeignKeyRelationship => ({
+      type: 'Foreign Key',
+      constraint: row.CONSTRAINT_NAME,
+      source: {
+        schema: row.SOURCE_SCHEMA,
+        table: row.SOURCE_TABLE,
+        column: row.SOURCE_COLUMN
+      },
+      target: {
+        schema: row.TARGET_SCHEMA,
+        table: row.TARGET_TABLE,
+        column: row.TARGET_COLUMN
+      }
+    }));
+  }
+  
+  /**
+   * Collect relationships between tables
+   * Foreign keys are read once per schema and then picked from the graph by table.
+   * @param connection Database connection
+   * @param tables List of tables to collect relationships for
+   * @returns Table relationships
+   */
+  private async collectTableRelationships(connection: oracledb.Connection, tables: any[]): Promise<any[]> {
     // Only try to get relationships if we have tables
     if (tables.length === 0) {
-      return relationships;
+      return [];
     }
     
-    try {
-      // Prepare list of tables for the query
-      const tableOwners = tables.map(t => `'${t.OWNER}'`).join(',');
-      const tableNames = tables.map(t => `'${t.TABLE_NAME}'`).join(',');
-      
-      const relationshipsQuery = `
-        SELECT
-          cons.owner as source_owner,
-          cons.table_name as source_table,
-          cols.column_name as source_column,
-          r_cons.owner as target_owner,
-          r_cons.table_name as target_table,
-          r_cols.column_name as target_column
-        FROM
-          all_constraints cons
-          JOIN all_cons_columns cols ON cons.constraint_name = cols.constraint_name AND cons.owner = cols.owner
-          JOIN all_constraints r_cons ON cons.r_constraint_name = r_cons.constraint_name AND cons.r_owner = r_cons.owner
-          JOIN all_cons_columns r_cols ON r_cons.constraint_name = r_cols.constraint_name AND r_cons.owner = r_cols.owner
-        WHERE
-          cons.constraint_type = 'R'
-          AND cons.owner IN (${tableOwners})
-          AND cons.table_name IN (${tableNames})
-      `;
-      
-      const relationshipRows = await this.executeQuery(connection, relationshipsQuery, 10000);
-      
-      // Process relationships
-      for (const row of relationshipRows) {
-        relationships.push({
-          type: 'Foreign Key',
-          source: {
-            schema: row.SOURCE_OWNER,
-            table: row.SOURCE_TABLE,
-            column: row.SOURCE_COLUMN
-          },
-          target: {
-            schema: row.TARGET_OWNER,
-            table: row.TARGET_TABLE,
-            column: row.TARGET_COLUMN
-          }
-        });
+    const graph = new ForeignKeyGraph();
+    for (const schema of new Set(tables.map(t => t.OWNER))) {
+      try {
+        graph.add(await this.getForeignKeys(connection, schema));
+      } catch (error) {
+        this.logger.warn(`Error collecting relationships for schema ${schema}: ${error.message}`);
       }
-    } catch (error) {
-      this.logger.warn(`Error collecting relationships: ${error.message}`);
     }
     
-    return relationships;
+    return graph.from(tables.map(t => tableKey(t.OWNER, t.TABLE_NAME)));
   }
+
 }
\ No newline at end of file
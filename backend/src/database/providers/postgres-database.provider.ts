@@ -1,6 +1,10 @@
 import { Logger } from '@nestjs/common';
 import { Pool, Client, QueryResult } from 'pg';
-import { DatabaseProvider } from '../interfaces/database-provider.interface';
+import { createHash } from 'crypto';
+import Cursor = require('pg-cursor');
+import { DatabaseProvider, QueryStreamOptions } from '../interfaces/database-provider.interface';
+import { QueryBinds, bindQuery } from '../../utils/sql-binds.util';
+import { ForeignKeyGraph, ForeignKeyRelationship, tableKey } from '../../utils/foreign-key-graph.util';
 
 // Don't use Oracle-specific views that don't exist in PostgreSQL
 // Use PostgreSQL system catalogs instead:
@@ -98,12 +102,15 @@ export class PostgresDatabaseProvider implements DatabaseProvider {
    * @param connection PostgreSQL client connection
    * @param sql SQL query to execute
    * @param timeout Query timeout in milliseconds
+   * @param binds Values of the :name placeholders; the query then runs as a named prepared
+   * statement, parsed once per connection
    * @returns Query results as array of objects
    */
   async executeQuery(
     connection: Client, 
     sql: string, 
-    timeout: number = 10000
+    timeout: number = 10000,
+    binds?: QueryBinds
   ): Promise<any[]> {
     const cleanSql = sql.trim();
     this.logger.log(`Executing PostgreSQL query: ${cleanSql}`);
@@ -112,50 +119,113 @@ export class PostgresDatabaseProvider implements DatabaseProvider {
       // Set statement timeout in PostgreSQL
       await connection.query(`SET statement_timeout TO ${Math.floor(timeout)}`);
       
-      const result: QueryResult = await connection.query(cleanSql);
+      let result: QueryResult;
+      if (binds) {
+        // The client keeps statements by name, so the same text is parsed only on first use
+        const bound = bindQuery(cleanSql, binds, 'postgres');
+        result = await connection.query({
+          name: `stmt_${createHash('sha1').update(bound.sql).digest('hex').slice(0, 20)}`,
+          text: bound.sql,
+          values: bound.values as any[],
+        });
+      } else {
+        result = await connection.query(cleanSql);
+      }
       this.logger.log(`Query executed successfully, rows returned: ${result.rowCount || 0}`);
       
       return result.rows || [];
     } catch (error) {
       this.logger.error(`Error executing PostgreSQL query: ${error.message}`);
+      throw this.queryError(error);
+    }
+  }
+  
+  /**
+   * Execute a SQL query through a cursor on PostgreSQL connection, yielding its rows in batches
+   * Each batch is one fetch of batchRows rows from the server-side portal.
+   * @param connection PostgreSQL client connection
+   * @param sql SQL query to execute
+   * @param options Timeout and batch size
+   */
+  async *streamQuery(
+    connection: Client,
+    sql: string,
+    options: QueryStreamOptions = {}
+  ): AsyncGenerator<any[]> {
+    const { timeout = 10000, batchRows = 500 } = options;
+    const cleanSql = sql.trim();
+    this.logger.log(`Streaming PostgreSQL query: ${cleanSql}`);
+    
+    let cursor: Cursor = null;
+    let rows = 0;
+    try {
+      await connection.query(`SET statement_timeout TO ${Math.floor(timeout)}`);
+      cursor = connection.query(new Cursor(cleanSql));
       
-      // Enhanced error handling for query execution
-      if (error.code === '42P01') {
-        throw new Error(`Table or view does not exist: ${error.message}`);
-      }
-      if (error.code === '42703') {
-        throw new Error(`Column does not exist: ${error.message}`);
+      while (true) {
+        const batch = await cursor.read(batchRows);
+        if (batch.length > 0) {
+          rows += batch.length;
+          yield batch;
+        }
+        // A short batch is the last one
+        if (batch.length < batchRows) {
+          break;
+        }
       }
-      if (error.code === '42P18' || error.code === '42809') {
-        throw new Error(`Invalid function or procedure: ${error.message}`);
-      }
-      if (error.code === '23502') {
-        throw new Error(`Not null violation: ${error.message}`);
-      }
-      if (error.code === '23505') {
-        throw new Error(`Unique violation: ${error.message}`);
-      }
-      if (error.code === '42601') {
-        throw new Error(`Syntax error in SQL statement: ${error.message}`);
-      }
-      if (error.code === '42501') {
-        throw new Error(`Insufficient privileges: ${error.message}`);
-      }
-      if (error.code === '53300') {
-        throw new Error(`Query timeout: The query took too long to execute and was canceled.`);
-      }
-      if (error.code === '53400') {
-        throw new Error(`Configuration limit exceeded: ${error.message}`);
-      }
-      if (error.code === '08006') {
-        throw new Error(`Connection terminated unexpectedly. The server may have been shut down or restarted.`);
+      this.logger.log(`Query streamed successfully, rows returned: ${rows}`);
+    } catch (error) {
+      this.logger.error(`Error streaming PostgreSQL query: ${error.message}`);
+      throw this.queryError(error);
+    } finally {
+      if (cursor) {
+        await cursor.close().catch(error =>
+          this.logger.warn(`Error closing PostgreSQL cursor: ${error.message}`)
+        );
       }
-      
-      // Default error with code
-      throw new Error(`PostgreSQL query execution failed: ${error.message}. Error code: ${error.code || 'unknown'}`);
     }
   }
   
+  /**
+   * Error with a diagnostic message for a failed PostgreSQL query
+   */
+  private queryError(error: any): Error {
+    // Enhanced error handling for query execution
+    if (error.code === '42P01') {
+      return new Error(`Table or view does not exist: ${error.message}`);
+    }
+    if (error.code === '42703') {
+      return new Error(`Column does not exist: ${error.message}`);
+    }
+    if (error.code === '42P18' || error.code === '42809') {
+      return new Error(`Invalid function or procedure: ${error.message}`);
+    }
+    if (error.code === '23502') {
+      return new Error(`Not null violation: ${error.message}`);
+    }
+    if (error.code === '23505') {
+      return new Error(`Unique violation: ${error.message}`);
+    }
+    if (error.code === '42601') {
+      return new Error(`Syntax error in SQL statement: ${error.message}`);
+    }
+    if (error.code === '42501') {
+      return new Error(`Insufficient privileges: ${error.message}`);
+    }
+    if (error.code === '53300') {
+      return new Error(`Query timeout: The query took too long to execute and was canceled.`);
+    }
+    if (error.code === '53400') {
+      return new Error(`Configuration limit exceeded: ${error.message}`);
+    }
+    if (error.code === '08006') {
+      return new Error(`Connection terminated unexpectedly. The server may have been shut down or restarted.`);
+    }
+    
+    // Default error with code
+    return new Error(`PostgreSQL query execution failed: ${error.message}. Error code: ${error.code || 'unknown'}`);
+  }
+  
   /**
    * Close a PostgreSQL connection
    * @param connection PostgreSQL client to close
@@ -355,13 +425,13 @@ export class PostgresDatabaseProvider implements DatabaseProvider {
           FROM 
             information_schema.columns
           WHERE 
-            table_schema = '${table.schema}' 
-            AND table_name = '${table.table_name}'
+            table_schema = :schema 
+            AND table_name = :tableName
           ORDER BY 
             ordinal_position
         `;
         
-        const columns = await this.executeQuery(connection, columnsQuery, 5000);
+        const columns = await this.executeQuery(connection, columnsQuery, 5000, { schema: table.schema, tableName: table.table_name });
         
         // Format columns to be consistent with Oracle format
         const formattedColumns = columns.map(column => ({
@@ -384,13 +454,13 @@ export class PostgresDatabaseProvider implements DatabaseProvider {
               AND tc.table_schema = kcu.table_schema
           WHERE 
             tc.constraint_type = 'PRIMARY KEY' 
-            AND tc.table_schema = '${table.schema}' 
-            AND tc.table_name = '${table.table_name}'
+            AND tc.table_schema = :schema 
+            AND tc.table_name = :tableName
           ORDER BY 
             kcu.ordinal_position
         `;
         
-        const pkColumns = await this.executeQuery(connection, pkQuery, 5000);
+        const pkColumns = await this.executeQuery(connection, pkQuery, 5000, { schema: table.schema, tableName: table.table_name });
         const primaryKey = pkColumns.map(row => row.column_name);
         
         // Get sample data (limited to 5 rows)
@@ -407,11 +477,11 @@ export class PostgresDatabaseProvider implements DatabaseProvider {
           FROM 
             pg_stat_user_tables
           WHERE 
-            schemaname = '${table.schema}' 
-            AND relname = '${table.table_name}'
+            schemaname = :schema 
+            AND relname = :tableName
         `;
         
-        const rowCountResult = await this.executeQuery(connection, rowCountQuery, 5000);
+        const rowCountResult = await this.executeQuery(connection, rowCountQuery, 5000, { schema: table.schema, tableName: table.table_name });
         const rowCount = rowCountResult[0]?.row_count || 0;
         
         // Add table details
@@ -433,66 +503,76 @@ export class PostgresDatabaseProvider implements DatabaseProvider {
   }
   
   /**
-   * Collect relationship information between tables
-   * @param connection PostgreSQL client connection
+   * Get every foreign key of a schema with one catalog query
+   * @param connection Database connection
+   * @param schema Schema whose tables hold the foreign keys
+   * @returns One relationship per foreign key column
+   */
+  async getForeignKeys(connection: Client, schema: string): Promise<ForeignKeyRelationship[]> {
+    const foreignKeysQuery = `
+      SELECT
+        rc.constraint_name,
+        kcu.table_schema AS source_schema,
+        kcu.table_name AS source_table,
+        kcu.column_name AS source_column,
+        ref.table_schema AS target_schema,
+        ref.table_name AS target_table,
+        ref.column_name AS target_column
+      FROM
+        information_schema.referential_constraints AS rc
+        JOIN information_schema.key_column_usage AS kcu
+          ON kcu.constraint_schema = rc.constraint_schema
+          AND kcu.constraint_name = rc.constraint_name
+        JOIN information_schema.key_column_usage AS ref
+          ON ref.constraint_schema = rc.unique_constraint_schema
+          AND ref.constraint_name = rc.unique_constraint_name
+          AND ref.ordinal_position = kcu.position_in_unique_constraint
+      WHERE
+        rc.constraint_schema = :schema
+      ORDER BY
+        kcu.table_name, rc.constraint_name, kcu.ordinal_position
+    `;
+    
+    const rows = await this.executeQuery(connection, foreignKeysQuery, 10000, { schema });
+    return rows.map((row): ForeignKeyRelationship => ({
+      type: 'Foreign Key',
+      constraint: row.constraint_name,
+      source: {
+        schema: row.source_schema,
+        table: row.source_table,
+        column: row.source_column
+      },
+      target: {
+        schema: row.target_schema,
+        table: row.target_table,
+        column: row.target_column
+      }
+    }));
+  }
+  
+  /**
+   * Collect relationships between tables
+   * Foreign keys are read once per schema and then picked from the graph by table.
+   * @param connection Database connection
    * @param tables List of tables to collect relationships for
    * @returns Table relationships
    */
   private async collectTableRelationships(connection: Client, tables: any[]): Promise<any[]> {
-    const relationships = [];
-    
     // Only try to get relationships if we have tables
     if (tables.length === 0) {
-      return relationships;
+      return [];
     }
     
-    try {
-      // Create a comma-separated list of schema.table_name values in format: 'schema.table_name'
-      const tableList = tables.map(t => `'${t.schema}.${t.table_name}'`).join(',');
-      
-      const relationshipsQuery = `
-        SELECT
-          tc.table_schema AS source_schema,
-          tc.table_name AS source_table,
-          kcu.column_name AS source_column,
-          ccu.table_schema AS target_schema,
-          ccu.table_name AS target_table,
-          ccu.column_name AS target_column
-        FROM
-          information_schema.table_constraints AS tc
-          JOIN information_schema.key_column_usage AS kcu
-            ON tc.constraint_name = kcu.constraint_name
-            AND tc.table_schema = kcu.table_schema
-          JOIN information_schema.constraint_column_usage AS ccu
-            ON ccu.constraint_name = tc.constraint_name
-            AND ccu.table_schema = tc.table_schema
-        WHERE
-          tc.constraint_type = 'FOREIGN KEY'
-          AND CONCAT(tc.table_schema, '.', tc.table_name) IN (${tableList})
-      `;
-      
-      const relationshipRows = await this.executeQuery(connection, relationshipsQuery, 10000);
-      
-      // Process relationships
-      for (const row of relationshipRows) {
-        relationships.push({
-          type: 'Foreign Key',
-          source: {
-            schema: row.source_schema,
-            table: row.source_table,
-            column: row.source_column
-          },
-          target: {
-            schema: row.target_schema,
-            table: row.target_table,
-            column: row.target_column
-          }
-        });
+    const graph = new ForeignKeyGraph();
+    for (const schema of new Set(tables.map(t => t.schema))) {
+      try {
+        graph.add(await this.getForeignKeys(connection, schema));
+      } catch (error) {
+        this.logger.warn(`Error collecting PostgreSQL relationships for schema ${schema}: ${error.message}`);
       }
-    } catch (error) {
-      this.logger.warn(`Error collecting PostgreSQL relationships: ${error.message}`);
     }
     
-    return relationships;
+    return graph.from(tables.map(t => tableKey(t.schema, t.table_name)));
   }
+
 }
\ No newline at end of file
@@ -0,0 +1,276 @@
+import { Injectable, Logger, OnModuleDestroy } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+import { createHash } from 'crypto';
+import * as fs from 'fs';
+import * as path from 'path';
+import Database = require('better-sqlite3');
+import { ChatCompletionCreateParamsNonStreaming } from 'openai/resources/chat/completions';
+
+/**
+ * What a completion depends on besides the request template
+ */
+export interface CompletionCacheKey {
+  /** OpenaiService method making the call, used for the metrics */
+  call: string;
+  /** Schema text as it appears in the messages */
+  schema: string;
+  /** The user's question as it appears in the messages */
+  prompt: string;
+  /** Anything else the answer depends on, such as the shape of the results */
+  context?: string;
+  /** Texts in the messages that vary per call but are covered by context */
+  variables?: string[];
+}
+
+/**
+ * Key of a completion with the hashes it was built from
+ */
+export interface CompletionCacheEntryKey {
+  key: string;
+  templateHash: string;
+  schemaHash: string;
+  prompt: string;
+}
+
+/**
+ * How the cache is used
+ * readwrite answers from the cache and stores new completions; off always calls OpenAI;
+ * replay never calls OpenAI, answering misses with a local stand-in that is not stored
+ */
+export type CompletionCacheMode = 'readwrite' | 'off' | 'replay';
+
+interface CallStats {
+  hits: number;
+  misses: number;
+  stores: number;
+  standIn: number;
+  savedMs: number;
+}
+
+/**
+ * Content-addressed cache of OpenAI completions
+ * Entries are keyed by the model, a hash of the request template (the messages and settings
+ * with the schema, question and other per-call texts taken out), a hash of the schema text and
+ * the normalized question, and are kept in a local SQLite file. Entries expire after a TTL and
+ * the least recently used ones are evicted past a maximum count.
+ */
+@Injectable()
+export class CompletionCacheService implements OnModuleDestroy {
+  private readonly logger = new Logger(CompletionCacheService.name);
+  private readonly db: Database.Database;
+  readonly mode: CompletionCacheMode;
+  private readonly ttlMs: number;
+  private readonly maxEntries: number;
+  private readonly calls: Record<string, CallStats> = {};
+  private readonly stats = { evictions: 0, expired: 0, invalidations: 0 };
+
+  constructor(private configService: ConfigService) {
+    const mode = (this.configService.get<string>('LLM_CACHE_MODE') || 'readwrite').toLowerCase();
+    this.mode = ['off', 'replay'].includes(mode) ? mode as CompletionCacheMode : 'readwrite';
+    this.ttlMs = Number(this.configService.get<string>('LLM_CACHE_TTL_SECONDS') || 7 * 24 * 3600) * 1000;
+    this.maxEntries = Math.max(1, Number(this.configService.get<string>('LLM_CACHE_MAX_ENTRIES') || 10000));
+
+    const file = this.configService.get<string>('LLM_CACHE_PATH') ||
+      path.join(process.cwd(), 'data', 'llm-cache.db');
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+
+    this.db = new Database(file);
+    this.db.pragma('journal_mode = WAL');
+    this.db.exec(`
+      CREATE TABLE IF NOT EXISTS completion_cache (
+        key TEXT PRIMARY KEY,
+        call TEXT NOT NULL,
+        model TEXT NOT NULL,
+        template_hash TEXT NOT NULL,
+        schema_hash TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        content TEXT NOT NULL,
+        latency_ms INTEGER NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        created_at INTEGER NOT NULL,
+        used_at INTEGER NOT NULL
+      )
+    `);
+    this.db.exec('CREATE INDEX IF NOT EXISTS completion_cache_used_at ON completion_cache (used_at)');
+
+    this.logger.log(`Completion cache in ${this.mode} mode at ${file} (TTL ${this.ttlMs / 1000}s, ${this.maxEntries} entries)`);
+  }
+
+  onModuleDestroy() {
+    this.db.close();
+  }
+
+  /**
+   * Whether misses go to the local stand-in instead of OpenAI
+   */
+  get replay(): boolean {
+    return this.mode === 'replay';
+  }
+
+  /**
+   * Cache key of a completion request
+   */
+  key(params: ChatCompletionCreateParamsNonStreaming, parts: CompletionCacheKey): CompletionCacheEntryKey {
+    let template = JSON.stringify({
+      messages: params.messages,
+      temperature: params.temperature,
+      response_format: params.response_format,
+    });
+    const placeholders: [string, string][] = [
+      [parts.schema, '{schema}'],
+      [parts.prompt, '{prompt}'],
+      ...(parts.variables || []).map((text, index): [string, string] => [text, `{variable${index}}`]),
+    ];
+    for (const [text, placeholder] of placeholders) {
+      if (text) {
+        template = template.split(JSON.stringify(text).slice(1, -1)).join(placeholder);
+      }
+    }
+
+    const templateHash = this.hash([template]);
+    const schemaHash = this.hash([parts.schema || '']);
+    const prompt = this.normalizePrompt(parts.prompt);
+    return {
+      key: this.hash([params.model, templateHash, schemaHash, prompt, this.hash([parts.context || ''])]),
+      templateHash,
+      schemaHash,
+      prompt,
+    };
+  }
+
+  /**
+   * Cached completion text, or null on a miss (always in off mode)
+   */
+  get(key: string, call: string): string | null {
+    if (this.mode === 'off') {
+      return null;
+    }
+
+    const row = this.db
+      .prepare('SELECT content, latency_ms, created_at FROM completion_cache WHERE key = ?')
+      .get(key) as { content: string; latency_ms: number; created_at: number } | undefined;
+    const stats = this.callStats(call);
+
+    if (row && Date.now() - row.created_at > this.ttlMs) {
+      this.db.prepare('DELETE FROM completion_cache WHERE key = ?').run(key);
+      this.stats.expired++;
+    } else if (row) {
+      this.db.prepare('UPDATE completion_cache SET hits = hits + 1, used_at = ? WHERE key = ?').run(Date.now(), key);
+      stats.hits++;
+      stats.savedMs += row.latency_ms;
+      return row.content;
+    }
+
+    stats.misses++;
+    return null;
+  }
+
+  /**
+   * Store a completion from OpenAI, evicting expired and least recently used entries
+   */
+  set(entry: CompletionCacheEntryKey, call: string, model: string, content: string, latencyMs: number): void {
+    if (this.mode !== 'readwrite') {
+      return;
+    }
+
+    const now = Date.now();
+    this.db.prepare(`
+      INSERT INTO completion_cache (key, call, model, template_hash, schema_hash, prompt, content, latency_ms, hits, created_at, used_at)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+      ON CONFLICT(key) DO UPDATE SET
+        content = excluded.content,
+        latency_ms = excluded.latency_ms,
+        created_at = excluded.created_at,
+        used_at = excluded.used_at
+    `).run(
+      entry.key,
+      call,
+      model,
+      entry.templateHash,
+      entry.schemaHash,
+      entry.prompt,
+      content,
+      Math.round(latencyMs),
+      now,
+      now
+    );
+    this.callStats(call).stores++;
+
+    this.stats.expired += this.db.prepare('DELETE FROM completion_cache WHERE created_at < ?').run(now - this.ttlMs).changes;
+    this.stats.evictions += this.db.prepare(`
+      DELETE FROM completion_cache WHERE key IN (
+        SELECT key FROM completion_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?
+      )
+    `).run(this.maxEntries).changes;
+  }
+
+  /**
+   * Count a completion answered by the replay stand-in
+   */
+  recordStandIn(call: string): void {
+    this.callStats(call).standIn++;
+  }
+
+  /**
+   * Drop every cached completion, or those of one call
+   * @returns Number of entries removed
+   */
+  invalidate(call?: string): number {
+    const result = call
+      ? this.db.prepare('DELETE FROM completion_cache WHERE call = ?').run(call)
+      : this.db.prepare('DELETE FROM completion_cache').run();
+    this.stats.invalidations += result.changes;
+    return result.changes;
+  }
+
+  /**
+   * Cache settings, size and hit counters per call
+   */
+  describe(): any {
+    const entries = this.db.prepare(`
+      SELECT call, COUNT(*) AS entries, SUM(LENGTH(content)) AS size_bytes, SUM(hits) AS hits
+      FROM completion_cache GROUP BY call
+    `).all() as { call: string; entries: number; size_bytes: number; hits: number }[];
+
+    const calls = {};
+    for (const name of new Set([...Object.keys(this.calls), ...entries.map(row => row.call)])) {
+      const stats = this.callStats(name);
+      const stored = entries.find(row => row.call === name);
+      const lookups = stats.hits + stats.misses;
+      calls[name] = {
+        ...stats,
+        hitRate: lookups > 0 ? Math.round((stats.hits / lookups) * 1000) / 1000 : null,
+        entries: stored?.entries || 0,
+        sizeBytes: stored?.size_bytes || 0,
+        storedHits: stored?.hits || 0,
+      };
+    }
+
+    return {
+      mode: this.mode,
+      ttlSeconds: this.ttlMs / 1000,
+      maxEntries: this.maxEntries,
+      stats: { ...this.stats },
+      calls,
+    };
+  }
+
+  private callStats(call: string): CallStats {
+    if (!this.calls[call]) {
+      this.calls[call] = { hits: 0, misses: 0, stores: 0, standIn: 0, savedMs: 0 };
+    }
+    return this.calls[call];
+  }
+
+  /**
+   * Prompt as it goes into the key: whitespace collapsed, case and punctuation kept, since the
+   * template holds it as {prompt} and literals in it ('Smith' vs 'smith') change the SQL
+   */
+  private normalizePrompt(prompt: string): string {
+    return (prompt || '').trim().replace(/\s+/g, ' ');
+  }
+
+  private hash(parts: string[]): string {
+    return createHash('sha256').update(parts.join('\x1f')).digest('hex');
+  }
+}
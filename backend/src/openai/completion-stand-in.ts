@@ -0,0 +1,59 @@
+import { ChatCompletionCreateParamsNonStreaming } from 'openai/resources/chat/completions';
+
+/**
+ * Local stand-in for OpenAI, answering completions missed by the cache in replay mode
+ * Answers are deterministic and shaped like the real ones, so development and benchmarks
+ * run the whole /ask pipeline without network access or API costs.
+ */
+
+/**
+ * Text of a message of the request, by role
+ */
+function messageText(params: ChatCompletionCreateParamsNonStreaming, role: string): string {
+  const message = params.messages.find(m => m.role === role);
+  return typeof message?.content === 'string' ? message.content : '';
+}
+
+/**
+ * A query reading the first rows of the first table in the schema of the system message
+ */
+function standInQuery(system: string): string {
+  const dbType = (/expert (.+?) SQL database analyst/.exec(system)?.[1] || 'oracle').toLowerCase();
+  const table = /^T: (\S+)$/m.exec(system)?.[1];
+  if (!table) {
+    return dbType === 'oracle' ? 'SELECT table_name FROM user_tables' : 'SELECT table_name FROM information_schema.tables';
+  }
+  if (dbType === 'mssql' || dbType === 'sql server') {
+    return `SELECT TOP 10 * FROM ${table}`;
+  }
+  if (dbType === 'oracle') {
+    return `SELECT * FROM ${table} WHERE ROWNUM <= 10`;
+  }
+  return `SELECT * FROM ${table} LIMIT 10`;
+}
+
+/**
+ * JSON completion text for one OpenaiService call
+ */
+export function standInCompletion(call: string, params: ChatCompletionCreateParamsNonStreaming): string {
+  switch (call) {
+    case 'translateToSql':
+      return JSON.stringify({ queries: [standInQuery(messageText(params, 'system'))] });
+    case 'generateSummary': {
+      const queries = (messageText(params, 'user').match(/^\s*Query: /gm) || []).length;
+      return JSON.stringify({
+        summary: `Replay mode: ${queries} ${queries === 1 ? 'query was' : 'queries were'} run; no summary was generated because OpenAI is not called.`,
+      });
+    }
+    case 'generatePromptSuggestions':
+      return JSON.stringify({
+        suggestions: [
+          'What tables are available in this database?',
+          'Show me sample data from the main tables',
+          'What relationships exist between the tables?',
+        ],
+      });
+    default:
+      return '{}';
+  }
+}
@@ -1,10 +1,12 @@
 import { Module } from '@nestjs/common';
 import { ConfigModule } from '@nestjs/config';
 import { OpenaiService } from './openai.service';
+import { PromptBudgetService } from './prompt-budget.service';
+import { CompletionCacheService } from './completion-cache.service';
 
 @Module({
   imports: [ConfigModule],
-  providers: [OpenaiService],
-  exports: [OpenaiService],
+  providers: [OpenaiService, PromptBudgetService, CompletionCacheService],
+  exports: [OpenaiService, CompletionCacheService],
 })
 export class OpenaiModule {}
\ No newline at end of file
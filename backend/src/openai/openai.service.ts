@@ -1,34 +1,56 @@
 import { Injectable, Logger } from '@nestjs/common';
 import { ConfigService } from '@nestjs/config';
 import { OpenAI } from 'openai';
-import { safelySerializable, safeStringify } from '../utils/serialize.util';
+import { ChatCompletionCreateParamsNonStreaming } from 'openai/resources/chat/completions';
+import { safelySerializable } from '../utils/serialize.util';
+import { partialJsonStrings } from '../utils/partial-json.util';
+import { ForeignKeyGraph, tableKey } from '../utils/foreign-key-graph.util';
+import { PromptBudgetService } from './prompt-budget.service';
+import { CompletionCacheKey, CompletionCacheService } from './completion-cache.service';
+import { standInCompletion } from './completion-stand-in';
+
+/**
+ * Receives the text a streamed completion adds to one of the strings it is writing
+ */
+export type CompletionDeltaListener = (index: number, text: string) => void;
 
 @Injectable()
 export class OpenaiService {
   private readonly openai: OpenAI;
   private readonly logger = new Logger(OpenaiService.name);
+  private readonly streaming: boolean;
 
-  constructor(private configService: ConfigService) {
+  constructor(
+    private configService: ConfigService,
+    private readonly promptBudget: PromptBudgetService,
+    private readonly completionCache: CompletionCacheService,
+  ) {
     const apiKey = this.configService.get<string>('OPENAI_API_KEY');
     
-    if (!apiKey) {
+    // Replay mode answers from the cache and a local stand-in, so it needs no key
+    if (!apiKey && !this.completionCache.replay) {
       this.logger.error('OPENAI_API_KEY is missing. The service will not work correctly.');
       throw new Error('OPENAI_API_KEY environment variable is required');
     }
     
     this.openai = new OpenAI({
-      apiKey: apiKey
+      apiKey: apiKey || 'replay'
     });
+    this.streaming = !['0', 'false', 'no'].includes(
+      (this.configService.get<string>('OPENAI_STREAMING') || 'true').toLowerCase()
+    );
     
     this.logger.log('OpenAI service initialized');
   }
 
   /**
    * Translate natural language prompt to SQL queries using detailed schema information
+   * onDelta, if given, receives the text of each query as the model writes it
    */
   async translateToSql(
     prompt: string,
     databaseMetadata: any,
+    onDelta?: CompletionDeltaListener,
   ): Promise<string[]> {
     try {
       this.logger.log('Translating natural language to SQL with comprehensive schema analysis');
@@ -257,7 +279,7 @@ Do not include semicolons at the end of the queries.
 `;
       
       // Make the API call with the detailed schema information
-      const completion = await this.openai.chat.completions.create({
+      const content = await this.complete({
         model: 'gpt-4o', // the newest OpenAI model is "gpt-4o" which was released May 13, 2024
         messages: [
           { role: 'system', content: systemMessage },
@@ -265,10 +287,13 @@ Do not include semicolons at the end of the queries.
         ],
         response_format: { type: "json_object" }, // Request JSON format explicitly
         temperature: 0.2, // Lower temperature for more predictable SQL generation
+      }, onDelta && this.fieldDeltas('queries', onDelta), {
+        call: 'translateToSql',
+        schema: formattedSchema,
+        prompt,
       });
       
       // Extract SQL queries from response
-      const content = completion.choices[0].message.content.trim();
       this.logger.log('Received OpenAI response, extracting SQL queries');
       
       // Process the response to extract SQL queries
@@ -389,6 +414,93 @@ Do not include semicolons at the end of the queries.
     }
   }
   
+  /**
+   * Run a chat completion and return its trimmed text, answering from the completion cache when
+   * it holds the same request
+   * A cached or replayed answer reaches onContent in one piece.
+   */
+  private async complete(
+    params: ChatCompletionCreateParamsNonStreaming,
+    onContent?: (content: string) => void,
+    cacheKey?: CompletionCacheKey,
+  ): Promise<string> {
+    if (!cacheKey) {
+      return this.request(params, onContent);
+    }
+    
+    const entry = this.completionCache.key(params, cacheKey);
+    const cached = this.completionCache.get(entry.key, cacheKey.call);
+    if (cached !== null) {
+      this.logger.log(`${cacheKey.call} answered from the completion cache`);
+      onContent?.(cached);
+      return cached;
+    }
+    
+    if (this.completionCache.replay) {
+      this.completionCache.recordStandIn(cacheKey.call);
+      const content = standInCompletion(cacheKey.call, params);
+      onContent?.(content);
+      return content;
+    }
+    
+    const startedAt = Date.now();
+    const content = await this.request(params, onContent);
+    if (content) {
+      this.completionCache.set(entry, cacheKey.call, params.model, content, Date.now() - startedAt);
+    }
+    return content;
+  }
+  
+  /**
+   * Call OpenAI for a chat completion and return its trimmed text
+   * With onContent the completion is streamed, and onContent gets the text received so far after
+   * every chunk. If streaming is disabled, or the stream fails for a reason other than the request
+   * itself (a 4xx), the same request is made again without streaming; its text is what counts.
+   */
+  private async request(
+    params: ChatCompletionCreateParamsNonStreaming,
+    onContent?: (content: string) => void,
+  ): Promise<string> {
+    if (onContent && this.streaming) {
+      let content = '';
+      try {
+        const stream = await this.openai.chat.completions.create({ ...params, stream: true });
+        for await (const chunk of stream) {
+          const delta = chunk.choices[0]?.delta?.content;
+          if (delta) {
+            content += delta;
+            onContent(content);
+          }
+        }
+        return content.trim();
+      } catch (error) {
+        if (error.status >= 400 && error.status < 500) {
+          throw error;
+        }
+        this.logger.warn(`Streamed completion failed after ${content.length} characters, retrying without streaming: ${error.message}`);
+      }
+    }
+    
+    const completion = await this.openai.chat.completions.create(params);
+    return completion.choices[0]?.message?.content?.trim();
+  }
+  
+  /**
+   * Turn the growing JSON text of a completion into the text added to each string of one field
+   */
+  private fieldDeltas(field: string, onDelta: CompletionDeltaListener): (content: string) => void {
+    const sent: number[] = [];
+    return content => {
+      partialJsonStrings(content, field).forEach((value, index) => {
+        const length = sent[index] || 0;
+        if (value.length > length) {
+          sent[index] = value.length;
+          onDelta(index, value.slice(length));
+        }
+      });
+    };
+  }
+  
   /**
    * Format schema information into a structured prompt for OpenAI
    */
@@ -409,19 +521,19 @@ Do not include semicolons at the end of the queries.
       // Ultra-compact table count information
       formatted += `Tables: ${safeSchema.processedTables || 0} of ${safeSchema.tableCount || 'Unknown'} analyzed\n\n`;
       
+      const tableSections: string[] = [];
+      const tableNames: string[] = [];
+      const relationshipLines: { table: string; line: string }[] = [];
+      
       if (safeSchema.tables && Array.isArray(safeSchema.tables)) {
+        // Relationship counts per table are map lookups in the graph, not a scan per comparison
+        const graph = new ForeignKeyGraph(Array.isArray(safeSchema.relationships) ? safeSchema.relationships : []);
+        
         // Sort tables to prioritize those that appear in relationships and have data
         const tables = [...safeSchema.tables].sort((a, b) => {
-          // First by relationship count (if we can estimate it)
-          const aHasRels = safeSchema.relationships ? safeSchema.relationships.filter(r => 
-            (r.source.table === a.tableName && r.source.schema === a.owner) || 
-            (r.target.table === a.tableName && r.target.schema === a.owner)
-          ).length : 0;
-          
-          const bHasRels = safeSchema.relationships ? safeSchema.relationships.filter(r => 
-            (r.source.table === b.tableName && r.source.schema === b.owner) || 
-            (r.target.table === b.tableName && r.target.schema === b.owner)
-          ).length : 0;
+          // First by relationship count
+          const aHasRels = graph.degree(tableKey(a.owner, a.tableName));
+          const bHasRels = graph.degree(tableKey(b.owner, b.tableName));
           
           if (aHasRels > bHasRels) return -1;
           if (aHasRels < bHasRels) return 1;
@@ -437,16 +549,16 @@ Do not include semicolons at the end of the queries.
           return (a.tableName || '').localeCompare(b.tableName || '');
         });
         
-        // Ultra-compact table definitions
+        // Ultra-compact table definitions, most important first
         for (const table of tables) {
           if (!table.tableName) continue;
           
           // Table header with schema.table format
-          formatted += `T: ${table.owner || 'dbo'}.${table.tableName}\n`;
+          let section = `T: ${table.owner || 'dbo'}.${table.tableName}\n`;
           
           // Primary keys in compact format
           if (table.primaryKey && table.primaryKey.length > 0) {
-            formatted += `  PK: ${table.primaryKey.join(', ')}\n`;
+            section += `  PK: ${table.primaryKey.join(', ')}\n`;
           }
           
           // Add columns in ultra-compact form
@@ -495,7 +607,7 @@ Do not include semicolons at the end of the queries.
                 return `${col.COLUMN_NAME}${isPK}${nullable}:${col.DATA_TYPE}`;
               }).join(", ");
               
-              formatted += `  ${colLine}\n`;
+              section += `  ${colLine}\n`;
             }
           }
           
@@ -545,11 +657,12 @@ Do not include semicolons at the end of the queries.
             }).join(', ');
             
             if (sampleValues) {
-              formatted += `  Sample: ${sampleValues}\n`;
+              section += `  Sample: ${sampleValues}\n`;
             }
           }
           
-          formatted += '\n';
+          tableSections.push(section + '\n');
+          tableNames.push(table.tableName);
         }
       }
       
@@ -567,8 +680,6 @@ Do not include semicolons at the end of the queries.
         }
         
         // Output compressed relationship data
-        formatted += 'RELATIONSHIPS:\n';
-        
         for (const sourceKey in relationshipsBySource) {
           const relations = relationshipsBySource[sourceKey];
           const [sourceSchema, sourceTable] = sourceKey.split('.');
@@ -585,8 +696,6 @@ Do not include semicolons at the end of the queries.
           }
           
           // Output one line per source table
-          formatted += `* ${sourceTable} → `;
-          
           const targets = [];
           for (const targetKey in targetGroups) {
             const [targetSchema, targetTable] = targetKey.split('.');
@@ -594,10 +703,31 @@ Do not include semicolons at the end of the queries.
             targets.push(`${targetTable}(${columnMappings})`);
           }
           
-          formatted += targets.join(', ') + '\n';
+          relationshipLines.push({ table: sourceTable, line: `* ${sourceTable} → ${targets.join(', ')}\n` });
         }
       }
       
+      // Fit the tables to the schema budget in priority order, keeping about a fifth of it
+      // for the relationships between the tables that made it in
+      const budget = this.promptBudget.schemaTokens - this.promptBudget.count(formatted);
+      const relationshipText = (included: Set<string>) => relationshipLines
+        .filter(rel => included.has(rel.table))
+        .map(rel => rel.line)
+        .join('');
+      const allRelationships = this.promptBudget.count(relationshipText(new Set(tableNames)));
+      const tablesPacked = this.promptBudget.pack(tableSections, budget - Math.min(allRelationships, Math.floor(budget / 5)));
+      formatted += tablesPacked.sections.join('');
+      if (tablesPacked.omitted > 0) {
+        formatted += `(${tablesPacked.omitted} lower-priority tables left out to fit the prompt)\n\n`;
+        this.logger.warn(`Schema prompt holds ${tablesPacked.sections.length} of ${tableSections.length} tables`);
+      }
+      
+      const relationships = relationshipText(new Set(tableNames.slice(0, tablesPacked.sections.length)));
+      if (relationships) {
+        const relationshipBudget = this.promptBudget.schemaTokens - this.promptBudget.count(formatted);
+        formatted += this.promptBudget.truncate('RELATIONSHIPS:\n' + relationships, relationshipBudget);
+      }
+      
       return formatted;
     } catch (error) {
       this.logger.error(`Error formatting schema for prompt: ${error.message}`);
@@ -695,80 +825,19 @@ Do not include semicolons at the end of the queries.
 
   /**
    * Generate summary of database query results
+   * onDelta, if given, receives the summary text as the model writes it
+   * totalRows, if given, is the row count of each result when queryResults holds samples
    */
   async generateSummary(
     prompt: string,
     executedQueries: string[],
     queryResults: any[],
+    onDelta?: CompletionDeltaListener,
+    totalRows?: number[],
   ): Promise<string> {
     try {
       this.logger.log('Generating summary of query results');
       
-      // Calculate approximate token count for results before sending to OpenAI
-      let totalTokens = 0;
-      const MAX_TOKENS_PER_QUERY = 5000; // Conservative estimate to avoid rate limits
-      const MAX_TOTAL_TOKENS = 25000; // Leave room for model response
-      
-      // Format query results for the prompt, limiting token count
-      const formattedResults = [];
-      
-      for (let i = 0; i < executedQueries.length; i++) {
-        const query = executedQueries[i];
-        const result = queryResults[i] || [];
-        
-        // Create a safe serialized version of the result
-        const safeResult = safelySerializable(result);
-        
-        // Estimate tokens (rough approximation: 1 token ~= 4 chars)
-        const resultJson = safeStringify(safeResult);
-        const estimatedTokens = resultJson.length / 4;
-        
-        // If this single result is too large, limit its size
-        let processedResult = safeResult;
-        if (estimatedTokens > MAX_TOKENS_PER_QUERY) {
-          this.logger.warn(`Query ${i+1} results too large (${Math.round(estimatedTokens)} tokens), truncating`);
-          
-          if (Array.isArray(safeResult)) {
-            // For arrays, take fewer items
-            const limitedRows = safeResult.slice(0, Math.min(5, safeResult.length));
-            processedResult = limitedRows;
-            this.logger.warn(`Limited array to ${limitedRows.length} items`);
-          } else {
-            // For objects, create a summary
-            processedResult = { 
-              _limited: true, 
-              _original_size: JSON.stringify(safeResult).length,
-              _message: "Result too large for summary generation" 
-            };
-          }
-        }
-        
-        // Add to formatted results if we have room
-        const formattedQuery = `
-          Query: ${query}
-          Results: ${safeStringify(processedResult)}
-        `;
-        
-        // Estimate tokens for this formatted query
-        const queryTokens = formattedQuery.length / 4;
-        
-        if (totalTokens + queryTokens <= MAX_TOTAL_TOKENS) {
-          formattedResults.push(formattedQuery);
-          totalTokens += queryTokens;
-        } else {
-          this.logger.warn(`Omitting query ${i+1} results to avoid token limit`);
-          // Add a placeholder to show that we omitted this query
-          formattedResults.push(`
-            Query: ${query}
-            Results: [Results omitted due to token limitations]
-          `);
-          // Break after adding this placeholder, as we're already at the limit
-          break;
-        }
-      }
-      
-      const queriesAndResults = formattedResults.join('\n\n');
-      
       // Create system message
       const systemMessage = `
         You are a data analyst explaining database query results in a clear, concise manner.
@@ -779,7 +848,7 @@ Do not include semicolons at the end of the queries.
       `;
       
       // Create user message
-      const userMessage = `
+      const userMessageFor = (queriesAndResults: string) => `
         Original question: ${prompt}
         
         Executed Queries and Results:
@@ -789,8 +858,21 @@ Do not include semicolons at the end of the queries.
         Return your response as a JSON object with a "summary" field.
       `;
       
+      // Results get whatever the instructions leave of the summary budget, counted exactly;
+      // results too large for their share are sampled rather than cut off
+      const resultBudget = this.promptBudget.summaryTokens
+        - this.promptBudget.count(systemMessage)
+        - this.promptBudget.count(userMessageFor(''));
+      const queriesAndResults = this.promptBudget.formatResults(
+        executedQueries,
+        executedQueries.map((_, i) => safelySerializable(queryResults[i] || [])),
+        resultBudget,
+        totalRows
+      );
+      const userMessage = userMessageFor(queriesAndResults);
+      
       // Call OpenAI API to generate summary
-      const response = await this.openai.chat.completions.create({
+      const content = await this.complete({
         model: 'gpt-4o', // the newest OpenAI model is "gpt-4o" which was released May 13, 2024
         messages: [
           { role: 'system', content: systemMessage },
@@ -798,10 +880,14 @@ Do not include semicolons at the end of the queries.
         ],
         response_format: { type: "json_object" }, // Request JSON format explicitly
         temperature: 0.7, // Higher temperature for more natural language summaries
+      }, onDelta && this.fieldDeltas('summary', onDelta), {
+        call: 'generateSummary',
+        schema: '',
+        prompt,
+        context: queriesAndResults,
+        variables: [queriesAndResults],
       });
       
-      const content = response.choices[0]?.message?.content?.trim();
-      
       if (!content) {
         this.logger.warn('OpenAI could not generate a summary');
         return 'No summary could be generated from the query results.';
@@ -838,28 +924,18 @@ Do not include semicolons at the end of the queries.
   
   /**
    * Generate suggested follow-up prompts based on current query and results
+   * totalRows, if given, is the row count of each result when queryResults holds samples
    */
   async generatePromptSuggestions(
     prompt: string,
     executedQueries: string[],
     queryResults: any[],
     databaseMetadata: any,
+    totalRows?: number[],
   ): Promise<string[]> {
     try {
       this.logger.log('Generating suggested follow-up prompts');
       
-      // Format query results for the prompt (limited to save token usage)
-      const queriesAndResults = executedQueries.map((query, index) => {
-        const result = queryResults[index] || [];
-        // Limit the number of results to include in the prompt
-        const limitedResults = Array.isArray(result) ? result.slice(0, 3) : result;
-        // Use safeStringify to handle any circular references
-        return `
-          Query: ${query}
-          Sample Results: ${safeStringify(safelySerializable(limitedResults))}
-        `;
-      }).join('\n\n');
-      
       // Format schema info in a compact way
       let schemaInfo = '';
       
@@ -867,19 +943,20 @@ Do not include semicolons at the end of the queries.
       const safeMetadata = safelySerializable(databaseMetadata);
       
       if (safeMetadata && safeMetadata.tables && safeMetadata.tables.length > 0) {
-        const tableInfo = safeMetadata.tables.map(table => {
+        const tableLines = safeMetadata.tables.map(table => {
           const tableName = `${table.owner}.${table.tableName}`;
           // Get a subset of columns to save tokens
           const sampleColumns = table.columns ? 
             table.columns.slice(0, 5).map(col => col.COLUMN_NAME || col.column_name).join(', ') : 
             'Columns info not available';
-          
-          return `${tableName} (Sample columns: ${sampleColumns})`;
-        }).join('\n');
+          return `${tableName} (Sample columns: ${sampleColumns})\n`;
+        });
+        // The table list may take up to half of the budget
+        const tableInfo = this.promptBudget.pack(tableLines, Math.floor(this.promptBudget.suggestionTokens / 2));
         
         schemaInfo = `
           Available Database Tables:
-          ${tableInfo}
+          ${tableInfo.sections.join('')}
         `;
       } else {
         schemaInfo = 'Schema information not available';
@@ -895,7 +972,7 @@ Do not include semicolons at the end of the queries.
       `;
       
       // Create user message
-      const userMessage = `
+      const userMessageFor = (queriesAndResults: string) => `
         Original question: ${prompt}
         
         ${queriesAndResults}
@@ -907,8 +984,28 @@ Do not include semicolons at the end of the queries.
         Return your suggestions in a JSON object with a "suggestions" field containing an array of 3 strings.
       `;
       
+      // Sample the results into what the rest of the message leaves of the budget
+      const resultBudget = this.promptBudget.suggestionTokens
+        - this.promptBudget.count(systemMessage)
+        - this.promptBudget.count(userMessageFor(''));
+      const queriesAndResults = this.promptBudget.formatResults(
+        executedQueries,
+        executedQueries.map((_, index) => safelySerializable(queryResults[index] || [])),
+        resultBudget,
+        totalRows
+      );
+      const userMessage = userMessageFor(queriesAndResults);
+      
+      // Suggestions depend on the shape of the results, not their values, so the same
+      // queries returning the same columns share a cache entry
+      const resultShape = executedQueries.map((query, index) => {
+        const result = queryResults[index];
+        const columns = Array.isArray(result) && result[0] ? Object.keys(result[0]) : [];
+        return `${query}\n${columns.join(',')}`;
+      }).join('\n\n');
+      
       // Call OpenAI API to generate suggestions
-      const response = await this.openai.chat.completions.create({
+      const content = await this.complete({
         model: 'gpt-4o', // the newest OpenAI model is "gpt-4o" which was released May 13, 2024
         messages: [
           { role: 'system', content: systemMessage },
@@ -916,10 +1013,14 @@ Do not include semicolons at the end of the queries.
         ],
         response_format: { type: "json_object" }, // Request JSON format explicitly
         temperature: 0.8, // Higher temperature for creative suggestions
+      }, undefined, {
+        call: 'generatePromptSuggestions',
+        schema: schemaInfo,
+        prompt,
+        context: resultShape,
+        variables: [queriesAndResults],
       });
       
-      const content = response.choices[0]?.message?.content?.trim();
-      
       if (!content) {
         throw new Error('Empty response from OpenAI');
       }
@@ -0,0 +1,204 @@
+import { Injectable, Logger } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+import { getEncoding, Tiktoken } from 'js-tiktoken';
+import { safeStringify } from '../utils/serialize.util';
+
+/**
+ * Rows picked from a query result to fit a token budget
+ */
+export interface RowSample {
+  rows: any[];
+  totalRows: number;
+  tokens: number;
+}
+
+/**
+ * Exact token counts and budgets for the prompts sent to OpenAI
+ * Counts use the tokenizer of the model (o200k_base for gpt-4o), so a budget holds for
+ * numeric and non-Latin data as well as for English text. Shared by the SQL translation,
+ * the summary and the follow-up suggestions.
+ */
+@Injectable()
+export class PromptBudgetService {
+  private readonly logger = new Logger(PromptBudgetService.name);
+  private readonly encoder: Tiktoken;
+  readonly schemaTokens: number;
+  readonly summaryTokens: number;
+  readonly suggestionTokens: number;
+
+  constructor(private configService: ConfigService) {
+    this.encoder = getEncoding('o200k_base');
+    this.schemaTokens = Number(this.configService.get<string>('OPENAI_SCHEMA_TOKEN_BUDGET') || 20000);
+    this.summaryTokens = Number(this.configService.get<string>('OPENAI_SUMMARY_TOKEN_BUDGET') || 25000);
+    this.suggestionTokens = Number(this.configService.get<string>('OPENAI_SUGGESTIONS_TOKEN_BUDGET') || 4000);
+
+    this.logger.log(
+      `Prompt budgets: schema ${this.schemaTokens}, summary ${this.summaryTokens}, suggestions ${this.suggestionTokens} tokens`
+    );
+  }
+
+  /**
+   * Number of tokens the model sees for a text
+   */
+  count(text: string): number {
+    return text ? this.encoder.encode(text).length : 0;
+  }
+
+  /**
+   * Cut a text to at most maxTokens tokens, marking the cut
+   */
+  truncate(text: string, maxTokens: number, marker = ' ...[truncated]'): string {
+    const tokens = this.encoder.encode(text);
+    if (tokens.length <= maxTokens) {
+      return text;
+    }
+    const keep = Math.max(0, maxTokens - this.count(marker));
+    return this.encoder.decode(tokens.slice(0, keep)) + marker;
+  }
+
+  /**
+   * Take sections in order for as long as they fit in maxTokens
+   * Sections should come most important first; packing stops at the first one that doesn't fit.
+   */
+  pack(sections: string[], maxTokens: number): { sections: string[]; omitted: number; tokens: number } {
+    const packed: string[] = [];
+    let tokens = 0;
+    for (const section of sections) {
+      const sectionTokens = this.count(section);
+      if (tokens + sectionTokens > maxTokens) {
+        break;
+      }
+      packed.push(section);
+      tokens += sectionTokens;
+    }
+    return { sections: packed, omitted: sections.length - packed.length, tokens };
+  }
+
+  /**
+   * Pick the rows of a result that say the most within maxTokens, in their original order
+   * The first and last rows come first (the top and bottom of any ORDER BY), then the rows
+   * holding the minimum and maximum of each numeric column, then rows spread evenly over
+   * the result so every part of it is represented.
+   */
+  sampleRows(rows: any[], maxTokens: number): RowSample {
+    const all = this.count(safeStringify(rows));
+    if (all <= maxTokens) {
+      return { rows, totalRows: rows.length, tokens: all };
+    }
+
+    const picked: number[] = [];
+    // Brackets of the JSON array
+    let tokens = 2;
+    for (const index of this.rowPriority(rows)) {
+      // One more token for the comma between rows
+      const rowTokens = this.count(safeStringify(rows[index])) + 1;
+      if (tokens + rowTokens > maxTokens) {
+        break;
+      }
+      picked.push(index);
+      tokens += rowTokens;
+    }
+
+    // Counting rows one by one can be off by a token where two rows meet; trim until it fits
+    let sample = picked.sort((a, b) => a - b).map(index => rows[index]);
+    tokens = this.count(safeStringify(sample));
+    while (sample.length > 0 && tokens > maxTokens) {
+      sample = sample.slice(0, -1);
+      tokens = this.count(safeStringify(sample));
+    }
+    return { rows: sample, totalRows: rows.length, tokens };
+  }
+
+  /**
+   * Format queries and their results for a prompt in at most maxTokens tokens
+   * Every query is kept. The budget left after the SQL is shared between the results, and
+   * results that need less than an equal share leave the rest to the others. Results over
+   * their share are sampled with sampleRows and say how many rows they show.
+   * @param totalRows Row count of each result, when results holds a sample of its rows
+   */
+  formatResults(queries: string[], results: any[], maxTokens: number, totalRows?: number[]): string {
+    const headers = queries.map(query => `Query: ${query}\nResults: `);
+    const full = queries.map((_, index) => safeStringify(results[index] ?? []));
+    const fullTokens = full.map(text => this.count(text));
+    let remaining = maxTokens - headers.reduce((sum, header) => sum + this.count(header) + 2, 0);
+
+    // Smallest results first, so what they don't use goes to the bigger ones
+    const shares = new Array<number>(queries.length);
+    const order = queries.map((_, index) => index).sort((a, b) => fullTokens[a] - fullTokens[b]);
+    order.forEach((index, position) => {
+      const share = Math.max(0, Math.floor(remaining / (order.length - position)));
+      shares[index] = Math.min(fullTokens[index], share);
+      remaining -= shares[index];
+    });
+
+    return queries.map((_, index) => {
+      let body = full[index];
+      const result = results[index];
+      const total = Array.isArray(result) ? Math.max(result.length, totalRows?.[index] ?? 0) : 0;
+      if (fullTokens[index] > shares[index] || (Array.isArray(result) && total > result.length)) {
+        if (Array.isArray(result)) {
+          const note = (shown: number) =>
+            `\n(${shown} of ${total} rows shown, sampled from the top, bottom, extremes and evenly across the result)`;
+          // Leave room for the note, sized for the largest count it can show
+          const sample = this.sampleRows(result, shares[index] - this.count(note(result.length)));
+          body = sample.rows.length > 0
+            ? safeStringify(sample.rows) + note(sample.rows.length)
+            : `[${total} rows, omitted to fit the prompt]`;
+          this.logger.warn(`Query ${index + 1} results sampled to ${sample.rows.length} of ${total} rows`);
+        } else {
+          body = this.truncate(body, shares[index]);
+        }
+      }
+      return headers[index] + body;
+    }).join('\n\n');
+  }
+
+  /**
+   * Row indexes of a result, most telling first
+   */
+  private rowPriority(rows: any[]): number[] {
+    const count = rows.length;
+    const order = new Set<number>();
+    const add = (index: number) => {
+      if (index >= 0 && index < count) {
+        order.add(index);
+      }
+    };
+
+    add(0);
+    add(count - 1);
+
+    // Rows with the extremes of each numeric column
+    const first = rows.find(row => row && typeof row === 'object') || {};
+    for (const column of Object.keys(first)) {
+      let min = -1;
+      let max = -1;
+      rows.forEach((row, index) => {
+        const value = row?.[column];
+        if (typeof value !== 'number' || Number.isNaN(value)) {
+          return;
+        }
+        if (min < 0 || value < rows[min][column]) {
+          min = index;
+        }
+        if (max < 0 || value > rows[max][column]) {
+          max = index;
+        }
+      });
+      add(min);
+      add(max);
+    }
+
+    // Evenly spread rows, halving the spacing each round: 1/2, 1/4 and 3/4, 1/8 ...
+    for (let parts = 2; parts < 2 * count; parts *= 2) {
+      for (let k = 1; k < parts; k += 2) {
+        add(Math.floor((k * count) / parts));
+      }
+    }
+    for (let index = 0; index < count; index++) {
+      add(index);
+    }
+
+    return Array.from(order);
+  }
+}
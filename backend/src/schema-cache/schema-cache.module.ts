@@ -0,0 +1,9 @@
+import { Module } from '@nestjs/common';
+import { SchemaCacheService } from './schema-cache.service';
+import { SchemaIndexService } from './schema-index.service';
+
+@Module({
+  providers: [SchemaCacheService, SchemaIndexService],
+  exports: [SchemaCacheService, SchemaIndexService],
+})
+export class SchemaCacheModule {}
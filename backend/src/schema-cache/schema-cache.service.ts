@@ -0,0 +1,221 @@
+import { Injectable, Logger, OnModuleDestroy } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+import { createHash } from 'crypto';
+import * as fs from 'fs';
+import * as path from 'path';
+import Database = require('better-sqlite3');
+import { safeStringify } from '../utils/serialize.util';
+
+/**
+ * Connection details that decide which schema metadata a connection sees
+ */
+export interface SchemaCacheKey {
+  type?: string;
+  connectionString: string;
+  port?: number;
+  database?: string;
+  schema?: string;
+  username: string;
+}
+
+/**
+ * Summary of a cached schema, without the metadata itself
+ */
+export interface SchemaCacheEntrySummary {
+  fingerprint: string;
+  label: string;
+  dbType: string;
+  schemas: string[];
+  tableCount: number;
+  sizeBytes: number;
+  hits: number;
+  createdAt: string;
+  refreshedAt: string;
+  expiresAt: string;
+}
+
+/**
+ * Persistent cache of schema metadata collected by AskService
+ * Entries are stored in a local SQLite file keyed by connection fingerprint,
+ * so repeat questions and restarts of the server skip schema discovery
+ */
+@Injectable()
+export class SchemaCacheService implements OnModuleDestroy {
+  private readonly logger = new Logger(SchemaCacheService.name);
+  private readonly db: Database.Database;
+  private readonly enabled: boolean;
+  private readonly ttlMs: number;
+  private readonly stats = { hits: 0, misses: 0, stale: 0, stores: 0, invalidations: 0 };
+
+  constructor(private configService: ConfigService) {
+    this.enabled = !['0', 'false', 'no'].includes(
+      (this.configService.get<string>('SCHEMA_CACHE_ENABLED') || 'true').toLowerCase()
+    );
+    this.ttlMs = Number(this.configService.get<string>('SCHEMA_CACHE_TTL_SECONDS') || 3600) * 1000;
+
+    const file = this.configService.get<string>('SCHEMA_CACHE_PATH') ||
+      path.join(process.cwd(), 'data', 'schema-cache.db');
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+
+    this.db = new Database(file);
+    this.db.pragma('journal_mode = WAL');
+    this.db.exec(`
+      CREATE TABLE IF NOT EXISTS schema_cache (
+        fingerprint TEXT PRIMARY KEY,
+        label TEXT NOT NULL,
+        db_type TEXT NOT NULL,
+        schemas TEXT NOT NULL,
+        table_count INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        created_at INTEGER NOT NULL,
+        refreshed_at INTEGER NOT NULL
+      )
+    `);
+
+    this.logger.log(`Schema cache ${this.enabled ? 'enabled' : 'disabled'} at ${file} (TTL ${this.ttlMs / 1000}s)`);
+  }
+
+  onModuleDestroy() {
+    this.db.close();
+  }
+
+  /**
+   * Hash of the connection details, without the password
+   */
+  fingerprint(key: SchemaCacheKey): string {
+    const parts = [
+      (key.type || 'oracle').toLowerCase(),
+      key.connectionString || '',
+      key.port ? String(key.port) : '',
+      key.database || '',
+      key.schema || '',
+      key.username || '',
+    ];
+    return createHash('sha256').update(parts.join('\x1f')).digest('hex');
+  }
+
+  /**
+   * Get cached schema metadata, or null if there is no entry
+   * Entries past their TTL are still returned, marked stale, so they can serve
+   * as the snapshot for an incremental refresh
+   */
+  lookup(fingerprint: string): { data: any; fresh: boolean } | null {
+    if (!this.enabled) {
+      return null;
+    }
+
+    const row = this.db
+      .prepare('SELECT data, refreshed_at FROM schema_cache WHERE fingerprint = ?')
+      .get(fingerprint) as { data: string; refreshed_at: number } | undefined;
+
+    if (!row) {
+      this.stats.misses++;
+      return null;
+    }
+
+    if (Date.now() - row.refreshed_at > this.ttlMs) {
+      this.stats.stale++;
+      return { data: JSON.parse(row.data), fresh: false };
+    }
+
+    this.db.prepare('UPDATE schema_cache SET hits = hits + 1 WHERE fingerprint = ?').run(fingerprint);
+    this.stats.hits++;
+    return { data: JSON.parse(row.data), fresh: true };
+  }
+
+  /**
+   * Store schema metadata for a connection, replacing any previous entry
+   */
+  set(fingerprint: string, key: SchemaCacheKey, dbType: string, schemaData: any): void {
+    if (!this.enabled) {
+      return;
+    }
+
+    const schemas = Array.from(new Set((schemaData.tables || []).map(table => table.owner)));
+    const label = `${key.username}@${key.connectionString}` +
+      (key.database ? `/${key.database}` : '') +
+      (key.schema ? ` (${key.schema})` : '');
+    const now = Date.now();
+
+    this.db.prepare(`
+      INSERT INTO schema_cache (fingerprint, label, db_type, schemas, table_count, data, hits, created_at, refreshed_at)
+      VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+      ON CONFLICT(fingerprint) DO UPDATE SET
+        label = excluded.label,
+        db_type = excluded.db_type,
+        schemas = excluded.schemas,
+        table_count = excluded.table_count,
+        data = excluded.data,
+        refreshed_at = excluded.refreshed_at
+    `).run(
+      fingerprint,
+      label,
+      dbType,
+      JSON.stringify(schemas),
+      (schemaData.tables || []).length,
+      safeStringify(schemaData),
+      now,
+      now
+    );
+    this.stats.stores++;
+  }
+
+  /**
+   * Drop one cached schema, or all of them when no fingerprint is given
+   * @returns Number of entries removed
+   */
+  invalidate(fingerprint?: string): number {
+    const result = fingerprint
+      ? this.db.prepare('DELETE FROM schema_cache WHERE fingerprint = ?').run(fingerprint)
+      : this.db.prepare('DELETE FROM schema_cache').run();
+    this.stats.invalidations += result.changes;
+    return result.changes;
+  }
+
+  /**
+   * Summary of one cached schema, or null if it isn't cached
+   */
+  describe(fingerprint: string): SchemaCacheEntrySummary | null {
+    const row = this.db
+      .prepare(`${this.summarySelect()} WHERE fingerprint = ?`)
+      .get(fingerprint);
+    return row ? this.toSummary(row) : null;
+  }
+
+  /**
+   * Summaries of every cached schema with the cache counters
+   */
+  list(): { enabled: boolean; ttlSeconds: number; stats: any; entries: SchemaCacheEntrySummary[] } {
+    const rows = this.db.prepare(`${this.summarySelect()} ORDER BY refreshed_at DESC`).all();
+    return {
+      enabled: this.enabled,
+      ttlSeconds: this.ttlMs / 1000,
+      stats: { ...this.stats },
+      entries: rows.map(row => this.toSummary(row)),
+    };
+  }
+
+  private summarySelect(): string {
+    return `
+      SELECT fingerprint, label, db_type, schemas, table_count, LENGTH(data) AS size_bytes,
+             hits, created_at, refreshed_at
+      FROM schema_cache
+    `;
+  }
+
+  private toSummary(row: any): SchemaCacheEntrySummary {
+    return {
+      fingerprint: row.fingerprint,
+      label: row.label,
+      dbType: row.db_type,
+      schemas: JSON.parse(row.schemas),
+      tableCount: row.table_count,
+      sizeBytes: row.size_bytes,
+      hits: row.hits,
+      createdAt: new Date(row.created_at).toISOString(),
+      refreshedAt: new Date(row.refreshed_at).toISOString(),
+      expiresAt: new Date(row.refreshed_at + this.ttlMs).toISOString(),
+    };
+  }
+}
@@ -0,0 +1,262 @@
+import { Injectable, Logger } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+import { ForeignKeyGraph, tableKey } from '../utils/foreign-key-graph.util';
+
+// BM25 term frequency saturation and length normalization
+const BM25_K1 = 1.2;
+const BM25_B = 0.75;
+
+// Table names say more about a table than any one of its columns
+const TABLE_NAME_WEIGHT = 3;
+const COLUMN_NAME_WEIGHT = 1;
+const RELATED_TABLE_WEIGHT = 1;
+
+// Words of a question that never name a table or column
+const STOPWORDS = new Set([
+  'a', 'about', 'all', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'each',
+  'for', 'from', 'get', 'give', 'has', 'have', 'how', 'i', 'in', 'is', 'it', 'list', 'many', 'me', 'most',
+  'much', 'my', 'of', 'on', 'or', 'our', 'per', 'show', 'than', 'that', 'the', 'their', 'there', 'these',
+  'this', 'to', 'what', 'when', 'where', 'which', 'who', 'with', 'we', 'were', 'was', 'find',
+]);
+
+/**
+ * BM25 index over the tables of one schema snapshot
+ */
+interface SchemaIndex {
+  signature: string;
+  keys: string[];
+  termFrequencies: Map<string, number>[];
+  lengths: number[];
+  averageLength: number;
+  documentFrequency: Map<string, number>;
+  graph: ForeignKeyGraph;
+}
+
+/**
+ * Result of pruning a schema for one question
+ */
+export interface SchemaSelection {
+  schema: any;
+  pruned: boolean;
+  matched: string[];
+  neighbors: string[];
+}
+
+/**
+ * Local retrieval index that narrows cached schema metadata to the tables a question is about
+ * Each table is a document made of its name, its column names and comments, and the names
+ * of the tables it has foreign keys with. Questions are scored with BM25; the top-k tables
+ * and their foreign key neighbors go to the SQL translation instead of the whole schema.
+ * Everything runs in process, without network calls.
+ */
+@Injectable()
+export class SchemaIndexService {
+  private readonly logger = new Logger(SchemaIndexService.name);
+  private readonly enabled: boolean;
+  private readonly topK: number;
+  private readonly maxTables: number;
+  private readonly indexes = new Map<string, SchemaIndex>();
+  private readonly maxIndexes = 32;
+  private readonly stats = { selections: 0, pruned: 0, unmatched: 0, builds: 0 };
+
+  constructor(private configService: ConfigService) {
+    this.enabled = !['0', 'false', 'no'].includes(
+      (this.configService.get<string>('SCHEMA_INDEX_ENABLED') || 'true').toLowerCase()
+    );
+    this.topK = Math.max(1, Number(this.configService.get<string>('SCHEMA_INDEX_TOP_K') || 8));
+    this.maxTables = Math.max(this.topK, Number(this.configService.get<string>('SCHEMA_INDEX_MAX_TABLES') || 30));
+
+    this.logger.log(
+      `Schema index ${this.enabled ? 'enabled' : 'disabled'} (top ${this.topK}, at most ${this.maxTables} tables per prompt)`
+    );
+  }
+
+  /**
+   * Narrow schema metadata to the tables relevant to a question
+   * Schemas that already fit in maxTables, and questions that match no table, keep the
+   * full schema.
+   * @param fingerprint Schema cache fingerprint of the connection, under which the index is kept
+   * @param schemaData Schema metadata as collected by AskService
+   * @param prompt The user's question
+   */
+  select(fingerprint: string, schemaData: any, prompt: string): SchemaSelection {
+    const tables = schemaData?.tables || [];
+    const unpruned = { schema: schemaData, pruned: false, matched: [], neighbors: [] };
+    if (!this.enabled || tables.length <= this.maxTables) {
+      return unpruned;
+    }
+    this.stats.selections++;
+
+    const index = this.indexFor(fingerprint, schemaData);
+    const scores = this.score(index, this.terms(prompt));
+    const ranked = scores
+      .map((score, position) => ({ key: index.keys[position], score }))
+      .filter(entry => entry.score > 0)
+      .sort((a, b) => b.score - a.score);
+
+    if (ranked.length === 0) {
+      this.stats.unmatched++;
+      this.logger.log('No table matches the question; sending the full schema');
+      return unpruned;
+    }
+
+    const matched = ranked.slice(0, this.topK).map(entry => entry.key);
+    const selected = new Set(matched);
+    const neighbors: string[] = [];
+    // Neighbors of the best matches first, so the joins most likely needed are kept
+    for (const key of matched) {
+      for (const neighbor of index.graph.neighbors(key)) {
+        if (selected.size >= this.maxTables) {
+          break;
+        }
+        if (!selected.has(neighbor)) {
+          selected.add(neighbor);
+          neighbors.push(neighbor);
+        }
+      }
+    }
+
+    const schema = {
+      ...schemaData,
+      tables: tables.filter(table => selected.has(tableKey(table.owner, table.tableName))),
+      relationships: index.graph.between(selected),
+    };
+
+    this.stats.pruned++;
+    this.logger.log(
+      `Schema pruned to ${schema.tables.length} of ${tables.length} tables (matched: ${matched.join(', ')})`
+    );
+    return { schema, pruned: true, matched, neighbors };
+  }
+
+  /**
+   * Index settings and counters
+   */
+  describe(): any {
+    return {
+      enabled: this.enabled,
+      topK: this.topK,
+      maxTables: this.maxTables,
+      indexes: this.indexes.size,
+      stats: { ...this.stats },
+    };
+  }
+
+  /**
+   * The index of a schema, built on first use and again whenever its tables or foreign keys change
+   */
+  private indexFor(fingerprint: string, schemaData: any): SchemaIndex {
+    const tables = (schemaData.tables || []).filter(table => table.tableName);
+    const signature = tables
+      .map(table => `${tableKey(table.owner, table.tableName)}:${(table.columns || []).length}`)
+      .join('|') + `#${(schemaData.relationships || []).length}`;
+
+    const existing = this.indexes.get(fingerprint);
+    if (existing && existing.signature === signature) {
+      // Move to the end so the least recently used index is evicted first
+      this.indexes.delete(fingerprint);
+      this.indexes.set(fingerprint, existing);
+      return existing;
+    }
+
+    const index = this.build(tables, schemaData.relationships || [], signature);
+    this.indexes.delete(fingerprint);
+    this.indexes.set(fingerprint, index);
+    if (this.indexes.size > this.maxIndexes) {
+      this.indexes.delete(this.indexes.keys().next().value);
+    }
+    this.stats.builds++;
+    return index;
+  }
+
+  private build(tables: any[], relationships: any[], signature: string): SchemaIndex {
+    const keys = tables.map(table => tableKey(table.owner, table.tableName));
+    const names = new Map(tables.map(table => [tableKey(table.owner, table.tableName), table.tableName]));
+
+    // Only foreign keys between indexed tables, so every neighbor is a table of the schema
+    const graph = new ForeignKeyGraph(relationships.filter(rel =>
+      names.has(tableKey(rel.source?.schema, rel.source?.table)) &&
+      names.has(tableKey(rel.target?.schema, rel.target?.table))
+    ));
+
+    const termFrequencies: Map<string, number>[] = [];
+    const lengths: number[] = [];
+    const documentFrequency = new Map<string, number>();
+
+    tables.forEach((table, position) => {
+      const frequencies = new Map<string, number>();
+      const add = (text: string, weight: number) => {
+        for (const term of this.terms(text)) {
+          frequencies.set(term, (frequencies.get(term) || 0) + weight);
+        }
+      };
+
+      add(table.tableName, TABLE_NAME_WEIGHT);
+      add(table.comments || table.comment || '', COLUMN_NAME_WEIGHT);
+      for (const column of table.columns || []) {
+        add(column.COLUMN_NAME || column.column_name || '', COLUMN_NAME_WEIGHT);
+        add(column.COMMENTS || column.comments || '', COLUMN_NAME_WEIGHT);
+      }
+      for (const neighbor of graph.neighbors(keys[position])) {
+        add(names.get(neighbor), RELATED_TABLE_WEIGHT);
+      }
+
+      termFrequencies.push(frequencies);
+      lengths.push(Array.from(frequencies.values()).reduce((sum, count) => sum + count, 0));
+      for (const term of frequencies.keys()) {
+        documentFrequency.set(term, (documentFrequency.get(term) || 0) + 1);
+      }
+    });
+
+    const averageLength = lengths.reduce((sum, length) => sum + length, 0) / Math.max(1, lengths.length);
+    return { signature, keys, termFrequencies, lengths, averageLength, documentFrequency, graph };
+  }
+
+  private score(index: SchemaIndex, terms: string[]): number[] {
+    const documents = index.keys.length;
+    const queryTerms = Array.from(new Set(terms));
+    return index.termFrequencies.map((frequencies, position) => {
+      const norm = BM25_K1 * (1 - BM25_B + (BM25_B * index.lengths[position]) / (index.averageLength || 1));
+      let score = 0;
+      for (const term of queryTerms) {
+        const frequency = frequencies.get(term);
+        if (!frequency) {
+          continue;
+        }
+        const df = index.documentFrequency.get(term) || 0;
+        const idf = Math.log(1 + (documents - df + 0.5) / (df + 0.5));
+        score += (idf * frequency * (BM25_K1 + 1)) / (frequency + norm);
+      }
+      return score;
+    });
+  }
+
+  /**
+   * Terms of a question or identifier: words split at case changes, underscores and
+   * digits, lower-cased and reduced to a singular form
+   */
+  private terms(text: string): string[] {
+    if (!text) {
+      return [];
+    }
+    return text
+      .replace(/([a-z])([A-Z])/g, '$1 $2')
+      .toLowerCase()
+      .split(/[^a-z0-9]+|(?<=[a-z])(?=[0-9])|(?<=[0-9])(?=[a-z])/)
+      .filter(word => word.length > 1 && !STOPWORDS.has(word))
+      .map(word => this.stem(word));
+  }
+
+  private stem(word: string): string {
+    if (word.length > 4 && word.endsWith('ies')) {
+      return word.slice(0, -3) + 'y';
+    }
+    if (word.length > 4 && /(sses|xes|ches|shes)$/.test(word)) {
+      return word.slice(0, -2);
+    }
+    if (word.length > 3 && word.endsWith('s') && !word.endsWith('ss') && !word.endsWith('us')) {
+      return word.slice(0, -1);
+    }
+    return word;
+  }
+}
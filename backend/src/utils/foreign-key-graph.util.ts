@@ -0,0 +1,163 @@
+/**
+ * One column of a foreign key, as collected from the catalog
+ * Composite keys give one relationship per column, all with the same constraint name.
+ */
+export interface ForeignKeyRelationship {
+  type: 'Foreign Key';
+  constraint?: string;
+  source: { schema: string; table: string; column: string };
+  target: { schema: string; table: string; column: string };
+}
+
+/**
+ * Key of a table in the graph: schema and table name, compared case-insensitively
+ */
+export function tableKey(schema: string, table: string): string {
+  return `${schema || ''}.${table || ''}`.toUpperCase();
+}
+
+/**
+ * In-memory index of the foreign keys between tables
+ * Relationships are kept per table in both directions, so the keys a table holds, the keys
+ * pointing at it and its neighbors are each one map lookup instead of a scan over every
+ * relationship of the schema.
+ */
+export class ForeignKeyGraph {
+  private readonly outgoingEdges = new Map<string, ForeignKeyRelationship[]>();
+  private readonly incomingEdges = new Map<string, ForeignKeyRelationship[]>();
+  private readonly adjacent = new Map<string, Set<string>>();
+  private readonly degrees = new Map<string, number>();
+  private count = 0;
+
+  constructor(relationships: ForeignKeyRelationship[] = []) {
+    this.add(relationships);
+  }
+
+  /**
+   * Number of relationships in the graph
+   */
+  get size(): number {
+    return this.count;
+  }
+
+  /**
+   * Add relationships, skipping those without a source or target table
+   */
+  add(relationships: ForeignKeyRelationship[]): void {
+    for (const rel of relationships) {
+      if (!rel?.source?.table || !rel?.target?.table) {
+        continue;
+      }
+      const source = tableKey(rel.source.schema, rel.source.table);
+      const target = tableKey(rel.target.schema, rel.target.table);
+
+      this.listFor(this.outgoingEdges, source).push(rel);
+      this.listFor(this.incomingEdges, target).push(rel);
+      this.degrees.set(source, (this.degrees.get(source) || 0) + 1);
+      if (source !== target) {
+        this.degrees.set(target, (this.degrees.get(target) || 0) + 1);
+        this.neighborSet(source).add(target);
+        this.neighborSet(target).add(source);
+      }
+      this.count++;
+    }
+  }
+
+  /**
+   * Relationships whose source is the table, in the order they were added
+   */
+  outgoing(key: string): ForeignKeyRelationship[] {
+    return this.outgoingEdges.get(key) || [];
+  }
+
+  /**
+   * Relationships whose target is the table
+   */
+  incoming(key: string): ForeignKeyRelationship[] {
+    return this.incomingEdges.get(key) || [];
+  }
+
+  /**
+   * Keys of the tables the table has a foreign key with, in either direction
+   */
+  neighbors(key: string): ReadonlySet<string> {
+    return this.adjacent.get(key) || new Set<string>();
+  }
+
+  /**
+   * Number of relationships the table takes part in
+   */
+  degree(key: string): number {
+    return this.degrees.get(key) || 0;
+  }
+
+  /**
+   * The tables, and every table within depth foreign keys of them
+   */
+  neighborhood(keys: Iterable<string>, depth = 1): Set<string> {
+    const reached = new Set(keys);
+    let frontier = Array.from(reached);
+    for (let step = 0; step < depth && frontier.length > 0; step++) {
+      const next: string[] = [];
+      for (const key of frontier) {
+        for (const neighbor of this.neighbors(key)) {
+          if (!reached.has(neighbor)) {
+            reached.add(neighbor);
+            next.push(neighbor);
+          }
+        }
+      }
+      frontier = next;
+    }
+    return reached;
+  }
+
+  /**
+   * Relationships whose source is one of the tables
+   */
+  from(keys: Iterable<string>): ForeignKeyRelationship[] {
+    const relationships: ForeignKeyRelationship[] = [];
+    for (const key of new Set(keys)) {
+      relationships.push(...this.outgoing(key));
+    }
+    return relationships;
+  }
+
+  /**
+   * Relationships with the source or the target among the tables
+   */
+  touching(keys: Iterable<string>): ForeignKeyRelationship[] {
+    const included = new Set(keys);
+    const relationships = this.from(included);
+    for (const key of included) {
+      for (const rel of this.incoming(key)) {
+        if (!included.has(tableKey(rel.source.schema, rel.source.table))) {
+          relationships.push(rel);
+        }
+      }
+    }
+    return relationships;
+  }
+
+  /**
+   * Relationships with both the source and the target among the tables
+   */
+  between(keys: Iterable<string>): ForeignKeyRelationship[] {
+    const included = new Set(keys);
+    return this.from(included).filter(rel => included.has(tableKey(rel.target.schema, rel.target.table)));
+  }
+
+  private listFor(edges: Map<string, ForeignKeyRelationship[]>, key: string): ForeignKeyRelationship[] {
+    if (!edges.has(key)) {
+      edges.set(key, []);
+    }
+    return edges.get(key);
+  }
+
+  private neighborSet(key: string): Set<string> {
+    if (!this.adjacent.has(key)) {
+      this.adjacent.set(key, new Set());
+    }
+    return this.adjacent.get(key);
+  }
+}
@@ -0,0 +1,85 @@
+/**
+ * Utilities for reading JSON that is still arriving, such as a streamed completion
+ */
+
+const ESCAPES: Record<string, string> = {
+  '"': '"',
+  '\\': '\\',
+  '/': '/',
+  b: '\b',
+  f: '\f',
+  n: '\n',
+  r: '\r',
+  t: '\t',
+};
+
+/**
+ * Decoded string values of one field of a possibly incomplete JSON object
+ * The field may hold a string or an array of strings. Only the text received so far is
+ * returned, so the last string may be cut short; an escape sequence cut in half is left out
+ * until the rest of it arrives.
+ * @param json The JSON text received so far
+ * @param field Name of the field to read
+ * @returns The strings found, in order
+ */
+export function partialJsonStrings(json: string, field: string): string[] {
+  const key = new RegExp(`"${field}"\\s*:\\s*`).exec(json);
+  if (!key) {
+    return [];
+  }
+
+  let i = key.index + key[0].length;
+  const isArray = json[i] === '[';
+  if (isArray) {
+    i++;
+  }
+
+  const values: string[] = [];
+  while (i < json.length) {
+    while (i < json.length && /[\s,]/.test(json[i])) {
+      i++;
+    }
+    if (json[i] !== '"') {
+      break;
+    }
+    i++;
+
+    let value = '';
+    let closed = false;
+    while (i < json.length) {
+      const ch = json[i];
+      if (ch === '"') {
+        closed = true;
+        i++;
+        break;
+      }
+      if (ch === '\\') {
+        const escape = json[i + 1];
+        if (escape === undefined) {
+          break;
+        }
+        if (escape === 'u') {
+          const hex = json.slice(i + 2, i + 6);
+          if (hex.length < 4) {
+            break;
+          }
+          value += String.fromCharCode(parseInt(hex, 16));
+          i += 6;
+          continue;
+        }
+        value += ESCAPES[escape] ?? escape;
+        i += 2;
+        continue;
+      }
+      value += ch;
+      i++;
+    }
+
+    values.push(value);
+    if (!closed || !isArray) {
+      break;
+    }
+  }
+
+  return values;
+}
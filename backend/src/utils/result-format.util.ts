@@ -0,0 +1,142 @@
+/**
+ * Encodings of query results that /ask and the result pages can answer with
+ */
+import { Bool, Float64, Table, Utf8, Vector, tableToIPC, vectorFromArray } from 'apache-arrow';
+import { safeStringify } from './serialize.util';
+
+export type ResultFormat = 'json' | 'columnar' | 'ndjson' | 'arrow';
+
+/**
+ * Media type of each encoding
+ * json: row objects, as always. columnar: JSON with the column names once and one array of
+ * values per column. ndjson: a metadata line, then one line per row. arrow: Apache Arrow IPC
+ * stream format.
+ */
+export const RESULT_MEDIA_TYPES: Record<ResultFormat, string> = {
+  json: 'application/json',
+  columnar: 'application/vnd.ask.columnar+json',
+  ndjson: 'application/x-ndjson',
+  arrow: 'application/vnd.apache.arrow.stream',
+};
+
+/**
+ * Results of one query with the column names once and the values column by column
+ */
+export interface ColumnarResult {
+  columns: string[];
+  values: any[][];
+}
+
+/**
+ * Encoding asked for by a ?format= parameter, else by the Accept header
+ * Anything that accepts JSON in general (no header, * / *, application/*) gets row objects.
+ * @returns The encoding, or null if nothing the client accepts can be produced
+ */
+export function negotiateResultFormat(accept?: string, format?: string): ResultFormat | null {
+  if (format) {
+    const name = format.toLowerCase();
+    return name in RESULT_MEDIA_TYPES ? name as ResultFormat : null;
+  }
+  if (!accept) {
+    return 'json';
+  }
+
+  const ranges = accept.split(',')
+    .map((part, order) => {
+      const [type, ...params] = part.split(';').map(piece => piece.trim().toLowerCase());
+      const q = params.find(param => param.startsWith('q='));
+      return { type, quality: q ? Number(q.slice(2)) || 0 : 1, order };
+    })
+    .filter(range => range.type && range.quality > 0)
+    .sort((a, b) => b.quality - a.quality || a.order - b.order);
+
+  for (const range of ranges) {
+    const match = (Object.keys(RESULT_MEDIA_TYPES) as ResultFormat[]).find(name => RESULT_MEDIA_TYPES[name] === range.type);
+    if (match) {
+      return match;
+    }
+    if (range.type === '*/*' || range.type === 'application/*') {
+      return 'json';
+    }
+  }
+  return null;
+}
+
+/**
+ * Columns of a result in the order they first appear in its rows
+ */
+export function resultColumns(rows: any[]): string[] {
+  const columns = new Set<string>();
+  for (const row of rows) {
+    if (row && typeof row === 'object') {
+      Object.keys(row).forEach(column => columns.add(column));
+    }
+  }
+  return Array.from(columns);
+}
+
+/**
+ * Row objects turned into column names and one array of values per column
+ * Missing values become null, so every array is as long as the result.
+ */
+export function toColumnar(rows: any[]): ColumnarResult {
+  const list = Array.isArray(rows) ? rows : [rows];
+  const columns = resultColumns(list);
+  return {
+    columns,
+    values: columns.map(column => list.map(row => row?.[column] ?? null)),
+  };
+}
+
+/**
+ * Lines of an NDJSON answer: the metadata object, then every row of every result in order
+ * Which result a row belongs to follows from the row counts in the metadata.
+ */
+export function* ndjsonLines(metadata: any, results: any[][]): Generator<string> {
+  yield safeStringify(metadata) + '\n';
+  for (const rows of results) {
+    for (const row of rows) {
+      yield safeStringify(row) + '\n';
+    }
+  }
+}
+
+/**
+ * Arrow IPC stream of one table per result, written one after the other
+ * Columns whose values are all numbers become Float64, all booleans Bool, anything else Utf8
+ * (objects as JSON). Each schema has the query index under "ask.query" and the given metadata
+ * as JSON strings; readers such as RecordBatchReader.readAll read the tables in turn.
+ */
+export function encodeArrow(results: any[][], metadata: (index: number) => Record<string, any>): Buffer {
+  const tables = (results.length > 0 ? results : [[]]).map((rows, index) => {
+    const { columns, values } = toColumnar(rows);
+    const vectors: Record<string, Vector> = {};
+    columns.forEach((column, position) => {
+      vectors[column] = arrowVector(values[position]);
+    });
+
+    const table = new Table(vectors);
+    table.schema.metadata.set('ask.query', String(index));
+    for (const [key, value] of Object.entries(metadata(index))) {
+      table.schema.metadata.set(key, safeStringify(value));
+    }
+    return Buffer.from(tableToIPC(table, 'stream'));
+  });
+  return Buffer.concat(tables);
+}
+
+function arrowVector(values: any[]): Vector {
+  const present = values.filter(value => value !== null && value !== undefined);
+  if (present.length > 0 && present.every(value => typeof value === 'number')) {
+    return vectorFromArray(values, new Float64());
+  }
+  if (present.length > 0 && present.every(value => typeof value === 'boolean')) {
+    return vectorFromArray(values, new Bool());
+  }
+  return vectorFromArray(values.map(value => {
+    if (value === null || value === undefined) return null;
+    if (typeof value === 'string') return value;
+    if (value instanceof Date) return value.toISOString();
+    return typeof value === 'object' ? safeStringify(value) : String(value);
+  }), new Utf8());
+}
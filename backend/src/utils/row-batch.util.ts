@@ -0,0 +1,17 @@
+/**
+ * Rows of an object stream grouped into batches of up to size rows
+ * Breaking out of the loop stops reading the source; Node readable streams are destroyed.
+ */
+export async function* rowBatches(source: AsyncIterable<any>, size: number): AsyncGenerator<any[]> {
+  let batch: any[] = [];
+  for await (const row of source) {
+    batch.push(row);
+    if (batch.length >= size) {
+      yield batch;
+      batch = [];
+    }
+  }
+  if (batch.length > 0) {
+    yield batch;
+  }
+}
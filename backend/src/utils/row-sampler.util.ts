@@ -0,0 +1,70 @@
+/**
+ * Bounded sample of a result read in batches, for prompts that can't hold every row
+ * Keeps the first and last rows, the rows with the minimum and maximum of each numeric
+ * column, and rows at an even stride over the whole result. The stride doubles whenever
+ * the sample outgrows its capacity, so memory stays bounded however many rows go through;
+ * results within the capacity are kept whole.
+ */
+export class RowSampler {
+  totalRows = 0;
+  private stride = 1;
+  private readonly spread = new Map<number, any>();
+  private readonly extremes = new Map<string, { min: [number, any]; max: [number, any] }>();
+  private last: [number, any] = null;
+
+  constructor(private readonly capacity: number) {}
+
+  /**
+   * Take the next batch of rows into account
+   */
+  add(rows: any[]): void {
+    for (const row of rows) {
+      const index = this.totalRows++;
+      this.last = [index, row];
+
+      if (index % this.stride === 0) {
+        this.spread.set(index, row);
+        if (this.spread.size > this.capacity) {
+          this.stride *= 2;
+          for (const kept of this.spread.keys()) {
+            if (kept % this.stride !== 0) {
+              this.spread.delete(kept);
+            }
+          }
+        }
+      }
+
+      if (row && typeof row === 'object') {
+        for (const column of Object.keys(row)) {
+          const value = row[column];
+          if (typeof value !== 'number' || Number.isNaN(value)) {
+            continue;
+          }
+          const extreme = this.extremes.get(column);
+          if (!extreme) {
+            this.extremes.set(column, { min: [index, row], max: [index, row] });
+          } else if (value < extreme.min[1][column]) {
+            extreme.min = [index, row];
+          } else if (value > extreme.max[1][column]) {
+            extreme.max = [index, row];
+          }
+        }
+      }
+    }
+  }
+
+  /**
+   * The sampled rows in their original order
+   */
+  rows(): any[] {
+    const picked = new Map(this.spread);
+    if (this.last) {
+      picked.set(this.last[0], this.last[1]);
+    }
+    for (const { min, max } of this.extremes.values()) {
+      picked.set(min[0], min[1]);
+      picked.set(max[0], max[1]);
+    }
+    return Array.from(picked.keys()).sort((a, b) => a - b).map(index => picked.get(index));
+  }
+}
@@ -0,0 +1,79 @@
+/**
+ * Values of the :name placeholders of a query
+ * An array fills an IN (:name) list with one placeholder per element.
+ */
+export type QueryBinds = Record<string, any>;
+
+/**
+ * Placeholder syntax of a database driver
+ */
+export type BindStyle = 'oracle' | 'postgres' | 'mysql' | 'mssql';
+
+/**
+ * A query rewritten for a driver, with its values by name or in placeholder order
+ */
+export interface BoundQuery {
+  sql: string;
+  values: any[] | Record<string, any>;
+}
+
+// String literals and quoted identifiers are skipped, and :: casts are not placeholders
+const PLACEHOLDER = /'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|(?<![:\w]):([A-Za-z_][A-Za-z0-9_]*)/g;
+
+/**
+ * Rewrite a query with :name placeholders for a driver's placeholder syntax
+ * Oracle keeps :name, SQL Server gets @name, PostgreSQL $1, $2 ... and MySQL ?. Placeholders
+ * without a value are left as they are. IN lists are padded to a power of two with their last
+ * value, so lists of similar length share one statement text and one cached statement.
+ */
+export function bindQuery(sql: string, binds: QueryBinds, style: BindStyle): BoundQuery {
+  const flat: Record<string, any> = {};
+  const lists = new Map<string, string>();
+  for (const [name, value] of Object.entries(binds)) {
+    if (!Array.isArray(value)) {
+      flat[name] = value ?? null;
+      continue;
+    }
+    const size = value.length <= 1 ? 1 : 2 ** Math.ceil(Math.log2(value.length));
+    const names: string[] = [];
+    for (let index = 0; index < size; index++) {
+      const element = `${name}_${index}`;
+      // An empty list binds a single NULL, which matches nothing
+      flat[element] = value.length > 0 ? value[Math.min(index, value.length - 1)] ?? null : null;
+      names.push(`:${element}`);
+    }
+    lists.set(name, names.join(', '));
+  }
+
+  const expanded = lists.size > 0
+    ? sql.replace(PLACEHOLDER, (match, name) => (name && lists.has(name) ? lists.get(name) : match))
+    : sql;
+
+  const positions = new Map<string, number>();
+  const ordered: any[] = [];
+  const named: Record<string, any> = {};
+  const text = expanded.replace(PLACEHOLDER, (match, name) => {
+    if (!name || !(name in flat)) {
+      return match;
+    }
+    switch (style) {
+      case 'postgres':
+        if (!positions.has(name)) {
+          ordered.push(flat[name]);
+          positions.set(name, ordered.length);
+        }
+        return `$${positions.get(name)}`;
+      case 'mysql':
+        ordered.push(flat[name]);
+        return '?';
+      case 'mssql':
+        named[name] = flat[name];
+        return `@${name}`;
+      default:
+        named[name] = flat[name];
+        return `:${name}`;
+    }
+  });
+
+  return { sql: text, values: style === 'postgres' || style === 'mysql' ? ordered : named };
+}
@@ -0,0 +1,824 @@
+import os
+import json
+import time
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from urllib.parse import urlsplit
+
+import requests
+
+import upstream
+from log_pump import nestjs_logs
+
+# Supervision of the NestJS worker processes
+NESTJS_SUPERVISE = os.environ.get("NESTJS_SUPERVISE", "true").lower() in ("1", "true", "yes")
+# Workers listen on consecutive ports starting at the NESTJS_BASE_URL port
+NESTJS_WORKERS = max(1, int(os.environ.get("NESTJS_WORKERS", str(os.cpu_count() or 1))))
+NESTJS_BUILD_COMMAND = os.environ.get("NESTJS_BUILD_COMMAND", "npx @nestjs/cli build")
+NESTJS_START_COMMAND = os.environ.get("NESTJS_START_COMMAND", "node dist/main.js")
+# Rebuild on every start, even when dist/ is newer than src/
+NESTJS_ALWAYS_BUILD = os.environ.get("NESTJS_ALWAYS_BUILD", "false").lower() in ("1", "true", "yes")
+NESTJS_READY_PATH = os.environ.get("NESTJS_READY_PATH", "/ask")
+NESTJS_READY_TIMEOUT = float(os.environ.get("NESTJS_READY_TIMEOUT", "120"))
+# How long a proxied request waits for a ready worker before getting a 503
+NESTJS_REQUEST_READY_WAIT = float(os.environ.get("NESTJS_REQUEST_READY_WAIT", "30"))
+NESTJS_RESTART_BACKOFF_MIN = float(os.environ.get("NESTJS_RESTART_BACKOFF_MIN", "1"))
+NESTJS_RESTART_BACKOFF_MAX = float(os.environ.get("NESTJS_RESTART_BACKOFF_MAX", "30"))
+# Active health checks of ready workers
+NESTJS_HEALTH_CHECK_INTERVAL = float(os.environ.get("NESTJS_HEALTH_CHECK_INTERVAL", "5"))
+NESTJS_HEALTH_CHECK_TIMEOUT = float(os.environ.get("NESTJS_HEALTH_CHECK_TIMEOUT", "2"))
+NESTJS_HEALTH_CHECK_FAILURES = int(os.environ.get("NESTJS_HEALTH_CHECK_FAILURES", "3"))
+# An ejected worker that stays unhealthy this long is restarted
+NESTJS_EJECT_RESTART_AFTER = float(os.environ.get("NESTJS_EJECT_RESTART_AFTER", "60"))
+# How long a restart waits for the old worker's in-flight requests before stopping it
+NESTJS_DRAIN_TIMEOUT = float(os.environ.get("NESTJS_DRAIN_TIMEOUT", "30"))
+# /restart starts each replacement this many ports away from the worker it replaces
+NESTJS_ALTERNATE_PORT_OFFSET = max(NESTJS_WORKERS, int(os.environ.get("NESTJS_ALTERNATE_PORT_OFFSET", str(NESTJS_WORKERS))))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# One wrapper process per host, the one holding the lock in this directory, runs the workers;
+# the others proxy to the workers it publishes there. Empty makes every process run its own.
+NESTJS_SUPERVISOR_DIR = os.environ.get("NESTJS_SUPERVISOR_DIR", os.path.join(BASE_DIR, ".nestjs"))
+# Files whose changes make dist/ out of date
+BUILD_INPUTS = ("src", "tsconfig.json", "tsconfig.build.json", "nest-cli.json", "package.json")
+BUILD_DIR = "dist"
+BUILD_OUTPUT = os.path.join(BUILD_DIR, "main.js")
+# The last good build, moved aside while a new one is built (nest build empties dist/ first)
+BUILD_BACKUP_DIR = "dist.previous"
+
+READY_POLL_INTERVAL = 0.1
+READY_PROBE_TIMEOUT = 1
+# A child that stayed up this long is considered stable and resets the backoff
+STABLE_AFTER = 60
+STOP_TIMEOUT = 10
+# How often followers re-read the published workers and try to take over the supervisor lock
+COORDINATE_INTERVAL = 0.5
+
+
+def newest_mtime(paths):
+    """Latest modification time of the given files and everything below the given directories"""
+    newest = 0
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in files:
+                    try:
+                        newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+                    except OSError:
+                        pass
+        elif os.path.exists(path):
+            newest = max(newest, os.path.getmtime(path))
+    return newest
+
+
+def build_is_fresh(base_dir=BASE_DIR):
+    """True if dist/main.js is newer than every build input"""
+    try:
+        built_at = os.path.getmtime(os.path.join(base_dir, BUILD_OUTPUT))
+    except OSError:
+        return False
+    return newest_mtime([os.path.join(base_dir, path) for path in BUILD_INPUTS]) <= built_at
+
+
+def read_json(path):
+    """Contents of a JSON file, or None if it is missing or unreadable"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    """Replace a JSON file in one step, so readers never see half of it"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def is_worker_process(pid):
+    """True if pid still runs NESTJS_START_COMMAND, so a reused PID is never killed
+
+    Without /proc the command line can't be checked and only the PID is.
+    """
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = [arg.decode(errors="replace") for arg in f.read().split(b"\0")[:-1]]
+    except FileNotFoundError:
+        if os.path.isdir("/proc"):
+            return False
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        return True
+    except OSError:
+        return False
+    args = shlex.split(NESTJS_START_COMMAND)[1:]
+    return bool(cmdline) and cmdline[len(cmdline) - len(args):] == args
+
+
+def worker_url(base_url, index):
+    """Base URL of the index-th worker, on the port after the previous worker's"""
+    parts = urlsplit(base_url)
+    port = (parts.port or 3005) + index
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class NestWorker:
+    """One NestJS child process on its own port, restarted with backoff when it exits
+
+    With supervision disabled a worker stands for an externally managed
+    server: it has no process and is always considered ready.
+    """
+
+    def __init__(self, index, url, base_dir=BASE_DIR, on_change=None, managed=True):
+        self.index = index
+        self.url = url
+        self.port = urlsplit(url).port
+        self.base_dir = base_dir
+        self.managed = managed
+        self.on_change = on_change or (lambda: None)
+        self.process = None
+        self.state = "stopped" if managed else "external"
+        # Balancer state, guarded by the supervisor's lock
+        self.outstanding = 0
+        self.ejected = False
+        self.draining = False
+        self.failures = 0
+        self.unhealthy_since = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._restart = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {
+            "requests": 0,
+            "starts": 0,
+            "crashes": 0,
+            "restarts": 0,
+            "ejections": 0,
+            "last_exit_code": None,
+        }
+        self.start_to_ready_seconds = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set() or not self.managed
+
+    @property
+    def routable(self):
+        return self.ready and not self.ejected and not self.draining
+
+    @property
+    def live(self):
+        if not self.managed:
+            return True
+        process = self.process
+        return process is not None and process.poll() is None
+
+    def start(self):
+        if not self.managed or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._supervise, name=f"nestjs-worker-{self.index}", daemon=True)
+        self._thread.start()
+
+    def restart(self, timeout=NESTJS_READY_TIMEOUT):
+        """Replace the child and wait until the new one is ready"""
+        if not self.managed:
+            return True
+        self._stats["restarts"] += 1
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        else:
+            self._set_ready(False)
+            self._restart.set()
+            self._wake.set()
+            self._terminate()
+        return self._ready.wait(timeout)
+
+    def wait_ready(self, timeout):
+        return self._ready.wait(timeout) or not self.managed
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        self._terminate()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(STOP_TIMEOUT)
+        if self.managed:
+            self.state = "stopped"
+
+    def status(self):
+        process = self.process
+        return {
+            "url": self.url,
+            "live": self.live,
+            "ready": self.ready,
+            "ejected": self.ejected,
+            "draining": self.draining,
+            "state": self.state,
+            "pid": process.pid if process is not None and self.live else None,
+            "outstanding": self.outstanding,
+            "health_check_failures": self.failures,
+            **self._stats,
+            "start_to_ready_seconds": self.start_to_ready_seconds,
+        }
+
+    def _set_ready(self, ready):
+        if ready:
+            self.ejected = False
+            self.failures = 0
+            self.unhealthy_since = None
+            self._ready.set()
+        else:
+            self._ready.clear()
+        self.on_change()
+
+    def _supervise(self):
+        backoff = NESTJS_RESTART_BACKOFF_MIN
+        while not self._stopping.is_set():
+            self._restart.clear()
+            spawned_at = time.monotonic()
+            try:
+                process = self._spawn()
+            except OSError as e:
+                print(f"Error starting NestJS worker on port {self.port}: {e}")
+                process = None
+            if process is not None:
+                self._wait_until_listening(process, spawned_at)
+                exit_code = process.wait()
+                self._set_ready(False)
+                self._stats["last_exit_code"] = exit_code
+                if self._stopping.is_set():
+                    break
+                if self._restart.is_set():
+                    # Replaced on purpose, start the new one straight away
+                    self._wake.clear()
+                    backoff = NESTJS_RESTART_BACKOFF_MIN
+                    continue
+                self._stats["crashes"] += 1
+                if time.monotonic() - spawned_at > STABLE_AFTER:
+                    backoff = NESTJS_RESTART_BACKOFF_MIN
+                print(f"NestJS worker on port {self.port} exited with code {exit_code}, restarting in {backoff:.1f}s")
+            self.state = "backoff"
+            self._wake.wait(backoff)
+            self._wake.clear()
+            if self._restart.is_set():
+                backoff = NESTJS_RESTART_BACKOFF_MIN
+            else:
+                backoff = min(backoff * 2, NESTJS_RESTART_BACKOFF_MAX)
+        self.state = "stopped"
+
+    def _spawn(self):
+        self.state = "starting"
+        self.process = subprocess.Popen(
+            shlex.split(NESTJS_START_COMMAND),
+            cwd=self.base_dir,
+            env={**os.environ, "PORT": str(self.port)},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        # Nobody else reads the pipes; without this a chatty worker blocks once they fill up
+        nestjs_logs.attach(self.process, self.port)
+        self._stats["starts"] += 1
+        return self.process
+
+    def _wait_until_listening(self, process, spawned_at):
+        """Poll the worker until it answers, the child exits or the worker stops"""
+        url = f"{self.url}{NESTJS_READY_PATH}"
+        warned = False
+        while process.poll() is None and not self._stopping.is_set():
+            try:
+                resp = upstream.get_session().get(url, timeout=READY_PROBE_TIMEOUT)
+                resp.close()
+                if resp.status_code < 500:
+                    self.start_to_ready_seconds = round(time.monotonic() - spawned_at, 3)
+                    self.state = "ready"
+                    self._set_ready(True)
+                    print(f"NestJS worker ready on {self.url} after {self.start_to_ready_seconds:.2f}s")
+                    return True
+            except requests.RequestException:
+                pass
+            if not warned and time.monotonic() - spawned_at > NESTJS_READY_TIMEOUT:
+                print(f"NestJS worker on port {self.port} not ready after {NESTJS_READY_TIMEOUT:.0f}s, still waiting")
+                warned = True
+            self._stopping.wait(READY_POLL_INTERVAL)
+        return False
+
+    def _terminate(self):
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+class NestSupervisor:
+    """Builds NestJS once and runs a pool of worker processes behind a balancer
+
+    start() returns at once. A background thread builds only when dist/ is
+    out of date and starts NESTJS_WORKERS workers on consecutive ports; each
+    worker is polled until it answers HTTP and restarted with backoff when it
+    exits. acquire() hands out the ready worker with the fewest outstanding
+    requests. Workers that fail health checks are ejected from the rotation
+    until they answer again. restart() is blue-green: each worker's
+    replacement starts on an alternate port and takes over once it is ready,
+    then the old one drains and stops.
+    Liveness (a worker runs) and readiness (a worker answers) are reported
+    separately.
+
+    With several wrapper processes on a host (gunicorn workers), only the one
+    holding the lock in NESTJS_SUPERVISOR_DIR supervises. It publishes its
+    workers' URLs, readiness and PIDs there; the others follow them as
+    external workers, hand /restart to it and take over when it exits.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, enabled=NESTJS_SUPERVISE, workers=NESTJS_WORKERS,
+                 base_url=upstream.NESTJS_BASE_URL, alternate_offset=NESTJS_ALTERNATE_PORT_OFFSET,
+                 state_dir=NESTJS_SUPERVISOR_DIR):
+        self.base_dir = base_dir
+        self.base_url = base_url
+        self.alternate_offset = alternate_offset
+        self.enabled = enabled
+        self.worker_count = workers
+        self.state = "stopped" if enabled else "external"
+        # "supervisor" or "follower" once started
+        self.role = None
+        self.state_dir = state_dir
+        self._coordinated = enabled and bool(state_dir) and fcntl is not None
+        self._lock_file = None
+        self._coordinator = None
+        self._publish_lock = threading.Lock()
+        # Follower: the supervising process and the last published state seen
+        self._supervisor_pid = None
+        self._published = None
+        self._published_mtime = None
+        # Supervisor: restart requests from followers older than this are ignored
+        self._restarts_from = None
+        self._last_restart = None
+        self._changed = threading.Condition()
+        self.workers = [
+            NestWorker(index, worker_url(base_url, index), base_dir, self._notify)
+            for index in range(workers)
+        ] if enabled else [
+            NestWorker(0, base_url.rstrip('/'), base_dir, self._notify, managed=False)
+        ]
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._thread = None
+        self._health_thread = None
+        self._started_at = None
+        # Replacements started by restart() that have not taken over yet
+        self._standby = []
+        self._stats = {
+            "builds": 0,
+            "builds_skipped": 0,
+            "failed_builds": 0,
+            "restarts": 0,
+            "swaps": 0,
+            "failed_swaps": 0,
+        }
+        self._timings = {
+            "build_seconds": None,
+            "cold_start_seconds": None,
+            "first_answer_seconds": None,
+        }
+
+    @property
+    def ready(self):
+        return any(worker.routable for worker in self.workers)
+
+    @property
+    def live(self):
+        return any(worker.live for worker in self.workers)
+
+    def start(self):
+        """Build if needed and start the workers in the background, or follow the process that does"""
+        if not self.enabled:
+            print("NestJS supervision disabled, proxying to an externally managed server")
+            return True
+        with self._lock:
+            if self.role is None:
+                self._stopping.clear()
+                if not self._elect():
+                    self._follow()
+                    print("NestJS workers are supervised by another process, proxying to them")
+                if self._coordinated:
+                    self._coordinator = threading.Thread(target=self._coordinate, name="nestjs-coordinator", daemon=True)
+                    self._coordinator.start()
+            if self.role == "follower" or (self._thread is not None and self._thread.is_alive()):
+                return True
+            self._stopping.clear()
+            self._started_at = time.monotonic()
+            self._timings["cold_start_seconds"] = None
+            self._timings["first_answer_seconds"] = None
+            self._thread = threading.Thread(target=self._boot, name="nestjs-supervisor", daemon=True)
+            self._thread.start()
+        return True
+
+    def restart(self, timeout=NESTJS_READY_TIMEOUT):
+        """Blue-green restart: rebuild if needed, then swap in new workers one at a time
+
+        Each replacement starts on the alternate port of the worker it
+        replaces while the old one keeps serving. Once it answers it takes
+        the old one's place in the rotation in a single step, and the old one
+        gets NESTJS_DRAIN_TIMEOUT to finish its requests before it is stopped.
+        If a replacement doesn't become ready, it is stopped and the old
+        workers keep serving.
+        """
+        if not self.enabled:
+            return False
+        if self.role == "follower":
+            return self._request_restart(timeout)
+        if self._thread is None:
+            self.start()
+            return self.wait_ready(timeout)
+        with self._restart_lock:
+            self._stats["restarts"] += 1
+            self.state = "restarting"
+            if not self._build():
+                # The previous build is back in dist/ and the old workers keep serving
+                self.state = "running"
+                return False
+            success = all(self._swap(index, timeout) for index in range(len(self.workers)))
+            self.state = "running"
+            return success
+
+    def stop(self):
+        """Stop the workers and the supervisor threads"""
+        self._stopping.set()
+        for worker in self.workers + self._standby:
+            worker.stop()
+        if self.role == "supervisor":
+            self._publish()
+        if self._lock_file is not None:
+            # Lets a follower take over
+            self._lock_file.close()
+            self._lock_file = None
+        self.role = None
+        if self.enabled:
+            self.state = "stopped"
+
+    def wait_ready(self, timeout):
+        """Wait up to timeout seconds for a worker to answer requests"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while not self.ready:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def acquire(self, timeout=0):
+        """The routable worker with the fewest outstanding requests, or None if none is ready in time
+
+        Every worker handed out must be given back with release().
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                candidates = [worker for worker in self.workers if worker.routable]
+                if candidates:
+                    # Ties go to the worker that has served the fewest requests
+                    worker = min(candidates, key=lambda w: (w.outstanding, w._stats["requests"]))
+                    worker.outstanding += 1
+                    worker._stats["requests"] += 1
+                    return worker
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    def release(self, worker, failed=False):
+        """Give a worker back; failed marks a connection error, which counts as a failed health check"""
+        with self._changed:
+            worker.outstanding -= 1
+            self._changed.notify_all()
+        if failed:
+            self._record_health(worker, False)
+
+    def record_answer(self):
+        """Note a successful /ask, the first one sets the time to first answer"""
+        if self._timings["first_answer_seconds"] is None and self._started_at is not None:
+            self._timings["first_answer_seconds"] = round(time.monotonic() - self._started_at, 3)
+
+    def status(self):
+        """Liveness, readiness, per-worker state and counters and startup timings"""
+        return {
+            "supervised": self.enabled,
+            "role": self.role,
+            "supervisor_pid": os.getpid() if self.role == "supervisor" else self._supervisor_pid,
+            "live": self.live,
+            "ready": self.ready,
+            "state": self.state,
+            **self._stats,
+            "timings": dict(self._timings),
+            "workers": [worker.status() for worker in self.workers],
+        }
+
+    def _notify(self):
+        with self._changed:
+            if self._timings["cold_start_seconds"] is None and self._started_at is not None and self.ready:
+                self._timings["cold_start_seconds"] = round(time.monotonic() - self._started_at, 3)
+            self._changed.notify_all()
+        self._publish()
+
+    def _boot(self):
+        self._kill_stale()
+        self._publish()
+        if not self._build() and not os.path.exists(os.path.join(self.base_dir, BUILD_OUTPUT)):
+            print("NestJS build failed and there is no previous build, not starting any worker")
+            self.state = "failed"
+            return
+        if self._stopping.is_set():
+            return
+        for worker in self.workers:
+            worker.start()
+        self.state = "running"
+        self._health_thread = threading.Thread(target=self._health_loop, name="nestjs-health", daemon=True)
+        self._health_thread.start()
+
+    def _kill_stale(self):
+        """Stop the workers a previous supervisor published but left running, so their ports are free"""
+        state = read_json(os.path.join(self.state_dir, "supervisor.json")) if self._coordinated else None
+        for info in (state or {}).get("workers", []):
+            pid = info.get("pid")
+            if not pid or not is_worker_process(pid):
+                continue
+            print(f"Stopping NestJS worker {pid} left running on {info.get('url')} by process {state.get('pid')}")
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def _build(self):
+        """Build if dist/ is out of date; False if the build failed
+
+        The current dist/ is moved aside first and put back when the build
+        fails, so a failed build leaves the last good one in place.
+        """
+        if not NESTJS_ALWAYS_BUILD and build_is_fresh(self.base_dir):
+            self._stats["builds_skipped"] += 1
+            print("NestJS build is up to date, skipping build")
+            return True
+        state = self.state
+        self.state = "building"
+        started = time.monotonic()
+        dist = os.path.join(self.base_dir, BUILD_DIR)
+        backup = os.path.join(self.base_dir, BUILD_BACKUP_DIR)
+        shutil.rmtree(backup, ignore_errors=True)
+        if os.path.isdir(dist):
+            os.rename(dist, backup)
+        built = False
+        try:
+            result = subprocess.run(shlex.split(NESTJS_BUILD_COMMAND), cwd=self.base_dir)
+            built = result.returncode == 0 and os.path.exists(os.path.join(self.base_dir, BUILD_OUTPUT))
+            if result.returncode != 0:
+                print(f"NestJS build failed with code {result.returncode}")
+            elif not built:
+                print(f"NestJS build did not produce {BUILD_OUTPUT}")
+        except OSError as e:
+            print(f"Error building NestJS server: {e}")
+        if built:
+            shutil.rmtree(backup, ignore_errors=True)
+        else:
+            self._stats["failed_builds"] += 1
+            if os.path.isdir(backup):
+                shutil.rmtree(dist, ignore_errors=True)
+                os.rename(backup, dist)
+                print("Keeping the previous NestJS build")
+        self._stats["builds"] += 1
+        self._timings["build_seconds"] = round(time.monotonic() - started, 3)
+        self.state = state
+        return built
+
+    def _alternate_url(self, worker):
+        """The other port of a worker's slot: its alternate port, or back to its own"""
+        primary = worker_url(self.base_url, worker.index)
+        if worker.url != primary:
+            return primary
+        return worker_url(self.base_url, worker.index + self.alternate_offset)
+
+    def _swap(self, index, timeout):
+        """Replace one worker by a new one on its alternate port, without a moment with neither routable"""
+        old = self.workers[index]
+        new = NestWorker(index, self._alternate_url(old), self.base_dir, self._notify)
+        new._stats.update({key: old._stats[key] for key in ("requests", "crashes", "ejections", "restarts")})
+        new._stats["restarts"] += 1
+        self._standby.append(new)
+        new.start()
+        ready = new.wait_ready(timeout)
+        self._standby.remove(new)
+        if not ready or self._stopping.is_set():
+            print(f"NestJS worker on port {new.port} not ready after {timeout:.0f}s, keeping port {old.port}")
+            new.stop()
+            self._stats["failed_swaps"] += 1
+            return False
+
+        with self._changed:
+            # Copy on write, so code iterating the old list never sees a half-done swap
+            workers = list(self.workers)
+            workers[index] = new
+            self.workers = workers
+            old.draining = True
+            self._changed.notify_all()
+        self._publish()
+        self._stats["swaps"] += 1
+        print(f"NestJS worker on port {new.port} took over from port {old.port}")
+        self._drain(old)
+        old.stop()
+        return True
+
+    def _elect(self):
+        """Take the supervisor lock unless another process holds it; True if this process supervises"""
+        if not self._coordinated:
+            self.role = "supervisor"
+            return True
+        if self._lock_file is None:
+            os.makedirs(self.state_dir, mode=0o700, exist_ok=True)
+            self._lock_file = open(os.path.join(self.state_dir, "supervisor.lock"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            if self.role is None:
+                self.role = "follower"
+                self.state = "following"
+                self.workers = []
+            return False
+        self.role = "supervisor"
+        self._restarts_from = time.time()
+        return True
+
+    def _coordinate(self):
+        """Follower: track the published workers and take over once the lock is free
+        Supervisor: run the restarts followers ask for.
+        """
+        while not self._stopping.wait(COORDINATE_INTERVAL):
+            if self.role == "follower":
+                if self._elect():
+                    self._take_over()
+                else:
+                    self._follow()
+            elif self.role == "supervisor":
+                self._serve_restart_request()
+
+    def _take_over(self):
+        print(f"NestJS supervisor process {self._supervisor_pid} is gone, taking over its workers")
+        with self._changed:
+            self.workers = [
+                NestWorker(index, worker_url(self.base_url, index), self.base_dir, self._notify)
+                for index in range(self.worker_count)
+            ]
+            self._changed.notify_all()
+        self.state = "stopped"
+        self.start()
+
+    def _publish(self):
+        """Write this supervisor's workers for the followers, and their PIDs for the next supervisor"""
+        if self.role != "supervisor" or not self._coordinated:
+            return
+        with self._publish_lock:
+            workers = [
+                {"url": worker.url, "routable": worker.routable and not standby, "pid": worker.status()["pid"]}
+                for worker, standby in [(w, False) for w in self.workers] + [(w, True) for w in self._standby]
+            ]
+            state = {"pid": os.getpid(), "workers": workers, "last_restart": self._last_restart}
+            try:
+                write_json(os.path.join(self.state_dir, "supervisor.json"), state)
+            except OSError as e:
+                print(f"Error publishing NestJS workers: {e}")
+
+    def _follow(self):
+        """Route to the workers the supervising process reports as routable"""
+        path = os.path.join(self.state_dir, "supervisor.json")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._published_mtime:
+            return
+        state = read_json(path)
+        if state is None:
+            return
+        self._published_mtime = mtime
+        self._published = state
+        self._supervisor_pid = state.get("pid")
+        current = {worker.url: worker for worker in self.workers}
+        urls = [info["url"] for info in state.get("workers", []) if info.get("routable")]
+        with self._changed:
+            # Known workers keep their balancer state
+            self.workers = [
+                current.get(url) or NestWorker(index, url, self.base_dir, self._notify, managed=False)
+                for index, url in enumerate(urls)
+            ]
+            self._changed.notify_all()
+
+    def _request_restart(self, timeout):
+        """Ask the supervising process for a restart and wait for its outcome"""
+        requested_at = time.time()
+        try:
+            write_json(os.path.join(self.state_dir, "restart.json"), {"requested_at": requested_at, "pid": os.getpid()})
+        except OSError as e:
+            print(f"Error requesting a NestJS restart: {e}")
+            return False
+        # The build and then each worker may take up to timeout
+        deadline = time.monotonic() + timeout * (self.worker_count + 1)
+        while time.monotonic() < deadline and not self._stopping.is_set():
+            self._follow()
+            restart = (self._published or {}).get("last_restart")
+            if restart and restart["requested_at"] >= requested_at:
+                return restart["success"]
+            time.sleep(COORDINATE_INTERVAL)
+        print(f"NestJS supervisor process {self._supervisor_pid} did not finish the restart in time")
+        return False
+
+    def _serve_restart_request(self):
+        request = read_json(os.path.join(self.state_dir, "restart.json"))
+        if not request:
+            return
+        requested_at = request.get("requested_at", 0)
+        done = self._last_restart["requested_at"] if self._last_restart else self._restarts_from
+        if requested_at <= done:
+            return
+        print(f"Restarting NestJS workers for process {request.get('pid')}")
+        success = self.restart()
+        self._last_restart = {"requested_at": requested_at, "success": success}
+        self._publish()
+
+    def _drain(self, worker):
+        """Wait for a worker that is out of the rotation to finish its requests"""
+        deadline = time.monotonic() + NESTJS_DRAIN_TIMEOUT
+        with self._changed:
+            while worker.outstanding > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"NestJS worker on port {worker.port} still has {worker.outstanding} requests, stopping anyway")
+                    break
+                self._changed.wait(remaining)
+
+    def _health_loop(self):
+        while not self._stopping.wait(NESTJS_HEALTH_CHECK_INTERVAL):
+            for worker in self.workers:
+                if not worker.ready or worker.draining:
+                    continue
+                try:
+                    resp = upstream.get_session().get(
+                        f"{worker.url}{NESTJS_READY_PATH}",
+                        timeout=NESTJS_HEALTH_CHECK_TIMEOUT
+                    )
+                    resp.close()
+                    healthy = resp.status_code < 500
+                except requests.RequestException:
+                    healthy = False
+                self._record_health(worker, healthy)
+
+    def _record_health(self, worker, healthy):
+        with self._changed:
+            if worker not in self.workers:
+                # Replaced by restart() and stopping; its failures don't matter any more
+                return
+            if healthy:
+                if worker.ejected:
+                    print(f"NestJS worker on port {worker.port} is healthy again, back in rotation")
+                worker.failures = 0
+                worker.unhealthy_since = None
+                worker.ejected = False
+                self._changed.notify_all()
+                return
+            worker.failures += 1
+            if worker.unhealthy_since is None:
+                worker.unhealthy_since = time.monotonic()
+            if not worker.ejected and worker.failures >= NESTJS_HEALTH_CHECK_FAILURES:
+                worker.ejected = True
+                worker._stats["ejections"] += 1
+                print(f"NestJS worker on port {worker.port} failed {worker.failures} health checks, ejected")
+            restart = (
+                worker.ejected and worker.managed
+                and time.monotonic() - worker.unhealthy_since > NESTJS_EJECT_RESTART_AFTER
+            )
+            if restart:
+                worker.unhealthy_since = None
+        if restart:
+            print(f"NestJS worker on port {worker.port} unhealthy for {NESTJS_EJECT_RESTART_AFTER:.0f}s, restarting it")
+            threading.Thread(target=worker.restart, daemon=True).start()
+
+
+nestjs = NestSupervisor()
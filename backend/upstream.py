@@ -0,0 +1,182 @@
+import os
+import re
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upstream NestJS server settings
+NESTJS_BASE_URL = os.environ.get("NESTJS_BASE_URL", "http://0.0.0.0:3005")
+UPSTREAM_POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", "20"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", "3.05"))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", "300"))
+
+# Stream bodies through the proxy instead of buffering them in the worker
+PROXY_STREAMING = os.environ.get("PROXY_STREAMING", "true").lower() in ("1", "true", "yes")
+STREAM_CHUNK_SIZE = int(os.environ.get("PROXY_STREAM_CHUNK_SIZE", "65536"))
+# /ask subpaths whose responses are event streams and always go through chunk by chunk
+EVENT_STREAM_PATHS = ('stream',)
+
+# Result encodings of /ask answers and result pages, by media type, as negotiated by NestJS
+RESULT_MEDIA_TYPES = {
+    'application/json': 'json',
+    'application/vnd.ask.columnar+json': 'columnar',
+    'application/x-ndjson': 'ndjson',
+    'application/vnd.apache.arrow.stream': 'arrow',
+}
+# Encodings passed through chunk by chunk even with PROXY_STREAMING off
+STREAMED_RESULT_FORMATS = ('ndjson', 'arrow')
+
+# How long /health waits for the NestJS database pool stats
+DB_POOL_STATS_TIMEOUT = float(os.environ.get("DB_POOL_STATS_TIMEOUT", "1"))
+DB_POOL_STATS_PATH = "/ask/pool-stats"
+
+# Headers that only apply to a single hop and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection',
+    'keep-alive',
+    'proxy-authenticate',
+    'proxy-authorization',
+    'te',
+    'trailers',
+    'transfer-encoding',
+    'upgrade',
+}
+
+# Keep-alive pools cached per upstream host and port, one per NestJS worker
+UPSTREAM_HOST_POOLS = 32
+
+# One connection pool per upstream shared by every thread; urllib3 pools are thread-safe
+_adapter = HTTPAdapter(
+    pool_connections=UPSTREAM_HOST_POOLS,
+    pool_maxsize=UPSTREAM_POOL_SIZE,
+    pool_block=True,
+    max_retries=0
+)
+_local = threading.local()
+
+
+def get_session():
+    """Return this thread's session, backed by the shared keep-alive pool"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        # Never store upstream cookies on the session, they belong to the client
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        session.mount("http://", _adapter)
+        session.mount("https://", _adapter)
+        _local.session = session
+    return session
+
+
+def result_format(headers, args):
+    """Result encoding a request asks for: its format parameter, else the best known type in Accept
+
+    Keeps cached and coalesced answers in different encodings apart; NestJS
+    makes the same choice and answers 406 when it can't produce any of them.
+    """
+    if args.get('format'):
+        return args.get('format').lower()
+    ranges = []
+    for order, part in enumerate((headers.get('Accept') or '').split(',')):
+        media_type, _, params = part.partition(';')
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        try:
+            quality = float(match.group(1)) if match else 1.0
+        except ValueError:
+            quality = 0.0
+        if media_type.strip() and quality > 0:
+            ranges.append((-quality, order, media_type.strip().lower()))
+    for _, _, media_type in sorted(ranges):
+        if media_type in RESULT_MEDIA_TYPES:
+            return RESULT_MEDIA_TYPES[media_type]
+        if media_type in ('*/*', 'application/*'):
+            return 'json'
+    return 'json' if not ranges else 'unacceptable'
+
+
+def upstream_timeout():
+    """Separate connect and read timeouts for upstream requests"""
+    return (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+
+
+def forwardable_headers(headers):
+    """Strip the Host header and hop-by-hop headers before forwarding"""
+    return {
+        key: value for key, value in headers.items()
+        if key.lower() != 'host' and key.lower() not in HOP_BY_HOP_HEADERS
+    }
+
+
+class SizedBody:
+    """File-like request body of known length, read lazily while it is sent upstream"""
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+def iter_body(stream):
+    """Read a request body of unknown length in chunks"""
+    return iter(lambda: stream.read(STREAM_CHUNK_SIZE), b'')
+
+
+def iter_response(resp, on_complete=None, max_bytes=None):
+    """Yield the raw upstream body as it arrives, then release the connection
+
+    If on_complete is given it is called with the whole body once the last
+    chunk has been sent, as long as the body stayed within max_bytes.
+    """
+    chunks = [] if on_complete else None
+    size = 0
+    try:
+        # decode_content=False keeps Content-Length and Content-Encoding valid
+        for chunk in resp.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+            if chunks is not None:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+            yield chunk
+        if chunks is not None:
+            on_complete(b''.join(chunks))
+    finally:
+        resp.close()
+
+
+def pool_stats():
+    """Hit/miss counters for the upstream connection pool"""
+    stats = {
+        "maxsize": UPSTREAM_POOL_SIZE,
+        "requests": 0,
+        "hits": 0,
+        "misses": 0,
+    }
+    pools = _adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        # Every new connection is a miss, every other request reused one
+        stats["requests"] += pool.num_requests
+        stats["misses"] += pool.num_connections
+    stats["hits"] = max(stats["requests"] - stats["misses"], 0)
+    return stats
+
+
+def db_pool_stats(base_url=NESTJS_BASE_URL):
+    """Database connection pool utilization and wait times reported by a NestJS worker"""
+    try:
+        resp = get_session().get(f"{base_url}{DB_POOL_STATS_PATH}", timeout=DB_POOL_STATS_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
+    except (requests.RequestException, ValueError) as e:
+        return {"error": str(e)}